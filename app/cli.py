@@ -1,17 +1,223 @@
 import typer
 import asyncio
-from .services import build_graph_and_create_new_code_idea, run_mmm_graph_agent
+from pathlib import Path
+from typing import List, Optional
+
+# Services (langgraph, langchain, elevenlabs, sounddevice...) and their singletons are heavy to
+# import and build, so every command imports only what it needs, when it runs.
 
 # Initialize the Typer application
 app = typer.Typer(help="An AI assistant to put your ideas into notion.")
+cache_app = typer.Typer(help="Inspect or purge the local caches.")
+app.add_typer(cache_app, name="cache")
+outbox_app = typer.Typer(help="Manage the queue of pages waiting to be uploaded into Notion.")
+app.add_typer(outbox_app, name="outbox")
+
+NO_CACHE_OPTION = typer.Option(
+    False, "--no-cache", help="Skip the LLM response cache and always call the model."
+)
+
+
+def llm_settings(no_cache: bool = False, stream: bool = False) -> dict:
+    """
+    Config overrides of the LLM options of a command, applied by `run_with_clients`.
+    """
+    settings = {}
+    if no_cache:
+        settings["LLM_CACHE_ENABLED"] = False
+    if stream:
+        settings["LLM_STREAMING"] = True
+    return settings
+
+
+def trace_options() -> tuple[Optional[str], str]:
+    """
+    The file the spans are exported to (None when not exported) and its format.
+    """
+    from .config import config
+
+    trace_file = GLOBAL_OPTIONS["trace_file"] or config.TRACE_FILE
+    return (str(trace_file) if trace_file else None), GLOBAL_OPTIONS["trace_format"] or config.TRACE_FORMAT
+
+
+async def run_with_clients(coro, settings: Optional[dict] = None):
+    """
+    Runs a command coroutine with the shared service clients opened once for the whole process.
+
+    It also sets up logging (`LOG_LEVEL`) and, with `--profile` or a trace file, the tracing.
+    `settings` are config overrides (`config.override`) for the command.
+    """
+    from .config import config
+    from .services.notion import notion_client
+    from .services.tracing import configure_logging, finish_tracing, tracer
+
+    configure_logging(config.LOG_LEVEL)
+    profile = GLOBAL_OPTIONS["profile"]
+    trace_file, trace_format = trace_options()
+    if profile or trace_file:
+        tracer.enable()
+
+    try:
+        with config.override(**(settings or {})):
+            async with notion_client:
+                return await coro
+    finally:
+        if tracer.enabled:
+            finish_tracing(profile, trace_file, trace_format, config.SERVICE_NAME)
+
+
+# Set by the global options, applied by `run_with_clients` so commands that do no work stay fast to start.
+GLOBAL_OPTIONS = {"profile": False, "trace_file": None, "trace_format": None, "local": False}
+
+
+def forward_to_daemon(command: str, **options):
+    """
+    Runs the command in `notast serve` when it is running and exits with its code, otherwise
+    returns so the command runs in this process.
+
+    Profiled and traced commands always run here, their spans belong to this process.
+    """
+    if GLOBAL_OPTIONS["local"] or GLOBAL_OPTIONS["profile"] or GLOBAL_OPTIONS["trace_file"]:
+        return
+
+    from .services.daemon import forward
+
+    exit_code = forward(command, options)
+    if exit_code is not None:
+        raise typer.Exit(code=exit_code)
+
+
+@app.callback()
+def cli_main(
+    profile: bool = typer.Option(False, "--profile", help="Print a per-stage latency breakdown at the end."),
+    trace_file: Optional[Path] = typer.Option(None, "--trace-file", help="Export the spans (default: TRACE_FILE)."),
+    trace_format: Optional[str] = typer.Option(None, "--trace-format", help="'jsonl' or 'otlp' (default: TRACE_FORMAT)."),
+    local: bool = typer.Option(False, "--local", help="Run here even when `notast serve` is running."),
+):
+    """
+    An AI assistant to put your ideas into notion.
+    """
+    if trace_format not in (None, "jsonl", "otlp"):
+        raise typer.BadParameter("Use 'jsonl' or 'otlp'.", param_hint="--trace-format")
+    GLOBAL_OPTIONS.update(profile=profile, trace_file=trace_file, trace_format=trace_format, local=local)
 
 
 @app.command(name="record-idea")
-def cli_record_code_idea():
+def cli_record_code_idea(
+    no_cache: bool = NO_CACHE_OPTION,
+    stream: bool = typer.Option(
+        False, "--stream", help="Show the answer as it is generated and fill the Notion page live."
+    ),
+):
     """
     Creates a new page in Notion.
     """
-    asyncio.run(build_graph_and_create_new_code_idea())
+    forward_to_daemon("record-idea", no_cache=no_cache, stream=stream)
+
+    from .services.agent import build_graph_and_create_new_code_idea
+
+    asyncio.run(run_with_clients(build_graph_and_create_new_code_idea(), llm_settings(no_cache, stream)))
+
+
+@app.command("ingest")
+def cli_ingest(
+    directory: Path = typer.Argument(
+        ..., exists=True, file_okay=False, help="Folder with the WAV voice memos."
+    ),
+    pattern: str = typer.Option("*.wav", "--pattern", "-p", help="Glob to select the audio files."),
+    transcription_concurrency: int = typer.Option(
+        4, "--transcriptions", min=1, help="Max concurrent transcriptions."
+    ),
+    llm_concurrency: int = typer.Option(4, "--llm-calls", min=1, help="Max concurrent LLM calls."),
+    notion_concurrency: int = typer.Option(2, "--uploads", min=1, help="Max concurrent Notion uploads."),
+    no_cache: bool = NO_CACHE_OPTION,
+):
+    """
+    Creates a Notion page for every voice memo in a folder.
+
+    Progress is kept in a manifest inside the folder, so re-running the command resumes where it stopped.
+    """
+    forward_to_daemon(
+        "ingest",
+        directory=str(directory.resolve()),
+        pattern=pattern,
+        transcription_concurrency=transcription_concurrency,
+        llm_concurrency=llm_concurrency,
+        notion_concurrency=notion_concurrency,
+        no_cache=no_cache,
+    )
+
+    from .services.ingest import echo_summary, ingest_directory
+
+    summary = asyncio.run(
+        run_with_clients(
+            ingest_directory(
+                directory,
+                pattern=pattern,
+                transcription_concurrency=transcription_concurrency,
+                llm_concurrency=llm_concurrency,
+                notion_concurrency=notion_concurrency,
+            ),
+            llm_settings(no_cache),
+        )
+    )
+
+    echo_summary(summary)
+    if summary.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command("resume")
+def cli_resume(
+    run_id: Optional[str] = typer.Argument(None, help="Run to continue, lists the unfinished runs when omitted."),
+    no_cache: bool = NO_CACHE_OPTION,
+):
+    """
+    Continues a failed record-idea or mmm run from its last completed step.
+    """
+    from .services.checkpoints import list_runs, resume_run
+
+    if run_id is None:
+        runs = asyncio.run(list_runs())
+        if not runs:
+            typer.echo("No unfinished runs.")
+        for run in runs:
+            typer.echo(f"{run['run_id']}  {run['created_at'] or '':<32}  next: {', '.join(run['next']) or '-'}")
+        return
+
+    try:
+        final_state = asyncio.run(run_with_clients(resume_run(run_id), llm_settings(no_cache)))
+    except ValueError as err:
+        raise typer.BadParameter(str(err))
+    if final_state is None:
+        raise typer.Exit(code=1)
+
+
+@app.command("search")
+def cli_search(
+    query: str = typer.Argument(..., help="Words to look for in the past ideas."),
+    limit: int = typer.Option(5, "--limit", "-n", min=1, help="Max ideas listed."),
+    min_score: float = typer.Option(0.1, "--min-score", help="Hide ideas less similar than this (0-1)."),
+):
+    """
+    Searches the local index of the ideas already uploaded into Notion.
+    """
+    from datetime import datetime
+
+    from .services.idea_index import get_idea_index
+
+    index = get_idea_index()
+    matches = index.search(query, limit=limit, min_score=min_score)
+    if not matches:
+        typer.echo(f"No matching idea in {index.directory} ({index.stats()['ideas']} indexed).")
+        raise typer.Exit(code=1)
+
+    for match in matches:
+        created = datetime.fromtimestamp(match.created_at).strftime("%Y-%m-%d")
+        typer.secho(f"{match.score:.2f}  {created}  {match.title}", fg=typer.colors.BRIGHT_BLUE)
+        typer.echo(f"      page {match.page_id or '(queued in the outbox)'}")
+        if match.paragraphs:
+            typer.echo(f"      {match.paragraphs[0][:160]}")
 
 
 @app.command("create")
@@ -25,16 +231,198 @@ def cli_create_user(
 
 @app.command("mmm")
 def cli_get_mmm(
-    topic: str = typer.Option(
-        ..., "--topic", "-t", help="Topic required to get the MMM"
+    topic: Optional[List[str]] = typer.Option(
+        None, "--topic", "-t", help="Topic required to get the MMM, can be repeated."
+    ),
+    topics_file: Optional[Path] = typer.Option(
+        None, "--topics-file", "-f", exists=True, dir_okay=False, help="File with one topic per line."
     ),
+    count: int = typer.Option(1, "--count", "-n", min=1, help="Number of MMMs per topic."),
+    concurrency: Optional[int] = typer.Option(
+        None, "--concurrency", "-c", min=1, help="Max concurrent LLM calls (default: MMM_CONCURRENCY)."
+    ),
+    no_cache: bool = NO_CACHE_OPTION,
 ):
     """
     MMM => Monday Morning Mediation.
 
     It creates a new MMM phrase, related to the topic you sent.
+    With several topics, a topics file or --count above 1, every MMM is generated concurrently
+    and printed as a JSON line.
+    """
+    topics = list(topic or [])
+    if topics_file:
+        lines = topics_file.read_text(encoding="utf-8").splitlines()
+        topics += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    if not topics:
+        raise typer.BadParameter("Provide at least one --topic or a --topics-file.")
+
+    forward_to_daemon("mmm", topics=topics, count=count, concurrency=concurrency, no_cache=no_cache)
+
+    if len(topics) == 1 and count == 1:
+        from .services.mmm_agent import run_mmm_graph_agent
+
+        asyncio.run(run_with_clients(run_mmm_graph_agent(topic=topics[0]), llm_settings(no_cache)))
+        return
+
+    from .config import config
+    from .services.mmm_agent import run_mmm_batch_graph_agent
+
+    final_state = asyncio.run(
+        run_with_clients(
+            run_mmm_batch_graph_agent(
+                topics, quotes_per_topic=count, concurrency=concurrency or config.MMM_CONCURRENCY
+            ),
+            llm_settings(no_cache),
+        )
+    )
+    if final_state["errors"]:
+        raise typer.Exit(code=1)
+
+
+@app.command("serve")
+def cli_serve(
+    status: bool = typer.Option(False, "--status", help="Show whether the daemon is running."),
+    stop: bool = typer.Option(False, "--stop", help="Stop the running daemon."),
+):
+    """
+    Runs notast as a daemon keeping the graphs and the API clients warm.
+
+    While it runs, record-idea, mmm and ingest are sent to it over a Unix socket (DAEMON_SOCKET)
+    and only pay for their network calls. Use --local to run a command in its own process.
+    """
+    from .services.daemon import DaemonAlreadyRunning, request_daemon, serve, socket_path
+
+    path = socket_path()
+    if status or stop:
+        answer = asyncio.run(request_daemon(path, {"command": "stop" if stop else "status"}))
+        if answer is None:
+            typer.echo(f"No daemon listening on {path}.")
+            raise typer.Exit(code=1)
+        if stop:
+            typer.secho("👋 Daemon stopped.", fg=typer.colors.GREEN)
+        else:
+            typer.echo(
+                f"🛰️  Daemon {answer['pid']} on {path}: {answer['active_jobs']} running jobs, {answer['served_jobs']} served."
+            )
+            for key, stats in answer.get("llm", {}).items():
+                latency = f"p50 {stats['p50']:.1f}s, p95 {stats['p95']:.1f}s" if stats["p50"] is not None else "no latency yet"
+                typer.echo(
+                    f"🧠 {key}: {stats['requests']} requests, {stats['errors']} errors, {latency}, "
+                    f"{stats['hedged']} hedged ({stats['hedge_wins']} won by the backup)"
+                )
+            if "json" in answer:
+                typer.echo("🧩 LLM JSON answers: " + ", ".join(f"{count} {outcome}" for outcome, count in answer["json"].items()))
+        return
+
+    try:
+        asyncio.run(run_with_clients(serve(path, *trace_options())))
+    except DaemonAlreadyRunning as err:
+        typer.secho(f"❌ {err}.", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+
+
+@cache_app.command("info")
+def cli_cache_info(
+    show_entries: bool = typer.Option(False, "--entries", "-e", help="List every cached transcript."),
+):
     """
-    asyncio.run(run_mmm_graph_agent(topic=topic))
+    Shows the size, location and hit rate of the local caches.
+    """
+    from .services.llm_cache import get_llm_cache
+    from .services.transcript_cache import get_transcript_cache
+
+    cache = get_transcript_cache()
+    entries = cache.entries()
+    total = sum(entry["bytes"] for entry in entries)
+
+    typer.secho(f"🗂️  Transcript cache: {cache.directory}", fg=typer.colors.BRIGHT_BLUE)
+    typer.echo(f"{len(entries)} entries, {total / 1024:.1f} KB of {cache.max_bytes / 1024 / 1024:.0f} MB")
+    if show_entries:
+        for entry in entries:
+            typer.echo(f"{entry['key'][:16]}  {entry['bytes']:>8} B  {entry['last_used']:%Y-%m-%d %H:%M:%S}")
+
+    llm_cache = get_llm_cache()
+    stats = llm_cache.stats()
+    typer.secho(f"🧠 LLM response cache: {llm_cache.path}", fg=typer.colors.BRIGHT_BLUE)
+    typer.echo(
+        f"{stats['entries']} entries of {llm_cache.max_entries}, {stats['hits']} hits, {stats['misses']} misses"
+    )
+
+
+@cache_app.command("purge")
+def cli_cache_purge(
+    transcripts: bool = typer.Option(True, "--transcripts/--no-transcripts", help="Purge cached transcripts."),
+    llm: bool = typer.Option(True, "--llm/--no-llm", help="Purge cached LLM responses."),
+):
+    """
+    Deletes the cached transcripts and LLM responses.
+    """
+    from .services.llm_cache import get_llm_cache
+    from .services.transcript_cache import get_transcript_cache
+
+    if transcripts:
+        removed = get_transcript_cache().purge()
+        typer.secho(f"🧹 Removed {removed} cached transcripts.", fg=typer.colors.GREEN)
+    if llm:
+        removed = get_llm_cache().purge()
+        typer.secho(f"🧹 Removed {removed} cached LLM responses.", fg=typer.colors.GREEN)
+
+
+@outbox_app.command("flush")
+def cli_outbox_flush(
+    concurrency: int = typer.Option(2, "--concurrency", "-c", min=1, help="Max pages uploaded at the same time."),
+    retry_failed: bool = typer.Option(False, "--retry-failed", help="Also retry the pages marked as failed."),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Don't print progress."),
+    wait: bool = typer.Option(
+        False, "--wait", help="Wait for the retries of failed uploads until none is left to retry."
+    ),
+):
+    """
+    Uploads the queued pages that are due into Notion.
+    """
+    from .services.outbox import flush_outbox, get_outbox
+
+    outbox = get_outbox()
+    if retry_failed:
+        outbox.retry_failed()
+
+    summary = asyncio.run(run_with_clients(flush_outbox(outbox, concurrency=concurrency, quiet=quiet, wait=wait)))
+    if quiet:
+        return
+
+    typer.secho(
+        f"\n📮 {len(summary.uploaded)} uploaded, {len(summary.failed)} failed.",
+        fg=typer.colors.RED if summary.failed else typer.colors.GREEN,
+    )
+    next_due_in = outbox.next_due_in()
+    if next_due_in is not None:
+        typer.echo(f"Next retry due in {next_due_in:.0f}s.")
+    if summary.failed:
+        raise typer.Exit(code=1)
+
+
+@outbox_app.command("status")
+def cli_outbox_status(
+    show_all: bool = typer.Option(False, "--all", "-a", help="Also list the uploaded pages."),
+):
+    """
+    Shows the pages waiting in the outbox and the last error of each one.
+    """
+    from datetime import datetime
+
+    from .services.outbox import get_outbox
+
+    outbox = get_outbox()
+    stats = outbox.stats()
+    typer.secho(f"📮 Outbox: {outbox.path}", fg=typer.colors.BRIGHT_BLUE)
+    typer.echo(", ".join(f"{count} {status}" for status, count in stats.items()))
+
+    for entry in outbox.entries(include_done=show_all):
+        due = datetime.fromtimestamp(entry["next_attempt_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        typer.echo(f"{entry['key'][:12]}  {entry['status']:<11} attempts={entry['attempts']}  next={due}  {entry['title']}")
+        if entry["last_error"]:
+            typer.secho(f"    {entry['last_error'][:200]}", fg=typer.colors.YELLOW)
 
 
 def main():
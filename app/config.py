@@ -1,6 +1,14 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
 
+# Settings overridden for the current context only, see `Config.override`.
+_overrides: ContextVar[Optional[Mapping[str, Any]]] = ContextVar("notast_config_overrides", default=None)
+
 
 class Config(BaseSettings):
     """Main setup for the backend service."""
@@ -14,20 +22,114 @@ class Config(BaseSettings):
         description="Python logging level. Must be a string like 'DEBUG' or 'ERROR'.",
         default="INFO",
     )
+    TRACE_FILE: Optional[str] = Field(description="File the tracing spans are exported to, tracing is off when unset", default=None)
+    TRACE_FORMAT: str = Field(description="Span export format: 'jsonl' or 'otlp' (OpenTelemetry OTLP/JSON)", default="jsonl")
 
     # NOTION
     NOTION_API_KEY: str = Field(description="Notion Key", default="super_secret")
     NOTION_PARENT_PAGE_ID: str = Field(description="Notion Page ID", default="super_secret_id")
     NOTION_URL: str = Field(description="Notion URL", default="https://api.notion.com/v1")
     NOTION_VERSION: str = Field(description="Notion Version", default="2022-06-28")
+    NOTION_CONNECT_TIMEOUT: float = Field(description="Seconds to wait for a Notion connection", default=5.0)
+    NOTION_READ_TIMEOUT: float = Field(description="Seconds to wait for a Notion response", default=30.0)
+    NOTION_REQUESTS_PER_SECOND: float = Field(description="Max Notion requests started per second", default=3.0)
+    NOTION_MAX_RETRIES: int = Field(description="Retries for rate-limited or failed Notion requests", default=3)
 
     # ELEVEN LABS
     ELEVEN_LABS_API_KEY: str = Field(description="API key for eleven labs", default="")
     ELEVEN_LABS_MODEL: str = Field(description="Elevenlabs for audio AI", default="")
 
+    # RECORDING
+    STREAMING_TRANSCRIPTION: bool = Field(
+        description="Transcribe audio segments while still recording", default=False
+    )
+    STREAMING_SEGMENT_SECONDS: int = Field(
+        description="Length in seconds of each streamed transcription segment", default=20
+    )
+
+    AUDIO_SAMPLE_RATE: int = Field(
+        description="Sample rate (Hz) audio is downsampled to before upload, 0 keeps the recording rate",
+        default=16000,
+    )
+    AUDIO_ENCODING: str = Field(
+        description="Upload encoding: 'flac' (needs soundfile, falls back to WAV) or 'wav'", default="flac"
+    )
+    VAD_ENABLED: bool = Field(description="Trim silence before uploading audio for transcription", default=False)
+    VAD_FRAME_MS: int = Field(description="VAD analysis frame length in milliseconds", default=30)
+    VAD_ENERGY_THRESHOLD_DB: float = Field(description="Minimum frame energy (dBFS) considered speech", default=-45.0)
+    VAD_ZCR_THRESHOLD: float = Field(description="Zero-crossing rate marking quiet unvoiced speech", default=0.25)
+    VAD_PADDING_MS: int = Field(description="Audio kept around every speech region", default=200)
+    VAD_MAX_PAUSE_MS: int = Field(description="Longest pause kept between two speech regions", default=600)
+
+    # CACHES
+    CACHE_DIR: str = Field(description="Folder for the local caches", default="~/.cache/notast")
+    TRANSCRIPT_CACHE_ENABLED: bool = Field(description="Reuse transcripts of already seen audio", default=True)
+    TRANSCRIPT_CACHE_MAX_MB: int = Field(description="Max size of the transcript cache in MB", default=50)
+
+    LLM_CACHE_ENABLED: bool = Field(description="Reuse structured LLM responses for identical prompts", default=True)
+    LLM_CACHE_TTL_SECONDS: int = Field(description="Seconds a cached LLM response stays valid", default=7 * 24 * 3600)
+    LLM_CACHE_MAX_ENTRIES: int = Field(description="Max number of cached LLM responses", default=5000)
+
+    # OUTBOX
+    OUTBOX_ENABLED: bool = Field(description="Queue Notion uploads locally and send them in the background", default=False)
+    OUTBOX_PATH: str = Field(description="SQLite file of the Notion upload queue", default="~/.local/share/notast/outbox.sqlite3")
+    OUTBOX_MAX_ATTEMPTS: int = Field(description="Upload attempts before a queued page is marked as failed", default=8)
+    OUTBOX_BACKOFF_SECONDS: float = Field(description="First retry delay of a failed upload, doubled on every attempt", default=30.0)
+
+    # IDEA INDEX
+    INDEX_ENABLED: bool = Field(description="Index uploaded ideas locally for `notast search` and near-duplicate checks", default=True)
+    INDEX_DIR: str = Field(description="Folder of the local idea index", default="~/.local/share/notast/index")
+    INDEX_DUPLICATE_THRESHOLD: float = Field(description="Similarity (0-1) above which a new idea is a near-duplicate of an indexed one", default=0.5)
+    INDEX_DUPLICATE_ACTION: str = Field(description="On a near-duplicate: 'warn' and create a new page, or 'append' to the existing page", default="warn")
+
+    # CHECKPOINTS
+    CHECKPOINTS_ENABLED: bool = Field(description="Save the graph state after every node so failed runs can be resumed", default=True)
+    CHECKPOINTS_PATH: str = Field(description="SQLite file of the graph checkpoints", default="~/.local/share/notast/checkpoints.sqlite3")
+
     # AI MODEL
     AI_API_KEY: SecretStr = Field(description="AI Model API Key to access model", default="shh_secret")
     AI_MODEL: str = Field(description="AI model", default="local_model")
+    AI_MODEL_FAST: Optional[str] = Field(description="Model of the 'fast' tier tasks, AI_MODEL when unset", default=None)
+    AI_MODEL_HEAVY: Optional[str] = Field(description="Model of the 'heavy' tier tasks, AI_MODEL when unset", default=None)
+    LLM_TASK_TIERS: dict[str, str] = Field(
+        description="Model tier ('fast' or 'heavy') of every LLM task, other tasks use AI_MODEL",
+        default={"mmm": "fast", "summarize_chunk": "fast", "notion": "heavy"},
+    )
+    LLM_HEDGING_ENABLED: bool = Field(description="Send a backup request when an LLM request is slower than usual", default=False)
+    LLM_HEDGE_PERCENTILE: float = Field(description="Latency percentile of the recent requests after which a request is hedged", default=95.0)
+    LLM_HEDGE_MIN_SAMPLES: int = Field(description="Latencies needed before the percentile is used", default=10)
+    LLM_HEDGE_DELAY_SECONDS: float = Field(description="Hedge delay used until enough latencies are known", default=15.0)
+    LLM_LATENCY_WINDOW: int = Field(description="Recent latencies kept per model and task", default=200)
+    LLM_LOCAL_JSON: bool = Field(description="Parse and repair JSON answers locally, the structured output call is only a fallback", default=True)
+    LLM_STREAMING: bool = Field(description="Stream the LLM answer and render the Notion page as it is generated", default=False)
+    MMM_CONCURRENCY: int = Field(description="Max concurrent LLM calls when generating many MMMs", default=8)
+    SUMMARY_TOKEN_THRESHOLD: int = Field(description="Transcripts estimated above this many tokens are summarized chunk by chunk (map-reduce)", default=6000)
+    SUMMARY_CHUNK_TOKENS: int = Field(description="Estimated tokens per transcript chunk in the map-reduce path", default=2000)
+    SUMMARY_CONCURRENCY: int = Field(description="Max chunks summarized at the same time", default=4)
+
+    def __getattribute__(self, name: str) -> Any:
+        # Only the settings passed to `override` are ever in the mapping, other attributes go through.
+        overrides = _overrides.get()
+        if overrides is not None and name in overrides:
+            return overrides[name]
+        return super().__getattribute__(name)
+
+    @contextmanager
+    def override(self, **settings: Any) -> Iterator[None]:
+        """
+        Overrides settings for the current context (task) only, e.g. the options of one daemon job.
+
+        Concurrent jobs each see their own values, unlike assigning the attribute. Only declared
+        settings can be overridden.
+        """
+        unknown = settings.keys() - type(self).model_fields.keys()
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        token = _overrides.set(MappingProxyType({**(_overrides.get() or {}), **settings}))
+        try:
+            yield
+        finally:
+            _overrides.reset(token)
 
     class Config:
         """Override env file, used in dev."""
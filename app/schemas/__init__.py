@@ -1,3 +1,3 @@
-from .llm_dtos import QuoteMMM, NotionResponse,NotionPageData
+from .llm_dtos import ChunkSummary, QuoteMMM, NotionPageData
 
-__all__ = ["QuoteMMM", "NotionResponse", "NotionPageData"]
+__all__ = ["ChunkSummary", "QuoteMMM", "NotionPageData"]
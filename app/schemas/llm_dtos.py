@@ -11,3 +11,7 @@ class NotionPageData(BaseModel):
     title: str = Field(..., description="A concise title for the content.")
     text: List[str] = Field(..., description="A list of all paragraphs for the text.")
     icon: str = Field(..., description="A random emoji or icon related to the topic.")
+
+
+class ChunkSummary(BaseModel):
+    points: List[str] = Field(..., description="Short notes keeping every idea, decision and step of the part.")
@@ -1,11 +1,30 @@
-from .recording_capabilities import transformation_audio_to_text
-from .notion import create_notion_page
-from .agent import build_graph_and_create_new_code_idea
-from .mmm_agent import run_mmm_graph_agent
-
-__all__ = [
-    "build_graph_and_create_new_code_idea",
-    "create_notion_page",
-    "transformation_audio_to_text",
-    "run_mmm_graph_agent",
-]
+# Services are imported lazily (PEP 562): importing `app.services` must stay cheap, the heavy
+# dependencies (langgraph, langchain, elevenlabs, sounddevice...) are only loaded by the command
+# that needs them.
+from importlib import import_module
+
+_EXPORTS = {
+    "build_graph_and_create_new_code_idea": ".agent",
+    "create_notion_page": ".notion",
+    "flush_outbox": ".outbox",
+    "ingest_directory": ".ingest",
+    "notion_client": ".notion",
+    "transformation_audio_to_text": ".recording_capabilities",
+    "atransformation_audio_to_text": ".recording_capabilities",
+    "run_mmm_graph_agent": ".mmm_agent",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
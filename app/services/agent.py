@@ -1,102 +1,235 @@
+import operator
 import typer
-from typing import List, Optional
+from typing import Annotated, List, Optional
+from typing_extensions import TypedDict
 from datetime import datetime, timezone
 
-from pydantic import BaseModel, Field
+from app.config import config
 from app.schemas import NotionPageData
-from .notion import create_notion_page
-from .recording_capabilities import transformation_audio_to_text
+from .channels import AppendOnlyList
+from .checkpoints import new_run_id, open_checkpointer, run_config
+from .idea_index import get_idea_index, index_page
+from .notion import HEADING_PREFIX, append_to_notion_page, create_notion_page
+from .outbox import DONE, get_outbox, spawn_outbox_worker
+from .recording_capabilities import atransformation_audio_to_text
+from .streaming_page import stream_notion_page
+from .summarize import needs_map_reduce, reduce_messages, summarize_chunk, transcript_chunks
+from .tracing import traced, tracer
+from .transcript import Transcript
 from langgraph.graph import StateGraph, START, END
-from .llm import model
+from langgraph.types import Send
+from .llm import get_model
 from .prompts import notion_assistant_prompt, notion_user_prompt
 
 
-class AgentState(BaseModel):
-    messages: List = Field(default_factory=list)  # holds Human/AI messages
-    page_data: Optional[NotionPageData] = None
-    error: Optional[str] = None
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+class AgentState(TypedDict, total=False):
+    # Append-only channel: nodes return only their new messages, which extend the history in place.
+    messages: Annotated[list, AppendOnlyList]  # holds Human/AI messages
+    transcript: Optional[dict]  # `Transcript.to_dict()` of the recording: words, timestamps and speakers
+    chunk_notes: Annotated[list, operator.add]  # map-reduce path: {"index", "points"} of every summarized chunk
+    page_data: Optional[NotionPageData]
+    page_id: Optional[str]  # set when the page was already rendered into Notion while streaming
+    duplicate_of: Optional[dict]  # `IndexMatch.to_dict()` of an indexed idea this page nearly duplicates
+    error: Optional[str]
+    updated_at: datetime
 
 
-# ----------------------------
-# State Updater Helpers
-# ----------------------------
-def add_messages(state: AgentState, new_messages: List) -> AgentState:
-    return state.model_copy(
-        update={
-            "messages": state.messages + new_messages,
-            "updated_at": datetime.now(timezone.utc),
-        }
-    )
+class ChunkTask(TypedDict):
+    index: int
+    count: int
+    text: str
 
 
-def set_page_data(state: AgentState, page_data: NotionPageData) -> AgentState:
-    return state.model_copy(
-        update={"page_data": page_data, "updated_at": datetime.now(timezone.utc)}
-    )
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
 
 
-def set_error(state: AgentState, error_msg: str) -> AgentState:
-    return state.model_copy(
-        update={"error": error_msg, "updated_at": datetime.now(timezone.utc)}
-    )
+def speaker_section(state: AgentState) -> List[str]:
+    """
+    Paragraphs appended after the generated text: the timestamped speaker turns of a conversation.
+    """
+    transcript = state.get("transcript")
+    return Transcript.from_dict(transcript).speaker_section() if transcript else []
 
 
 # ----------------------------
 # LangGraph Nodes
 # ----------------------------
-def add_system_details(state: AgentState) -> AgentState:
+# Nodes return partial updates (deltas), LangGraph merges them into the state through the reducers.
+@traced("node.add_system_details")
+async def add_system_details(state: AgentState):
     """
     Adds the system message to the state.
     """
-    return add_messages(state, [notion_assistant_prompt])
+    return {"messages": [notion_assistant_prompt], "updated_at": utc_now()}
 
 
-def get_voice_recording(state: AgentState) -> AgentState:
+@traced("node.get_voice_recording")
+async def get_voice_recording(state: AgentState):
     """
     Get text from the audio using external transformation function.
     """
-    transcribed_text = transformation_audio_to_text()
-    user_prompt = notion_user_prompt(user_input=transcribed_text)
+    transcript = await atransformation_audio_to_text()
+    user_prompt = notion_user_prompt(user_input=transcript.for_prompt(), speakers=transcript.speaker_count)
 
-    return add_messages(state, [user_prompt])
+    return {"messages": [user_prompt], "transcript": transcript.to_dict(), "updated_at": utc_now()}
 
 
-def call_llm(state: AgentState) -> AgentState:
+async def generate_page(state: AgentState, messages: list):
+    """
+    Generates the page data with the LLM, in streaming mode the page is rendered into Notion while the model generates it.
+    """
+    if config.LLM_STREAMING:
+        page_data, page_id = await stream_notion_page(messages, appendix=speaker_section(state))
+        return {"page_data": page_data, "page_id": page_id, "updated_at": utc_now()}
+
+    response: NotionPageData = await get_model().llm_structure_notion_response.ainvoke(messages)
+    return {"page_data": response, "updated_at": utc_now()}
+
+
+@traced("node.call_llm")
+async def call_llm(state: AgentState):
     """
     Invokes the LLM with the current state's messages and returns the LLM's response.
     """
-    response: NotionPageData = model.llm_structure_notion_response.invoke(
-        state.messages
-    )
-    return state.model_copy(
-        update={"page_data": response, "updated_at": datetime.now(timezone.utc)}
+    return await generate_page(state, state["messages"])
+
+
+def route_transcript(state: AgentState):
+    """
+    Sends short transcripts to `call_llm` (one prompt) and fans long ones out to `summarize_chunk`,
+    one task per chunk, based on their estimated token count.
+    """
+    transcript = Transcript.from_dict(state["transcript"]) if state.get("transcript") else None
+    if transcript is None or not needs_map_reduce(transcript):
+        return "call_llm"
+
+    chunks = transcript_chunks(transcript)
+    typer.secho(f"📚 Long transcript, summarizing it in {len(chunks)} parts.", fg=typer.colors.BRIGHT_BLUE)
+    return [
+        Send("summarize_chunk", ChunkTask(index=index, count=len(chunks), text=chunk))
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+@traced("node.summarize_chunk")
+async def summarize_chunk_node(task: ChunkTask):
+    """
+    Map step, the branches run concurrently (capped with `SUMMARY_CONCURRENCY`).
+    """
+    points = await summarize_chunk(task["text"], task["index"], task["count"])
+    return {"chunk_notes": [{"index": task["index"], "points": points}]}
+
+
+@traced("node.reduce_summaries")
+async def reduce_summaries(state: AgentState):
+    """
+    Reduce step, merges the notes of every chunk (in transcript order) into the page data.
+    """
+    notes = [note["points"] for note in sorted(state["chunk_notes"], key=lambda note: note["index"])]
+    speakers = Transcript.from_dict(state["transcript"]).speaker_count
+    return await generate_page(state, reduce_messages(notes, speakers=speakers))
+
+
+@traced("node.check_duplicate")
+async def check_duplicate(state: AgentState):
+    """
+    Looks for an already indexed idea close to the generated page (`INDEX_DUPLICATE_THRESHOLD`).
+    """
+    payload = state.get("page_data")
+    if not payload or not config.INDEX_ENABLED:
+        return {"duplicate_of": None, "updated_at": utc_now()}
+
+    match = get_idea_index().nearest(payload.title, payload.text)
+    if match is None or match.score < config.INDEX_DUPLICATE_THRESHOLD:
+        return {"duplicate_of": None, "updated_at": utc_now()}
+
+    typer.secho(
+        f"🔁 This idea looks like \"{match.title}\" ({match.score:.0%} similar, page {match.page_id or 'still queued'}).",
+        fg=typer.colors.YELLOW,
     )
+    return {"duplicate_of": match.to_dict(), "updated_at": utc_now()}
+
 
+def append_target(state: AgentState) -> Optional[str]:
+    """
+    The page a near-duplicate is appended to, None when a new page is created.
+    """
+    duplicate = state.get("duplicate_of")
+    if not duplicate or config.INDEX_DUPLICATE_ACTION != "append":
+        return None
+    if not duplicate["page_id"]:
+        typer.secho("The similar page is not uploaded yet, creating a new page.", fg=typer.colors.YELLOW)
+        return None
+    return duplicate["page_id"]
 
-async def upload_new_page_into_notion(state: AgentState) -> AgentState:
+
+@traced("node.upload_new_page_into_notion")
+async def upload_new_page_into_notion(state: AgentState):
     """
     Upload parsed Notion page into the Notion API.
+
+    With the outbox enabled the page is only queued locally and a background worker uploads it,
+    so the command does not wait for Notion and the page is not lost if the upload fails. A
+    near-duplicate (`check_duplicate`) is appended under a heading to the existing page instead
+    when `INDEX_DUPLICATE_ACTION` is "append". The page is then added to the idea index.
     """
-    payload = state.page_data
+    payload = state.get("page_data")
     if not payload:
-        return set_error(
-            state, "🔥 Notion data was not able to get parsed to then being used."
+        return {
+            "error": "🔥 Notion data was not able to get parsed to then being used.",
+            "updated_at": utc_now(),
+        }
+
+    if state.get("page_id"):
+        # Streaming renders the page before the duplicate check, a near-duplicate can only be reported.
+        typer.secho(f"Notion page {state['page_id']} was already rendered while streaming")
+        index_page(payload.title, payload.text, page_id=state["page_id"])
+        return {"updated_at": utc_now()}
+
+    paragraphs = payload.text + speaker_section(state)
+    page_id = append_target(state)
+    if page_id:
+        paragraphs = [f"{HEADING_PREFIX}{payload.icon} {payload.title}", *paragraphs]
+
+    if config.OUTBOX_ENABLED:
+        key, duplicate_status = get_outbox().enqueue(
+            title=payload.title, paragraphs=paragraphs, emoji=payload.icon, page_id=page_id
         )
+        if duplicate_status == DONE:
+            typer.secho("📮 This Notion page was already uploaded, nothing to do.")
+            return {"updated_at": utc_now()}
+        if duplicate_status is None:
+            index_page(payload.title, payload.text, page_id=page_id, outbox_key=key)
+            typer.secho("📮 Notion page queued, it is being uploaded in the background (see `notast outbox status`).")
+        else:
+            typer.secho("📮 This Notion page is already queued, it is being uploaded in the background (see `notast outbox status`).")
+        spawn_outbox_worker()
+        return {"updated_at": utc_now()}
 
-    await create_notion_page(
-        title=payload.title, paragraphs=payload.text, emoji=payload.icon
-    )
+    if page_id:
+        page = await append_to_notion_page(page_id, paragraphs)
+    else:
+        page = await create_notion_page(
+            title=payload.title, paragraphs=paragraphs, emoji=payload.icon
+        )
+    if page is None:
+        # Raising keeps the run's checkpoint, `notast resume` then retries this node only.
+        raise RuntimeError("🔥 Notion rejected the page, it was not (fully) uploaded.")
+    index_page(payload.title, payload.text, page_id=page["id"])
     typer.secho("Notion Page Successfully Uploaded")
-    return state
+    return {"updated_at": utc_now()}
 
 
 # ----------------------------
 # Graph Definition
 # ----------------------------
-def build_graph():
+def build_graph(checkpointer=None):
     """
     Creates and compiles the LangGraph state machine.
+
+    Args:
+        checkpointer: Optional LangGraph checkpointer saving the state after every node.
     """
     workflow = StateGraph(AgentState)
 
@@ -104,33 +237,72 @@ def build_graph():
     workflow.add_node("add_system_details", add_system_details)
     workflow.add_node("get_voice_recording", get_voice_recording)
     workflow.add_node("call_llm", call_llm)
+    workflow.add_node("summarize_chunk", summarize_chunk_node)
+    workflow.add_node("reduce_summaries", reduce_summaries)
+    workflow.add_node("check_duplicate", check_duplicate)
     workflow.add_node("upload_new_page_into_notion", upload_new_page_into_notion)
 
-    # Define linear flow
+    # Linear flow, long transcripts take the map-reduce detour (summarize_chunk -> reduce_summaries),
+    # every page is checked against the idea index before its upload.
     workflow.add_edge(START, "add_system_details")
     workflow.add_edge("add_system_details", "get_voice_recording")
-    workflow.add_edge("get_voice_recording", "call_llm")
-    workflow.add_edge("call_llm", "upload_new_page_into_notion")
+    workflow.add_conditional_edges("get_voice_recording", route_transcript, ["call_llm", "summarize_chunk"])
+    workflow.add_edge("summarize_chunk", "reduce_summaries")
+    workflow.add_edge("call_llm", "check_duplicate")
+    workflow.add_edge("reduce_summaries", "check_duplicate")
+    workflow.add_edge("check_duplicate", "upload_new_page_into_notion")
     workflow.add_edge("upload_new_page_into_notion", END)
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 
 # ----------------------------
 # Entrypoint
 # ----------------------------
-async def build_graph_and_create_new_code_idea():
-    app = build_graph()
-    initial_state = AgentState()
-
-    typer.echo("--- Starting async graph execution ---")
-    final_state = await app.ainvoke(initial_state)
+async def run_idea_graph(app, initial_state: Optional[AgentState], run_id: str):
+    """
+    Runs the graph as `run_id`, or continues that run from its last checkpoint when
+    `initial_state` is None.
+    """
+    try:
+        with tracer.span("graph.idea", run_id=run_id):
+            final_state = await app.ainvoke(
+                initial_state,
+                config={**run_config(run_id), "max_concurrency": config.SUMMARY_CONCURRENCY},
+                durability="async",
+            )
+    except Exception as err:
+        typer.secho(f"\n🛑 Run {run_id} stopped with error: {err}", fg=typer.colors.RED, err=True)
+        if app.checkpointer is not None:
+            typer.echo(f"Continue it from the last completed step with `notast resume {run_id}`.", err=True)
+        return None
 
     if final_state.get("error"):
         typer.secho(
-            f"\n🛑 Process failed with error: {final_state.error}",
+            f"\n🛑 Process failed with error: {final_state['error']}",
             fg=typer.colors.RED,
             err=True,
         )
-    else:
-        typer.secho("\n🎉 Process completed successfully!", fg=typer.colors.GREEN)
+        return final_state
+
+    typer.secho("\n🎉 Process completed successfully!", fg=typer.colors.GREEN)
+    # A successful run has nothing left to resume, a failed one is kept to be looked into.
+    if app.checkpointer is not None:
+        await app.checkpointer.adelete_thread(run_id)
+    return final_state
+
+
+async def run_new_idea(app):
+    """
+    Runs an already compiled idea graph (`build_graph`) for a new recording.
+    """
+    run_id = new_run_id("idea")
+    initial_state = AgentState(messages=[], page_data=None, error=None, updated_at=utc_now())
+
+    typer.echo(f"--- Starting async graph execution (run {run_id}) ---")
+    return await run_idea_graph(app, initial_state, run_id)
+
+
+async def build_graph_and_create_new_code_idea():
+    async with open_checkpointer() as checkpointer:
+        return await run_new_idea(build_graph(checkpointer))
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class PCMBuffer:
+    """
+    Preallocated, fixed-capacity 16-bit PCM buffer for audio recordings.
+
+    The whole buffer is allocated once, sized from the recording hard limit. Every audio callback
+    converts its float samples straight into the next free slice of the buffer (no intermediate
+    copies, no list of small arrays), and the recorded audio is handed out as a zero-copy
+    `memoryview` that can be passed to the WAV encoder as is.
+
+    Once the buffer is full, extra samples are dropped and counted in `dropped_frames`.
+    """
+
+    def __init__(self, capacity_frames: int, channels: int = 1):
+        self.channels = channels
+        self.frames = 0
+        self.dropped_frames = 0
+        self._data = np.empty((capacity_frames, channels), dtype=np.int16)
+
+    @classmethod
+    def for_duration(cls, duration_limit: float, fs: int = 44100, channels: int = 1, slack_seconds: float = 1.0):
+        """
+        Builds a buffer big enough for `duration_limit` seconds of audio.
+
+        A bit of slack is added because the hard limit is only checked between callbacks.
+        """
+        return cls(capacity_frames=int((duration_limit + slack_seconds) * fs), channels=channels)
+
+    @property
+    def capacity_frames(self) -> int:
+        return len(self._data)
+
+    @property
+    def free_frames(self) -> int:
+        return self.capacity_frames - self.frames
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def write(self, indata: np.ndarray) -> int:
+        """
+        Converts float samples in [-1, 1] into int16 in place, at the end of the buffer.
+
+        Args:
+            indata (np.ndarray): Block of samples with shape (frames, channels).
+
+        Returns:
+            int: Number of frames written.
+        """
+        start = self.frames
+        count = min(len(indata), len(self._data) - start)
+        if count:
+            end = start + count
+            np.multiply(indata[:count], 32767, out=self._data[start:end], casting="unsafe")
+            self.frames = end
+        if count < len(indata):
+            self.dropped_frames += len(indata) - count
+        return count
+
+    def memoryview(self) -> memoryview:
+        """
+        Returns the recorded PCM bytes as a zero-copy view over the buffer.
+        """
+        return memoryview(self._data[: self.frames]).cast("B")
+
+    def clear(self):
+        self.frames = 0
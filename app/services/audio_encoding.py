@@ -0,0 +1,79 @@
+from functools import lru_cache
+from io import BytesIO
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+
+@lru_cache(maxsize=8)
+def lowpass_filter(cutoff: float, taps: int) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass FIR.
+
+    Args:
+        cutoff (float): Cutoff frequency as a fraction of the input sample rate (0-0.5).
+        taps (int): Filter length, odd so the filter has no delay.
+    """
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, 8.6)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample_pcm(pcm: np.ndarray, fs: int, target_fs: int, taps: int = 31) -> np.ndarray:
+    """
+    Resamples 16-bit PCM to `target_fs` with vectorized NumPy operations.
+
+    When downsampling, the signal first goes through an anti-aliasing low-pass filter (cutoff just
+    under the new Nyquist frequency), then every channel is linearly interpolated on the new time
+    grid. Good enough for speech recognition, which only needs the band up to ~8 kHz.
+
+    Args:
+        pcm (np.ndarray): int16 samples with shape (frames, channels) or (frames,).
+        fs (int): The sample rate of the audio data.
+        target_fs (int): The wanted sample rate.
+        taps (int): Length of the anti-aliasing filter.
+
+    Returns:
+        np.ndarray: int16 samples at `target_fs`, shape (frames, channels).
+    """
+    pcm = pcm.reshape(len(pcm), -1)
+    if fs == target_fs or not len(pcm):
+        return pcm
+
+    # The source grid is uniform, so the interpolation neighbours are found by index, no search needed.
+    target_positions = np.arange(int(len(pcm) * target_fs / fs), dtype=np.float64) * (fs / target_fs)
+    left = np.minimum(target_positions.astype(np.int64), len(pcm) - 1)
+    right = np.minimum(left + 1, len(pcm) - 1)
+    weight = (target_positions - left).astype(np.float32)
+    kernel = lowpass_filter(0.45 * target_fs / fs, taps) if target_fs < fs else None
+
+    resampled = np.empty((len(target_positions), pcm.shape[1]), dtype=np.int16)
+    for channel in range(pcm.shape[1]):
+        samples = pcm[:, channel].astype(np.float32)
+        if kernel is not None:
+            samples = np.convolve(samples, kernel, mode="same")
+        interpolated = samples[left]
+        interpolated += weight * (samples[right] - interpolated)
+        np.clip(interpolated, -32768, 32767, out=interpolated)
+        resampled[:, channel] = interpolated
+
+    return resampled
+
+
+def encode_flac(pcm: np.ndarray, fs: int) -> Optional[BinaryIO]:
+    """
+    Encodes 16-bit PCM as an in-memory FLAC file (lossless, usually ~half the size of WAV).
+
+    Returns:
+        Optional[BinaryIO]: The FLAC file, or None if the optional `soundfile` package is not installed.
+    """
+    try:
+        import soundfile
+    except (ImportError, OSError):
+        return None
+
+    buffer = BytesIO()
+    soundfile.write(buffer, pcm, fs, format="FLAC", subtype="PCM_16")
+    buffer.seek(0)
+    buffer.name = "recording.flac"
+    return buffer
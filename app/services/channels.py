@@ -0,0 +1,65 @@
+from typing import Any, Sequence
+
+from langgraph.channels.base import BaseChannel
+from typing_extensions import Self
+
+
+class AppendOnlyList(BaseChannel[list, list, list]):
+    """
+    Append-only LangGraph channel for message histories.
+
+    Updates extend the stored list in place, so a node appending a message costs O(new messages)
+    whatever the size of the history. Reducers like `operator.add` or `add_messages` rebuild the
+    whole list on every update, which adds up to quadratic work as conversations grow.
+
+    The list is only copied when LangGraph needs an independent value: `copy()` and
+    `checkpoint()` (which is only called when the graph has a checkpointer) return snapshots.
+
+    Usage: `messages: Annotated[list, AppendOnlyList]`.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, typ: Any = list):
+        super().__init__(typ)
+        self.value: list = []
+
+    def __eq__(self, value: object) -> bool:
+        return isinstance(value, AppendOnlyList)
+
+    @property
+    def ValueType(self) -> type[list]:
+        return list
+
+    @property
+    def UpdateType(self) -> type[list]:
+        return list
+
+    def copy(self) -> Self:
+        empty = self.__class__(self.typ)
+        empty.key = self.key
+        empty.value = list(self.value)
+        return empty
+
+    def from_checkpoint(self, checkpoint: Any) -> Self:
+        empty = self.__class__(self.typ)
+        empty.key = self.key
+        if isinstance(checkpoint, list):
+            empty.value = list(checkpoint)
+        return empty
+
+    def update(self, values: Sequence[list]) -> bool:
+        if not values:
+            return False
+        for value in values:
+            self.value.extend(value)
+        return True
+
+    def get(self) -> list:
+        return self.value
+
+    def is_available(self) -> bool:
+        return True
+
+    def checkpoint(self) -> list:
+        return list(self.value)
@@ -0,0 +1,119 @@
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional
+
+import typer
+
+from app.config import config
+
+
+def new_run_id(graph: str) -> str:
+    """
+    Run (LangGraph thread) ids are prefixed with the graph name, so `notast resume` knows which graph to rebuild.
+    """
+    return f"{graph}-{uuid.uuid4().hex[:12]}"
+
+
+def graph_of_run(run_id: str) -> str:
+    return run_id.split("-", 1)[0]
+
+
+def run_config(run_id: str) -> dict[str, Any]:
+    return {"configurable": {"thread_id": run_id}}
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[Optional[Any]]:
+    """
+    Opens the local SQLite LangGraph checkpointer, or yields None when checkpoints are disabled.
+
+    The graph saves its state after every node, so a run failing in `call_llm` or in the upload
+    continues from the last completed node (`notast resume <run-id>`) instead of recording and
+    transcribing again. The database uses WAL with `synchronous=NORMAL` (no fsync per commit),
+    and runs use the "async" durability, the checkpoint of a node is written while the next
+    one runs, which keeps the per-node overhead small (see `benchmarks/bench_checkpoints.py`).
+    """
+    if not config.CHECKPOINTS_ENABLED:
+        yield None
+        return
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    path = Path(config.CHECKPOINTS_PATH).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(str(path)) as checkpointer:
+        await checkpointer.setup()
+        await checkpointer.conn.execute("PRAGMA synchronous=NORMAL")
+        yield checkpointer
+
+
+async def latest_run_ids(checkpointer, limit: int = 20) -> List[str]:
+    """
+    Ids of the runs that still have checkpoints, most recent first.
+    """
+    run_ids: List[str] = []
+    async for checkpoint in checkpointer.alist(None):
+        run_id = checkpoint.config["configurable"]["thread_id"]
+        if run_id not in run_ids:
+            run_ids.append(run_id)
+            if len(run_ids) == limit:
+                break
+    return run_ids
+
+
+def graph_runner(graph: str):
+    """
+    Returns the (build, run) functions of a graph name used in run ids.
+    """
+    if graph == "idea":
+        from .agent import build_graph, run_idea_graph
+
+        return build_graph, run_idea_graph
+    if graph == "mmm":
+        from .mmm_agent import build_mmm_graph, run_mmm_graph
+
+        return build_mmm_graph, run_mmm_graph
+    raise ValueError(f"Unknown graph {graph!r}")
+
+
+async def list_runs(limit: int = 20) -> List[dict[str, Any]]:
+    """
+    The unfinished runs with the nodes they will continue from.
+    """
+    async with open_checkpointer() as checkpointer:
+        if checkpointer is None:
+            return []
+
+        runs = []
+        for run_id in await latest_run_ids(checkpointer, limit=limit):
+            build, _ = graph_runner(graph_of_run(run_id))
+            snapshot = await build(checkpointer).aget_state(run_config(run_id))
+            runs.append({"run_id": run_id, "next": list(snapshot.next), "created_at": snapshot.created_at})
+        return runs
+
+
+async def resume_run(run_id: str):
+    """
+    Continues a run from its last completed node, the nodes already done are not run again.
+
+    Returns:
+        The final state, or None when the run could not be resumed or failed again.
+    """
+    build, run = graph_runner(graph_of_run(run_id))
+    async with open_checkpointer() as checkpointer:
+        if checkpointer is None:
+            typer.secho("❌ Checkpoints are disabled (CHECKPOINTS_ENABLED).", fg=typer.colors.RED, err=True)
+            return None
+
+        app = build(checkpointer)
+        snapshot = await app.aget_state(run_config(run_id))
+        if not snapshot.values:
+            typer.secho(f"❌ No checkpoint found for run {run_id}.", fg=typer.colors.RED, err=True)
+            return None
+        if not snapshot.next:
+            typer.secho(f"✅ Run {run_id} already finished.", fg=typer.colors.GREEN)
+            return snapshot.values
+
+        typer.echo(f"--- Resuming run {run_id} at {', '.join(snapshot.next)} ---")
+        return await run(app, None, run_id)
@@ -0,0 +1,371 @@
+import asyncio
+import io
+import json
+import os
+import signal
+import sys
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import typer
+
+# Only light imports here: the CLI imports this module to forward its commands, the heavy
+# services are imported when the daemon starts.
+
+DEFAULT_SOCKET = "~/.local/share/notast/notast.sock"
+
+
+def socket_path() -> Path:
+    """
+    The Unix socket of `notast serve`, `DAEMON_SOCKET` in the environment overrides the default.
+
+    It is not a `Config` setting: forwarding a command must not pay for loading the settings.
+    """
+    return Path(os.environ.get("DAEMON_SOCKET", DEFAULT_SOCKET)).expanduser()
+
+
+class DaemonAlreadyRunning(RuntimeError):
+    pass
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# ----------------------------
+# Server
+# ----------------------------
+class Job:
+    """
+    A command run by the daemon for a client: what it prints and its key presses go through the client's connection.
+
+    Messages are JSON lines. The client sends `{"command", "options", "color"}` then `{"event": "key"}`
+    when a key is pressed, the daemon answers with `{"stream", "text"}` output, `{"listen_key": true}`
+    when a recording starts and a final `{"exit_code"}`.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, color: bool):
+        self.writer = writer
+        self.color = color
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.key_pressed: Optional[asyncio.Event] = None
+
+    def send(self, message: Dict[str, Any]):
+        # Jobs also print from worker threads (`asyncio.to_thread`), the writer belongs to the loop.
+        if threading.get_ident() == self.loop_thread:
+            self._write(encode(message))
+        else:
+            self.loop.call_soon_threadsafe(self._write, encode(message))
+
+    def _write(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def listen_for_key(self) -> asyncio.Event:
+        """
+        Asks the client to watch its terminal, the returned event is set when the user presses a key.
+        """
+        self.key_pressed = asyncio.Event()
+        self.send({"listen_key": True})
+        return self.key_pressed
+
+
+current_job: ContextVar[Optional[Job]] = ContextVar("notast_current_job", default=None)
+
+
+class JobOutput(io.TextIOBase):
+    """
+    Replaces `sys.stdout`/`sys.stderr` in the daemon: text printed inside a job is sent to its client.
+
+    The job is found through a context variable, so concurrent jobs never mix their output. Text
+    printed outside of a job goes to the daemon's own stream.
+    """
+
+    def __init__(self, name: str, fallback: io.TextIOBase):
+        self.name = name
+        self.fallback = fallback
+
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+    @property
+    def errors(self) -> str:
+        return "strict"
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        job = current_job.get()
+        if job is None:
+            return self.fallback.write(text)
+        if text:
+            job.send({"stream": self.name, "text": text})
+        return len(text)
+
+    def flush(self):
+        if current_job.get() is None:
+            self.fallback.flush()
+
+    def isatty(self) -> bool:
+        # Typer strips the colors when the output is not a terminal: follow the client's terminal.
+        job = current_job.get()
+        return job.color if job is not None else self.fallback.isatty()
+
+    def fileno(self) -> int:
+        return self.fallback.fileno()
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[int]]
+
+
+class Daemon:
+    """
+    Serves the CLI commands from one long-lived process.
+
+    The compiled graphs, the Gemini model, the ElevenLabs clients, the Notion connection pool, the
+    idea index and the checkpointer are built once, so a forwarded command only pays for its network calls. Every
+    connection is a job, jobs run concurrently on the same event loop. With a `trace_file`, the
+    spans are exported after every job instead of piling up until the daemon stops.
+    """
+
+    def __init__(self, checkpointer=None, trace_file: Optional[str] = None, trace_format: str = "jsonl"):
+        from .agent import build_graph
+        from .eleven_labs import get_elevenlabs
+        from .idea_index import get_idea_index
+        from .llm import get_model
+        from .mmm_agent import build_mmm_batch_graph, build_mmm_graph
+
+        self.idea_graph = build_graph(checkpointer)
+        self.mmm_graph = build_mmm_graph(checkpointer)
+        self.mmm_batch_graph = build_mmm_batch_graph()
+        get_model()
+        get_elevenlabs()
+        get_idea_index()
+
+        self.trace_file = trace_file
+        self.trace_format = trace_format
+        self.handlers: Dict[str, JobHandler] = {
+            "record-idea": self.record_idea,
+            "mmm": self.mmm,
+            "ingest": self.ingest,
+        }
+        self.active_jobs = 0
+        self.served_jobs = 0
+        self.stopped = asyncio.Event()
+
+    async def record_idea(self, options: Dict[str, Any]) -> int:
+        from .agent import run_new_idea
+
+        final_state = await run_new_idea(self.idea_graph)
+        return 1 if final_state is None or final_state.get("error") else 0
+
+    async def mmm(self, options: Dict[str, Any]) -> int:
+        from app.config import config
+        from .mmm_agent import run_mmm_batch_graph_agent, run_new_mmm
+
+        topics, count = options["topics"], options["count"]
+        if len(topics) == 1 and count == 1:
+            final_state = await run_new_mmm(self.mmm_graph, topics[0])
+            return 1 if final_state is None else 0
+
+        final_state = await run_mmm_batch_graph_agent(
+            topics,
+            quotes_per_topic=count,
+            concurrency=options["concurrency"] or config.MMM_CONCURRENCY,
+            app=self.mmm_batch_graph,
+        )
+        return 1 if final_state["errors"] else 0
+
+    async def ingest(self, options: Dict[str, Any]) -> int:
+        from .ingest import echo_summary, ingest_directory
+
+        summary = await ingest_directory(
+            Path(options["directory"]),
+            pattern=options["pattern"],
+            transcription_concurrency=options["transcription_concurrency"],
+            llm_concurrency=options["llm_concurrency"],
+            notion_concurrency=options["notion_concurrency"],
+        )
+        echo_summary(summary)
+        return 1 if summary.failed else 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await reader.readline() or "{}")
+            command = request.get("command")
+            if command == "status":
+                from .llm import get_model
+
+                status = {"pid": os.getpid(), "active_jobs": self.active_jobs, "served_jobs": self.served_jobs}
+                model = get_model()
+                status.update(llm=model.router.summary(), json=model.json_stats.summary())
+                writer.write(encode({"exit_code": 0, **status}))
+            elif command == "stop":
+                writer.write(encode({"exit_code": 0}))
+                self.stopped.set()
+            elif command in self.handlers:
+                exit_code = await self.run_job(command, request, reader, writer)
+                writer.write(encode({"exit_code": exit_code}))
+            else:
+                writer.write(encode({"stream": "stderr", "text": f"Unknown command: {command}\n"}))
+                writer.write(encode({"exit_code": 2}))
+            await writer.drain()
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def run_job(
+        self, command: str, request: Dict[str, Any], reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> int:
+        from app.config import config
+        from .recording_capabilities import remote_key_listener
+        from .tracing import export_spans
+
+        options = request.get("options", {})
+        job = Job(writer, color=request.get("color", False))
+        settings = {}
+        if options.get("no_cache"):
+            settings["LLM_CACHE_ENABLED"] = False
+        if options.get("stream"):
+            settings["LLM_STREAMING"] = True
+
+        async def read_events():
+            while line := await reader.readline():
+                if json.loads(line).get("event") == "key" and job.key_pressed is not None:
+                    job.key_pressed.set()
+            # The client went away: stop a recording in progress, the job still completes.
+            if job.key_pressed is not None:
+                job.key_pressed.set()
+
+        events = asyncio.create_task(read_events())
+        current_job.set(job)
+        remote_key_listener.set(job.listen_for_key)
+        self.active_jobs += 1
+        try:
+            with config.override(**settings):
+                return await self.handlers[command](options)
+        except Exception as err:
+            typer.secho(f"❌ {command} failed: {err}", fg=typer.colors.RED, err=True)
+            return 1
+        finally:
+            self.active_jobs -= 1
+            self.served_jobs += 1
+            events.cancel()
+            if self.trace_file:
+                export_spans(self.trace_file, self.trace_format, config.SERVICE_NAME)
+
+
+async def serve(path: Path, trace_file: Optional[str] = None, trace_format: str = "jsonl"):
+    """
+    Runs the daemon on the Unix socket `path` until `notast serve --stop`, SIGINT or SIGTERM.
+    """
+    from .checkpoints import open_checkpointer
+
+    if await request_daemon(path, {"command": "status"}) is not None:
+        raise DaemonAlreadyRunning(f"A daemon is already listening on {path}")
+    # Left behind by a daemon that did not stop cleanly.
+    path.unlink(missing_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    async with open_checkpointer() as checkpointer:
+        daemon = Daemon(checkpointer, trace_file, trace_format)
+        server = await asyncio.start_unix_server(daemon.handle, path=str(path))
+        os.chmod(path, 0o600)
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, daemon.stopped.set)
+
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = JobOutput("stdout", stdout), JobOutput("stderr", stderr)
+        typer.secho(f"🛰️  notast daemon listening on {path} (pid {os.getpid()})", fg=typer.colors.GREEN)
+        try:
+            async with server:
+                await daemon.stopped.wait()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+            path.unlink(missing_ok=True)
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+        typer.echo(f"👋 notast daemon stopped after {daemon.served_jobs} jobs.")
+
+
+# ----------------------------
+# Client
+# ----------------------------
+async def request_daemon(path: Path, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Sends a control request (`status`, `stop`) and returns the answer, None when no daemon is listening.
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    except OSError:
+        return None
+
+    try:
+        writer.write(encode(request))
+        line = await reader.readline()
+        return json.loads(line) if line else None
+    finally:
+        writer.close()
+
+
+async def forward_job(path: Path, command: str, options: Dict[str, Any]) -> Optional[int]:
+    """
+    Runs `command` in the daemon, printing its output here. Returns its exit code, None when no daemon is listening.
+    """
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    except OSError:
+        return None
+
+    loop = asyncio.get_running_loop()
+    listening = False
+
+    def on_key_pressed():
+        loop.call_soon_threadsafe(writer.write, encode({"event": "key"}))
+
+    writer.write(encode({"command": command, "options": options, "color": sys.stdout.isatty()}))
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            if "exit_code" in message:
+                return message["exit_code"]
+            if message.get("listen_key") and not listening and sys.stdin.isatty():
+                from .mac_input_listener import InputListener
+
+                listening = True
+                InputListener(on_key_pressed=on_key_pressed).start()
+            elif "text" in message:
+                stream = sys.stderr if message["stream"] == "stderr" else sys.stdout
+                stream.write(message["text"])
+                stream.flush()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+    # The job may have already done part of its work, it is not retried locally.
+    typer.secho("❌ Lost the connection to the notast daemon.", fg=typer.colors.RED, err=True)
+    return 1
+
+
+def forward(command: str, options: Dict[str, Any]) -> Optional[int]:
+    """
+    Runs a CLI command in `notast serve` when it is running.
+
+    Returns:
+        Optional[int]: The command's exit code, or None when no daemon is running and the command must run locally.
+    """
+    path = socket_path()
+    if not path.exists():
+        return None
+    return asyncio.run(forward_job(path, command, options))
@@ -1,29 +1,96 @@
-from elevenlabs.client import ElevenLabs
+from typing import BinaryIO, Optional
+
+from elevenlabs.client import AsyncElevenLabs
 
 from app.config import config
+from .tracing import tracer
+from .transcript import Transcript
+from .transcript_cache import TranscriptCache, get_transcript_cache
+
+LANGUAGE_CODE = "eng"  # Lang of the audio file. If set to None, model will detect the lang automatically.
+DIARIZE = True  # Whether to annotate who is speaking
+TAG_AUDIO_EVENTS = False  # Tag audio events like laughter, applause, etc.
+
+
+def transcription_settings() -> dict:
+    """
+    The speech-to-text settings, read on every call so `config.override` applies.
+    """
+    return {
+        "model_id": config.ELEVEN_LABS_MODEL,
+        "language_code": LANGUAGE_CODE,
+        "diarize": DIARIZE,
+        "tag_audio_events": TAG_AUDIO_EVENTS,
+    }
 
 
 class ElevenLabsManager:
     """ElevenLabs service manager."""
 
-    def __init__(self) -> None:  # noqa: D107
-        self.elevenlabs = ElevenLabs(api_key=config.ELEVEN_LABS_API_KEY)
+    def __init__(self, cache: Optional[TranscriptCache] = None) -> None:  # noqa: D107
+        self.async_elevenlabs = AsyncElevenLabs(api_key=config.ELEVEN_LABS_API_KEY)
+        if cache is None and config.TRANSCRIPT_CACHE_ENABLED:
+            cache = get_transcript_cache()
+        self.cache = cache
 
-    def convert_speech_to_text(self, audio: bytes) -> str:
-        """Receives an audio and return the text.
+    async def aconvert_speech_to_text(self, audio: BinaryIO) -> Transcript:
+        """Receives an audio and returns its transcript, with the words, timestamps and speakers.
+
+        When the transcript cache is enabled, audio that was already transcribed with the same
+        settings is answered from disk without calling ElevenLabs.
 
         Args:
-            audio: The audio bytes to convert to text.
+            audio: The audio file (in-memory WAV) to convert to text.
 
         Returns:
-            str: The transcribed text from the audio.
+            Transcript: The diarized transcript of the audio.
         """
-        transcription = self.elevenlabs.speech_to_text.convert(
-            file=audio,
-            model_id=config.ELEVEN_LABS_MODEL,
-            tag_audio_events=False,  # Tag audio events like laughter, applause, etc.
-            language_code="eng",  # Lang of the audio file. If set to None, model will detect the lang automatically.
-            diarize=True,  # Whether to annotate who is speaking
-        )
-
-        return transcription.text
+        settings = transcription_settings()
+        with tracer.span("elevenlabs.transcribe", model=settings["model_id"]) as span:
+            key = self._cache_key(audio, settings)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    span.set(cache_hit=True)
+                    return Transcript.from_dict(cached)
+
+            span.set(cache_hit=False, upload_bytes=len(read_audio_bytes(audio)))
+            transcription = await self.async_elevenlabs.speech_to_text.convert(file=audio, **settings)
+            transcript = Transcript.from_elevenlabs(transcription)
+            span.set(characters=len(transcript.text), words=len(transcript), speakers=transcript.speaker_count)
+
+            if key is not None:
+                self.cache.put(key, transcript.to_dict(), **settings)
+
+            return transcript
+
+    def _cache_key(self, audio: BinaryIO, settings: dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return TranscriptCache.make_key(read_audio_bytes(audio), **settings)
+
+
+def read_audio_bytes(audio: BinaryIO) -> bytes | memoryview:
+    """
+    Returns the content of an audio file object, leaving its position at the start for the upload.
+    """
+    if hasattr(audio, "getbuffer"):
+        return audio.getbuffer()
+
+    position = audio.tell()
+    data = audio.read()
+    audio.seek(position)
+    return data
+
+
+_manager: Optional[ElevenLabsManager] = None
+
+
+def get_elevenlabs() -> ElevenLabsManager:
+    """
+    Returns the shared `ElevenLabsManager`, so every transcription reuses the same SDK clients (and connections).
+    """
+    global _manager
+    if _manager is None:
+        _manager = ElevenLabsManager()
+    return _manager
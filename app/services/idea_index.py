@@ -0,0 +1,271 @@
+import json
+import re
+import sqlite3
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import config
+
+# Hashed feature vectors, stored as float16: 2 KB per idea.
+VECTOR_DIM = 1024
+VECTOR_DTYPE = np.float16
+SEARCH_BLOCK_ROWS = 65536  # rows converted to float32 at a time while scoring
+INITIAL_CAPACITY = 1024
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+|\d+")
+# Common English words, shared by any two texts: without them unrelated ideas score ~0.4 instead of ~0.2.
+STOPWORDS = frozenset(
+    """
+    a an the and or but if of to in on at by for with from as is are was were be been being it its this
+    that these those i you we they he she my your our their me us them so not no do does did have has had
+    can could would should will just than then there here what which who when where how all any each
+    every some such into over about up down out off too very also only own same more most other after
+    before again once while
+    """.split()
+)
+
+
+def features(text: str) -> List[str]:
+    """
+    The n-grams of a text: words, word bigrams and character trigrams of every word, stopwords left out.
+
+    The trigrams make rephrasings and inflections ("recording", "recorded") still share features.
+    """
+    words = [word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+    grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        grams += [padded[start : start + 3] for start in range(len(padded) - 2)]
+    return grams
+
+
+def embed(title: str, paragraphs: Sequence[str], dim: int = VECTOR_DIM) -> np.ndarray:
+    """
+    Hashed n-gram vector of an idea (feature hashing with a sign bit, log-scaled counts), L2-normalized.
+
+    The title is counted twice, it summarizes the page. The dot product of two vectors is their cosine similarity.
+    """
+    grams = features(title) * 2 + features(" ".join(paragraphs))
+    if not grams:
+        return np.zeros(dim, dtype=np.float32)
+
+    hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint32, count=len(grams))
+    signs = np.where(hashes >> 31, -1.0, 1.0)
+    counts = np.bincount(hashes % dim, weights=signs, minlength=dim)
+    vector = np.sign(counts) * np.log1p(np.abs(counts))
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+@dataclass
+class IndexMatch:
+    row: int
+    score: float
+    title: str
+    paragraphs: List[str]
+    page_id: Optional[str]  # None while the page waits in the outbox
+    created_at: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class IdeaIndex:
+    """
+    Local index of the ideas uploaded into Notion, for near-duplicate checks and `notast search`.
+
+    Every idea is a row of a SQLite table (title, paragraphs, Notion page id) and a hashed n-gram
+    vector (`embed`) in a memory-mapped float16 matrix next to it, row `i` of the matrix being the
+    idea with `row = i`. A search scores every vector with one matrix-vector product, block by
+    block, so only the touched pages of the file are read and no model or network call is needed.
+
+    The matrix file grows by doubling. The row numbers are allocated by SQLite, so several
+    processes (the CLI, the daemon, the outbox worker) can write to the same index.
+    """
+
+    def __init__(self, directory: Path, dim: int = VECTOR_DIM):
+        self.directory = Path(directory).expanduser()
+        self.dim = dim
+        self.vectors_path = self.directory / "vectors.f16"
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+
+    def add(
+        self,
+        title: str,
+        paragraphs: List[str],
+        page_id: Optional[str] = None,
+        outbox_key: Optional[str] = None,
+    ) -> int:
+        """
+        Indexes an idea, `outbox_key` links it to its queued page until the page id is known. Returns its row.
+        """
+        vector = embed(title, paragraphs, self.dim)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM ideas").fetchone()[0]
+                conn.execute(
+                    "INSERT INTO ideas (row, page_id, outbox_key, title, paragraphs, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (row, page_id, outbox_key, title, json.dumps(paragraphs, ensure_ascii=False), time.time()),
+                )
+                vectors = self._map(row + 1, grow=True)
+                vectors[row] = vector
+                vectors.flush()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def set_page_id(self, outbox_key: str, page_id: str):
+        """
+        Records the page id of an idea indexed while its page was queued in the outbox.
+        """
+        with self._lock:
+            self._connect().execute(
+                "UPDATE ideas SET page_id = ? WHERE outbox_key = ? AND page_id IS NULL", (page_id, outbox_key)
+            )
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[IndexMatch]:
+        return self.search_vector(embed(query, [], self.dim), limit, min_score)
+
+    def nearest(self, title: str, paragraphs: List[str]) -> Optional[IndexMatch]:
+        """
+        The indexed idea most similar to a page, None when the index is empty.
+        """
+        matches = self.search_vector(embed(title, paragraphs, self.dim), limit=1)
+        return matches[0] if matches else None
+
+    def search_vector(self, query: np.ndarray, limit: int = 5, min_score: float = 0.0) -> List[IndexMatch]:
+        """
+        The `limit` ideas most similar to `query`, best first, keeping the best row of every page.
+        """
+        with self._lock:
+            count = self._count()
+            if not count or limit < 1:
+                return []
+            vectors = self._map(count)
+            scores = np.empty(count, dtype=np.float32)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                stop = min(count, start + SEARCH_BLOCK_ROWS)
+                scores[start:stop] = vectors[start:stop].astype(np.float32) @ query
+
+            # An idea appended to a page shares its page id: fetch a few more rows than asked.
+            k = min(count, limit * 4)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = top[scores[top] > min_score].tolist()
+            if not top:
+                return []
+            rows = self._connect().execute(
+                f"SELECT row, title, paragraphs, page_id, created_at FROM ideas WHERE row IN ({','.join('?' * len(top))})",
+                top,
+            ).fetchall()
+
+        by_row = {row[0]: row for row in rows}
+        matches: List[IndexMatch] = []
+        seen_pages = set()
+        for row in top:
+            if row not in by_row:
+                continue
+            _, title, paragraphs, page_id, created_at = by_row[row]
+            if page_id is not None and page_id in seen_pages:
+                continue
+            seen_pages.add(page_id)
+            matches.append(IndexMatch(row, float(scores[row]), title, json.loads(paragraphs), page_id, created_at))
+            if len(matches) == limit:
+                break
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._count()
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        return {"ideas": count, "vectors_bytes": size, "dim": self.dim}
+
+    def close(self):
+        with self._lock:
+            self._vectors = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _count(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(row) + 1, 0) FROM ideas").fetchone()[0]
+
+    def _map(self, rows: int, grow: bool = False) -> np.memmap:
+        """
+        The vectors matrix covering at least `rows` rows. It is mapped again when another process grew
+        the file, and the writer (`grow`) doubles the file when it is full.
+        """
+        if self._vectors is not None and len(self._vectors) >= rows:
+            return self._vectors
+
+        row_bytes = self.dim * np.dtype(VECTOR_DTYPE).itemsize
+        capacity = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        if capacity < rows:
+            if not grow:
+                raise RuntimeError(f"The idea index {self.vectors_path} has fewer vectors than ideas, it is corrupted.")
+            capacity = max(rows, capacity * 2, INITIAL_CAPACITY)
+            with self.vectors_path.open("ab") as f:
+                f.truncate(capacity * row_bytes)  # sparse zeros, a zero vector never matches
+
+        self._vectors = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode="r+", shape=(capacity, self.dim))
+        return self._vectors
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.directory / "ideas.sqlite3", isolation_level=None, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ideas (
+                    row INTEGER PRIMARY KEY,
+                    page_id TEXT,
+                    outbox_key TEXT,
+                    title TEXT NOT NULL,
+                    paragraphs TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ideas_outbox_key ON ideas (outbox_key)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+            stored_dim = int(conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0])
+            if stored_dim != self.dim:
+                conn.close()
+                raise RuntimeError(f"The idea index in {self.directory} has {stored_dim} dimensions, not {self.dim}.")
+            self._conn = conn
+        return self._conn
+
+
+_index: Optional[IdeaIndex] = None
+
+
+def get_idea_index() -> IdeaIndex:
+    """
+    The index of `INDEX_DIR`, shared by the whole process (it keeps the vectors mapped).
+    """
+    global _index
+    if _index is None:
+        _index = IdeaIndex(Path(config.INDEX_DIR))
+    return _index
+
+
+def index_page(title: str, paragraphs: List[str], page_id: Optional[str] = None, outbox_key: Optional[str] = None):
+    """
+    Adds an uploaded (or queued) page to the index, when `INDEX_ENABLED`.
+    """
+    if config.INDEX_ENABLED:
+        get_idea_index().add(title, paragraphs, page_id=page_id, outbox_key=outbox_key)
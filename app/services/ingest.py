@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import typer
+
+from app.schemas import NotionPageData
+from .eleven_labs import ElevenLabsManager, get_elevenlabs
+from .idea_index import index_page
+from .summarize import needs_map_reduce, structure_long_transcript
+from .transcript import Transcript
+from .llm import get_model
+from .notion import NotionPageWriter, error_text
+from .prompts import notion_assistant_prompt, notion_user_prompt
+from .recording_capabilities import load_wav_file, restore_timestamps
+
+MANIFEST_NAME = ".notast-ingest.jsonl"
+
+
+class IngestManifest:
+    """
+    Append-only JSON lines log of the files processed by `notast ingest`.
+
+    Every finished file is written (and fsync'ed) as soon as it completes, so re-running the
+    command after a crash skips everything already uploaded. A file is identified by its name,
+    size and modification time, so an edited memo is processed again. A file whose page was
+    created but not completed keeps the page id and what was left to write (`upload`), so the
+    next run finishes that page instead of creating a second one.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash in the middle of a write leaves a truncated last line.
+                        continue
+                    self.entries[entry["key"]] = entry
+
+    @staticmethod
+    def file_key(path: Path) -> str:
+        stat = path.stat()
+        return f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def is_done(self, key: str) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry["status"] == "done"
+
+    def partial_upload(self, key: str) -> Optional[dict]:
+        """
+        The entry of a file whose Notion page is incomplete, None when there is nothing to resume.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry["status"] == "failed" and entry.get("page_id") and entry.get("upload"):
+            return entry
+        return None
+
+    def record(
+        self,
+        key: str,
+        file: str,
+        status: str,
+        page_id: Optional[str] = None,
+        error: Optional[str] = None,
+        upload: Optional[dict] = None,
+    ):
+        entry = {
+            "key": key,
+            "file": file,
+            "status": status,
+            "page_id": page_id,
+            "error": error,
+            "upload": upload,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.entries[key] = entry
+
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@dataclass
+class IngestSummary:
+    total: int = 0
+    skipped: int = 0
+    done: int = 0
+    failed: List[str] = field(default_factory=list)
+
+
+def echo_summary(summary: IngestSummary):
+    typer.secho(
+        f"\n📊 {summary.done} ingested, {summary.skipped} skipped, {len(summary.failed)} failed.",
+        fg=typer.colors.RED if summary.failed else typer.colors.GREEN,
+    )
+
+
+async def transcribe_file(path: Path, elevenlabs: ElevenLabsManager) -> Transcript:
+    audio_buffer, vad = await asyncio.to_thread(load_wav_file, path)
+    return restore_timestamps(await elevenlabs.aconvert_speech_to_text(audio=audio_buffer), vad)
+
+
+async def structure_transcript(transcript: Transcript) -> NotionPageData:
+    if needs_map_reduce(transcript):
+        return await structure_long_transcript(transcript)
+
+    user_prompt = notion_user_prompt(user_input=transcript.for_prompt(), speakers=transcript.speaker_count)
+    messages = [notion_assistant_prompt, user_prompt]
+    return await get_model().llm_structure_notion_response.ainvoke(messages)
+
+
+async def ingest_directory(
+    directory: Path,
+    pattern: str = "*.wav",
+    transcription_concurrency: int = 4,
+    llm_concurrency: int = 4,
+    notion_concurrency: int = 2,
+) -> IngestSummary:
+    """
+    Pushes every WAV file of a directory into Notion.
+
+    Each file goes through transcription -> LLM structuring -> Notion upload. Files run
+    concurrently, each stage bounded by its own semaphore so a slow stage does not flood
+    the others. A failing file is recorded in the manifest and does not stop the rest, its
+    incomplete Notion page is finished by the next run.
+
+    Args:
+        directory (Path): Folder with the voice memos.
+        pattern (str): Glob used to select the audio files.
+        transcription_concurrency (int): Max concurrent ElevenLabs transcriptions.
+        llm_concurrency (int): Max concurrent LLM calls.
+        notion_concurrency (int): Max concurrent Notion uploads.
+
+    Returns:
+        IngestSummary: Counts of processed, skipped and failed files.
+    """
+    manifest = IngestManifest(directory / MANIFEST_NAME)
+    elevenlabs = get_elevenlabs()
+    transcription_slots = asyncio.Semaphore(transcription_concurrency)
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    notion_slots = asyncio.Semaphore(notion_concurrency)
+
+    files = sorted(path for path in directory.glob(pattern) if path.is_file())
+    summary = IngestSummary(total=len(files))
+    pending = []
+    for path in files:
+        key = IngestManifest.file_key(path)
+        if manifest.is_done(key):
+            summary.skipped += 1
+        else:
+            pending.append((path, key))
+
+    typer.secho(
+        f"📂 {summary.total} files found, {summary.skipped} already ingested, {len(pending)} to process.",
+        fg=typer.colors.BRIGHT_BLUE,
+    )
+
+    async def process(path: Path, key: str):
+        partial = manifest.partial_upload(key)
+        upload = partial["upload"] if partial else None
+        writer = NotionPageWriter()
+        try:
+            if partial is None:
+                async with transcription_slots:
+                    transcript = await transcribe_file(path, elevenlabs)
+                if not transcript.text or not transcript.text.strip():
+                    raise ValueError("Transcription is empty")
+
+                async with llm_slots:
+                    page_data = await structure_transcript(transcript)
+                if page_data is None:
+                    raise ValueError("LLM response could not be parsed")
+
+                upload = {"page": page_data.model_dump(), "paragraphs": page_data.text + transcript.speaker_section()}
+                async with notion_slots:
+                    await writer.create(title=page_data.title, paragraphs=upload["paragraphs"], emoji=page_data.icon)
+            else:
+                # The page of a previous run is incomplete: append what is missing, nothing is generated again.
+                page_data = NotionPageData(**upload["page"])
+                writer = NotionPageWriter(page={"id": partial["page_id"]}, blocks_written=upload["blocks_written"])
+                async with notion_slots:
+                    await writer.append(upload["paragraphs"], skip_blocks=writer.blocks_written)
+        except Exception as err:
+            manifest.record(
+                key,
+                path.name,
+                "failed",
+                page_id=writer.page_id,
+                error=error_text(err),
+                upload={**upload, "blocks_written": writer.blocks_written} if writer.page_id else None,
+            )
+            summary.failed.append(path.name)
+            typer.secho(
+                f"[{summary.done + len(summary.failed)}/{len(pending)}] ❌ {path.name}: {err}",
+                fg=typer.colors.RED,
+                err=True,
+            )
+            return
+
+        manifest.record(key, path.name, "done", page_id=writer.page_id)
+        index_page(page_data.title, page_data.text, page_id=writer.page_id)
+        summary.done += 1
+        typer.secho(
+            f"[{summary.done + len(summary.failed)}/{len(pending)}] ✅ {path.name} -> {page_data.title}",
+            fg=typer.colors.GREEN,
+        )
+
+    await asyncio.gather(*(process(path, key) for path, key in pending))
+    return summary
@@ -0,0 +1,145 @@
+import json
+import typing
+from typing import Any, Dict, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from .tracing import tracer
+
+
+class JsonRepairStats:
+    """
+    Outcomes of the JSON answers parsed locally.
+
+    `parsed`: valid as returned, `repaired`: valid after `repair_json`, `retried`: unusable, so
+    the structured output call was made instead (a second round-trip).
+    """
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.retried = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {"parsed": self.parsed, "repaired": self.repaired, "retried": self.retried}
+
+
+def message_text(message: Any) -> str:
+    """
+    Text of a model message or streamed chunk, Gemini can send the content as a list of parts.
+    """
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def strip_fences(text: str) -> str:
+    """
+    Keeps the outermost JSON object of the text, dropping ```json fences and any prose around it.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    return text[start : end + 1] if start != -1 and end > start else text
+
+
+def remove_trailing_commas(text: str) -> str:
+    """
+    Drops the commas right before a closing `}` or `]`, outside of the strings.
+    """
+    out = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(char)
+    return "".join(out)
+
+
+def coerce_lists(data: Any, schema: Type[BaseModel]) -> Any:
+    """
+    Wraps a single string given for a list field (`"text": "..."`) into a one item list.
+    """
+    if not isinstance(data, dict):
+        return data
+    for name, field in schema.model_fields.items():
+        if typing.get_origin(field.annotation) is list and isinstance(data.get(name), str):
+            data[name] = [data[name]]
+    return data
+
+
+def repair_json(text: str, schema: Type[BaseModel]) -> BaseModel:
+    """
+    Validates a model answer that is not valid as is, after fixing the usual defects.
+
+    Raises `ValueError` when it cannot be repaired.
+    """
+    try:
+        data = json.loads(remove_trailing_commas(strip_fences(text)))
+        return schema.model_validate(coerce_lists(data, schema))
+    except (json.JSONDecodeError, ValidationError) as err:
+        raise ValueError(f"The answer is not a valid {schema.__name__}: {err}") from err
+
+
+def parse_structured(text: str, schema: Type[BaseModel]) -> Tuple[BaseModel, bool]:
+    """
+    Parses a JSON answer into `schema` with pydantic's native JSON parser, repairing it when needed.
+
+    Returns:
+        Tuple[BaseModel, bool]: The validated object and whether it had to be repaired.
+    """
+    try:
+        return schema.model_validate_json(text), False
+    except ValidationError:
+        return repair_json(text, schema), True
+
+
+class LocalJsonRunnable:
+    """
+    Structured output through a plain JSON mode call, parsed and validated locally.
+
+    The prompts describe the JSON object expected, the answer is validated with `parse_structured`,
+    so a slightly malformed answer (code fence, trailing comma, a string instead of a list) costs
+    nothing instead of failing the call. Only an answer that cannot be repaired goes through
+    `fallback`, the remote structured output runnable.
+    """
+
+    def __init__(self, json_runnable, fallback, schema: Type[BaseModel], stats: JsonRepairStats):
+        self.json_runnable = json_runnable
+        self.fallback = fallback
+        self.schema = schema
+        self.stats = stats
+
+    def parse(self, message: Any) -> Optional[BaseModel]:
+        with tracer.span("llm.parse_json", schema=self.schema.__name__) as span:
+            try:
+                response, repaired = parse_structured(message_text(message), self.schema)
+            except ValueError:
+                self.stats.retried += 1
+                span.set(outcome="retried")
+                return None
+            if repaired:
+                self.stats.repaired += 1
+            else:
+                self.stats.parsed += 1
+            span.set(outcome="repaired" if repaired else "parsed")
+            return response
+
+    def invoke(self, messages: Sequence[Any], *args, **kwargs):
+        response = self.parse(self.json_runnable.invoke(messages, *args, **kwargs))
+        return response if response is not None else self.fallback.invoke(messages, *args, **kwargs)
+
+    async def ainvoke(self, messages: Sequence[Any], *args, **kwargs):
+        response = self.parse(await self.json_runnable.ainvoke(messages, *args, **kwargs))
+        return response if response is not None else await self.fallback.ainvoke(messages, *args, **kwargs)
@@ -1,17 +1,53 @@
+from typing import Optional
+
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.config import config
-from app.schemas import QuoteMMM, NotionPageData
+from app.schemas import ChunkSummary, QuoteMMM, NotionPageData
+from .json_repair import JsonRepairStats, LocalJsonRunnable
+from .llm_cache import CachedStructuredLLM, get_llm_cache
+from .llm_router import LLMRouter, ModelFactory
+
+
+def gemini_model(name: str) -> ChatGoogleGenerativeAI:
+    return ChatGoogleGenerativeAI(google_api_key=config.AI_API_KEY, model=name, temperature=0)
 
 
 class LLM:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            google_api_key=config.AI_API_KEY, model=config.AI_MODEL, temperature=0
-        )
-        self.mmm_structure_llm = self.llm.with_structured_output(QuoteMMM)
-        self.llm_structure_notion_response = self.llm.with_structured_output(
-            NotionPageData
+    def __init__(self, model_factory: Optional[ModelFactory] = None):
+        self.router = LLMRouter(model_factory or gemini_model)
+        self.cache = get_llm_cache()
+        self.json_stats = JsonRepairStats()
+        self.mmm_structure_llm = self.structured("mmm", QuoteMMM)
+        self.llm_structure_notion_response = self.structured("notion", NotionPageData)
+        self.llm_summarize_chunk = self.structured("summarize_chunk", ChunkSummary)
+        # Plain JSON mode, its token stream is parsed incrementally (see streaming_page.py).
+        self.llm_stream_notion_json = self.router.model("notion").bind(response_mime_type="application/json")
+
+    def structured(self, task: str, schema) -> CachedStructuredLLM:
+        """
+        Structured output runnable of a task: the task's model tier, hedged, behind the response cache.
+
+        With `LLM_LOCAL_JSON` the answer is a JSON mode answer parsed (and repaired) locally, the
+        structured output call is only made when it cannot be repaired.
+        """
+        model = self.router.model(task)
+        runnable = model.with_structured_output(schema)
+        if config.LLM_LOCAL_JSON:
+            json_runnable = model.bind(response_mime_type="application/json")
+            runnable = LocalJsonRunnable(json_runnable, runnable, schema, self.json_stats)
+        return CachedStructuredLLM(
+            self.router.hedged(task, runnable), schema, self.router.model_name(task), self.cache
         )
 
 
-model = LLM()
+_model = None
+
+
+def get_model() -> LLM:
+    """
+    Returns the shared `LLM`, building the Gemini client on first use.
+    """
+    global _model
+    if _model is None:
+        _model = LLM()
+    return _model
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from app.config import config
+from .tracing import tracer
+
+
+class LLMResponseCache:
+    """
+    Persistent SQLite cache of validated structured LLM responses.
+
+    The model runs at `temperature=0`, so the same messages sent to the same model for the same
+    output schema give the same answer. Entries are keyed by a SHA-256 of the model name, the
+    serialized messages and the output JSON schema, and store the validated pydantic object as
+    JSON. Entries older than `ttl_seconds` are ignored and deleted, and once the cache holds more
+    than `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: int, max_entries: int):
+        self.path = Path(path).expanduser()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def make_key(model_name: str, messages: Sequence[Any], schema: Type[BaseModel]) -> str:
+        payload = {
+            "model": model_name,
+            "messages": [serialize_message(message) for message in messages],
+            "schema": schema.model_json_schema(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                self._bump_counter(conn, "misses")
+                return None
+
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._bump_counter(conn, "hits")
+
+        return schema.model_validate_json(row[0])
+
+    def put(self, key: str, value: BaseModel):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, schema, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, type(value).__name__, value.model_dump_json(), now, now),
+            )
+            conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            counters = dict(conn.execute("SELECT name, value FROM llm_cache_counters").fetchall())
+
+        return {
+            "entries": entries,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def purge(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute("DELETE FROM llm_cache").rowcount
+            conn.execute("DELETE FROM llm_cache_counters")
+
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    schema TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _bump_counter(conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO llm_cache_counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+
+def serialize_message(message: Any) -> Any:
+    if hasattr(message, "type") and hasattr(message, "content"):
+        return {"type": message.type, "content": message.content}
+    return message
+
+
+def get_llm_cache() -> LLMResponseCache:
+    return LLMResponseCache(
+        path=Path(config.CACHE_DIR) / "llm_responses.sqlite3",
+        ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+        max_entries=config.LLM_CACHE_MAX_ENTRIES,
+    )
+
+
+class CachedStructuredLLM:
+    """
+    Wraps a `with_structured_output` runnable with a `LLMResponseCache`.
+
+    It exposes the same `invoke`/`ainvoke` calls as the wrapped runnable. The cache is skipped when
+    `config.LLM_CACHE_ENABLED` is off (e.g. `--no-cache` on the CLI).
+    """
+
+    def __init__(self, runnable, schema: Type[BaseModel], model_name: str, cache: LLMResponseCache):
+        self.runnable = runnable
+        self.schema = schema
+        self.model_name = model_name
+        self.cache = cache
+
+    def lookup(self, messages: Sequence[Any]) -> Optional[BaseModel]:
+        """
+        Returns the cached response for these messages without calling the model.
+        """
+        if not config.LLM_CACHE_ENABLED:
+            return None
+        return self.cache.get(LLMResponseCache.make_key(self.model_name, messages, self.schema), self.schema)
+
+    def store(self, messages: Sequence[Any], response: BaseModel):
+        """
+        Caches a response obtained outside of `invoke`/`ainvoke` (e.g. a parsed token stream).
+        """
+        if config.LLM_CACHE_ENABLED and isinstance(response, self.schema):
+            self.cache.put(LLMResponseCache.make_key(self.model_name, messages, self.schema), response)
+
+    def invoke(self, messages: Sequence[Any], *args, **kwargs):
+        with llm_span("llm.structured_output", model=self.model_name, schema=self.schema.__name__) as span:
+            if not config.LLM_CACHE_ENABLED:
+                return self.runnable.invoke(messages, *args, **kwargs)
+
+            key = LLMResponseCache.make_key(self.model_name, messages, self.schema)
+            cached = self.cache.get(key, self.schema)
+            span.set(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+
+            response = self.runnable.invoke(messages, *args, **kwargs)
+            if isinstance(response, self.schema):
+                self.cache.put(key, response)
+            return response
+
+    async def ainvoke(self, messages: Sequence[Any], *args, **kwargs):
+        with llm_span("llm.structured_output", model=self.model_name, schema=self.schema.__name__) as span:
+            if not config.LLM_CACHE_ENABLED:
+                return await self.runnable.ainvoke(messages, *args, **kwargs)
+
+            key = LLMResponseCache.make_key(self.model_name, messages, self.schema)
+            cached = self.cache.get(key, self.schema)
+            span.set(cache_hit=cached is not None)
+            if cached is not None:
+                return cached
+
+            response = await self.runnable.ainvoke(messages, *args, **kwargs)
+            if isinstance(response, self.schema):
+                self.cache.put(key, response)
+            return response
+
+
+@contextmanager
+def llm_span(name: str, **attributes: Any):
+    """
+    Span around model calls, it also records the input/output tokens the calls report.
+    """
+    with tracer.span(name, **attributes) as span:
+        if not tracer.enabled:
+            yield span
+            return
+
+        from langchain_core.callbacks import get_usage_metadata_callback
+
+        with get_usage_metadata_callback() as usage:
+            yield span
+        for metadata in usage.usage_metadata.values():
+            span.add(input_tokens=metadata.get("input_tokens", 0), output_tokens=metadata.get("output_tokens", 0))
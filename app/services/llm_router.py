@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import config
+from .tracing import tracer
+
+# Builds the chat model of a model name, e.g. `ChatGoogleGenerativeAI` or a local fake.
+ModelFactory = Callable[[str], Any]
+
+
+class LatencyStats:
+    """
+    Rolling window of the latencies of one model on one task, and counters of its hedged requests.
+    """
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.hedged = 0
+        self.hedge_wins = 0  # hedged requests answered first by the backup
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        return float(np.percentile(self.latencies, q)) if self.latencies else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+
+class HedgedRunnable:
+    """
+    Wraps a model runnable: a request slower than the model's usual latency gets a backup request.
+
+    Once the first request has run for the `LLM_HEDGE_PERCENTILE` latency of the recent requests
+    (`LLM_HEDGE_DELAY_SECONDS` until `LLM_HEDGE_MIN_SAMPLES` are known), the same request is sent
+    again and whichever answers first is used, the other one is cancelled. Only the slowest ~5%
+    of the requests are sent twice, which trims the tail latency of a provider having a slow
+    moment. A failed request is covered by the other one when it succeeds.
+
+    `invoke` (sync) is not hedged, only timed.
+    """
+
+    def __init__(self, runnable, stats: LatencyStats):
+        self.runnable = runnable
+        self.stats = stats
+
+    def hedge_delay(self) -> Optional[float]:
+        if not config.LLM_HEDGING_ENABLED:
+            return None
+        if len(self.stats.latencies) < config.LLM_HEDGE_MIN_SAMPLES:
+            return config.LLM_HEDGE_DELAY_SECONDS
+        return self.stats.percentile(config.LLM_HEDGE_PERCENTILE)
+
+    def invoke(self, messages: Sequence[Any], *args, **kwargs):
+        self.stats.requests += 1
+        start = time.perf_counter()
+        try:
+            response = self.runnable.invoke(messages, *args, **kwargs)
+        except Exception:
+            self.stats.errors += 1
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return response
+
+    async def ainvoke(self, messages: Sequence[Any], *args, **kwargs):
+        self.stats.requests += 1
+        start = time.perf_counter()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self.runnable.ainvoke(messages, *args, **kwargs))
+        pending = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.stats.hedged += 1
+                    with tracer.span("llm.hedge", delay_s=round(delay, 3)):
+                        pending.add(asyncio.ensure_future(self.runnable.ainvoke(messages, *args, **kwargs)))
+
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    self.stats.record(time.perf_counter() - start)
+                    self.stats.hedge_wins += task is not primary
+                    return task.result()
+            self.stats.errors += 1
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class LLMRouter:
+    """
+    Picks the model of every task and keeps the latency stats hedging relies on.
+
+    Tasks are mapped to a tier by `LLM_TASK_TIERS` and a tier to a model by `AI_MODEL_FAST` /
+    `AI_MODEL_HEAVY` (`AI_MODEL` when unset), so the short MMM quotes can use a faster model than
+    the Notion pages. Models are built once per name by `model_factory`, which tests and
+    benchmarks replace with local fake chat models.
+    """
+
+    def __init__(self, model_factory: ModelFactory):
+        self.model_factory = model_factory
+        self.models: Dict[str, Any] = {}
+        self.stats: Dict[str, LatencyStats] = {}
+
+    def model_name(self, task: str) -> str:
+        tier = config.LLM_TASK_TIERS.get(task, "default")
+        return {"fast": config.AI_MODEL_FAST, "heavy": config.AI_MODEL_HEAVY}.get(tier) or config.AI_MODEL
+
+    def model(self, task: str):
+        name = self.model_name(task)
+        if name not in self.models:
+            self.models[name] = self.model_factory(name)
+        return self.models[name]
+
+    def hedged(self, task: str, runnable) -> HedgedRunnable:
+        key = f"{self.model_name(task)}/{task}"
+        stats = self.stats.setdefault(key, LatencyStats(config.LLM_LATENCY_WINDOW))
+        return HedgedRunnable(runnable, stats)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The stats of every model and task, keyed "model/task".
+        """
+        return {key: stats.summary() for key, stats in self.stats.items()}
@@ -5,9 +5,10 @@ import termios
 import os
 
 class InputListener(Thread):
-    def __init__(self):
+    def __init__(self, on_key_pressed=None):
         super().__init__()
         self.key_pressed = Event()
+        self.on_key_pressed = on_key_pressed
         self.daemon = True
 
     def run(self):
@@ -16,6 +17,8 @@ class InputListener(Thread):
             tty.setcbreak(sys.stdin)
             os.read(sys.stdin.fileno(), 1)
             self.key_pressed.set()
+            if self.on_key_pressed:
+                self.on_key_pressed()
         finally:
             termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.orig_settings)
 
@@ -1,12 +1,18 @@
-from typing import Annotated, Optional
+import json
+import operator
+import re
+from typing import Annotated, List, Optional
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph, START, END
-from .llm import model
+from langgraph.types import Send
+from .checkpoints import new_run_id, open_checkpointer, run_config
+from .llm import get_model
 from app.schemas import QuoteMMM
 import typer
 from .prompts import mmm_system_prompt, mmm_user_prompt_topic
+from .tracing import traced, tracer
 
 
 class MMMAgentState(TypedDict):
@@ -15,17 +21,51 @@ class MMMAgentState(TypedDict):
     topic: str
 
 
-def add_context_to_llm(state: MMMAgentState):
+def normalize_phrase(phrase: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", phrase.lower()).strip()
+
+
+def add_unique_quotes(existing: list, new: list) -> list:
+    """
+    Reducer that appends quotes, skipping the ones whose phrase was already generated.
+    """
+    seen = {normalize_phrase(quote["phrase"]) for quote in existing}
+    merged = list(existing)
+    for quote in new:
+        key = normalize_phrase(quote["phrase"])
+        if key not in seen:
+            seen.add(key)
+            merged.append(quote)
+    return merged
+
+
+class MMMBatchState(TypedDict):
+    topics: List[str]
+    quotes_per_topic: int
+    quotes: Annotated[list, add_unique_quotes]
+    errors: Annotated[list, operator.add]
+
+
+class MMMQuoteTask(TypedDict):
+    topic: str
+    index: int
+    count: int
+
+
+@traced("node.mmm.add_context_to_llm")
+async def add_context_to_llm(state: MMMAgentState):
     return {"messages": [mmm_system_prompt]}
 
 
-def get_topic_from_user(state: MMMAgentState):
+@traced("node.mmm.get_topic_from_user")
+async def get_topic_from_user(state: MMMAgentState):
     prompt = mmm_user_prompt_topic(topic=state["topic"])
     return {"messages": [prompt]}
 
 
-def call_llm(state: MMMAgentState):
-    response: QuoteMMM = model.llm.invoke(state["messages"])
+@traced("node.mmm.call_llm")
+async def call_llm(state: MMMAgentState):
+    response: QuoteMMM = await get_model().mmm_structure_llm.ainvoke(state["messages"])
     ai_response = AIMessage(
         content=f"Author: {response.author} | Phrase: {response.phrase}"
     )
@@ -35,9 +75,12 @@ def call_llm(state: MMMAgentState):
     }
 
 
-def build_mmm_graph():
+def build_mmm_graph(checkpointer=None):
     """
     Creates and compiles the LangGraph state machine.
+
+    Args:
+        checkpointer: Optional LangGraph checkpointer saving the state after every node.
     """
     workflow = StateGraph(MMMAgentState)
 
@@ -50,18 +93,107 @@ def build_mmm_graph():
     workflow.add_edge("get_topic_from_user", "call_llm")
     workflow.add_edge("call_llm", END)
 
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def fan_out_topics(state: MMMBatchState):
+    """
+    Map step, sends one `generate_quote` task per topic and quote number.
+    """
+    count = state["quotes_per_topic"]
+    return [
+        Send("generate_quote", MMMQuoteTask(topic=topic, index=index, count=count))
+        for topic in state["topics"]
+        for index in range(count)
+    ]
+
+
+@traced("node.mmm.generate_quote")
+async def generate_quote(task: MMMQuoteTask):
+    messages = [
+        mmm_system_prompt,
+        mmm_user_prompt_topic(topic=task["topic"], index=task["index"], count=task["count"]),
+    ]
+    try:
+        response: QuoteMMM = await get_model().mmm_structure_llm.ainvoke(messages)
+    except Exception as err:
+        return {"errors": [{"topic": task["topic"], "index": task["index"], "error": str(err)}]}
+
+    return {"quotes": [{"topic": task["topic"], **response.model_dump()}]}
+
+
+def build_mmm_batch_graph():
+    """
+    Creates and compiles the map-reduce graph generating many MMMs in one run.
+
+    Every (topic, quote number) pair is sent to its own `generate_quote` branch, the branches run
+    concurrently (capped with `max_concurrency` at invoke time) and the `quotes` reducer merges
+    and de-duplicates their results.
+    """
+    workflow = StateGraph(MMMBatchState)
+
+    workflow.add_node("generate_quote", generate_quote)
+
+    workflow.add_conditional_edges(START, fan_out_topics, ["generate_quote"])
+    workflow.add_edge("generate_quote", END)
+
     return workflow.compile()
 
 
-async def run_mmm_graph_agent(topic: str):
-    app = build_mmm_graph()
-    initial_state = MMMAgentState(messages=[], topic=topic)
+async def run_mmm_batch_graph_agent(topics: List[str], quotes_per_topic: int = 1, concurrency: int = 8, app=None):
+    """
+    Generates `quotes_per_topic` MMMs for every topic and prints them as JSON lines.
+
+    `app` is an already compiled `build_mmm_batch_graph()`, built on the fly when omitted.
+    """
+    app = app or build_mmm_batch_graph()
+    topics = list(dict.fromkeys(topic.strip() for topic in topics if topic.strip()))
+    initial_state = MMMBatchState(topics=topics, quotes_per_topic=quotes_per_topic, quotes=[], errors=[])
+
+    with tracer.span("graph.mmm_batch", quotes=len(topics) * quotes_per_topic, concurrency=concurrency):
+        final_state = await app.ainvoke(initial_state, config={"max_concurrency": concurrency})
+
+    for quote in final_state["quotes"]:
+        typer.echo(json.dumps(quote, ensure_ascii=False))
+    for error in final_state["errors"]:
+        typer.secho(
+            f"❌ {error['topic']} #{error['index'] + 1}: {error['error']}", fg=typer.colors.RED, err=True
+        )
+
+    return final_state
 
+
+async def run_mmm_graph(app, initial_state: Optional[MMMAgentState], run_id: str):
+    """
+    Runs the graph as `run_id`, or continues that run from its last checkpoint when
+    `initial_state` is None.
+    """
     try:
-        final_state = await app.ainvoke(initial_state)
+        with tracer.span("graph.mmm", run_id=run_id):
+            final_state = await app.ainvoke(initial_state, config=run_config(run_id), durability="async")
         typer.secho(
             f"🎊 Your MMM => {final_state['mmm']['phrase']} | Author: {final_state['mmm']['author']}",
             fg=typer.colors.GREEN,
         )
     except Exception as err:
         typer.secho(f"❌ An error occurred: {err}", fg=typer.colors.RED, err=True)
+        if app.checkpointer is not None:
+            typer.echo(f"Continue it with `notast resume {run_id}`.", err=True)
+        return None
+
+    if app.checkpointer is not None:
+        await app.checkpointer.adelete_thread(run_id)
+    return final_state
+
+
+async def run_new_mmm(app, topic: str):
+    """
+    Runs an already compiled MMM graph (`build_mmm_graph`) for a new topic.
+    """
+    initial_state = MMMAgentState(messages=[], topic=topic)
+    return await run_mmm_graph(app, initial_state, new_run_id("mmm"))
+
+
+async def run_mmm_graph_agent(topic: str):
+    async with open_checkpointer() as checkpointer:
+        return await run_new_mmm(build_mmm_graph(checkpointer), topic)
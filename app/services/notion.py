@@ -1,8 +1,17 @@
+import asyncio
+import itertools
+import random
+import re
+import time
 import typer
-from typing import Any, List
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from importlib.util import find_spec
+from typing import Any, Iterable, Iterator, List, Optional
 import httpx
 
 from app.config import config
+from .tracing import tracer
 
 HEADERS = {
     "Authorization": "Bearer " + config.NOTION_API_KEY,
@@ -10,35 +19,343 @@ HEADERS = {
     "Notion-Version": config.NOTION_VERSION,
 }
 
-async def create_new_pages_in_notion(payload: dict[str, Any]):
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{config.NOTION_URL}/pages", headers=HEADERS, json=payload, timeout=5000
+# Notion API limits: blocks per request and characters per rich_text object.
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_RICH_TEXT_CHARS = 2000
+HEADING_PREFIX = "### "
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Errors raised before the request reaches Notion, safe to retry even for POST.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RateLimiter:
+    """
+    Spaces requests out so at most `rate` of them start per second.
+
+    Every caller reserves the next free slot before sleeping, so concurrent callers queue up
+    fairly without a lock (there is no await between reading and booking the slot).
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class NotionClient:
+    """
+    Long-lived Notion API client.
+
+    It wraps a single `httpx.AsyncClient` so every request in the process reuses the same pool of
+    keep-alive connections (HTTP/2 when the `h2` package is installed) instead of paying a new
+    TCP+TLS handshake per page. Requests have bounded connect/read timeouts, are spaced out to
+    stay under Notion's rate limit (~3 req/s) and 429/5xx responses are retried with exponential
+    backoff, honouring Notion's `Retry-After` header. A POST (page creation) is not idempotent: a
+    5xx may come after the page was created, so only the answers telling it was not processed
+    (429, 503 with `Retry-After`) are retried.
+
+    Use it as an async context manager (or call `open`/`aclose`) once per process. A custom
+    `transport` (e.g. `httpx.MockTransport`) can be passed to run it against a local fake.
+    """
+
+    def __init__(
+        self,
+        base_url: str = config.NOTION_URL,
+        headers: Optional[dict[str, str]] = None,
+        max_retries: int = config.NOTION_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        requests_per_second: float = config.NOTION_REQUESTS_PER_SECOND,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url
+        self.headers = headers or HEADERS
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.transport = transport
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    async def open(self):
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            http2=self.transport is None and find_spec("h2") is not None,
+            timeout=httpx.Timeout(config.NOTION_READ_TIMEOUT, connect=config.NOTION_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60),
+            transport=self.transport,
         )
-        resp.raise_for_status()
-        return resp.json()
 
+    async def aclose(self):
+        if self._client is None:
+            return
 
-# Async function to build the page and send the request
-async def create_notion_page(title: str, paragraphs: List[str], emoji="🥳"):
-    paragraphs_children = [
-        {
-            "object": "block",
-            "type": "paragraph",
-            "paragraph": {"rich_text": [{"text": {"content": text}}]},
+        client, self._client = self._client, None
+        await client.aclose()
+
+    async def request(self, method: str, path: str, json: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """
+        Sends a request to the Notion API, retrying rate-limited and server errors.
+
+        Raises:
+            httpx.HTTPStatusError: If Notion still answers with an error after all the retries.
+            httpx.TransportError: If the connection keeps failing after all the retries.
+        """
+        # Opened lazily if the caller did not manage the lifecycle, it stays open until `aclose`.
+        await self.open()
+
+        with tracer.span("notion.request", method=method, path=path) as span:
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                span.set(attempts=attempt + 1)
+                try:
+                    resp = await self._client.request(method, path, json=json)
+                except RETRYABLE_ERRORS:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+
+                span.set(status=resp.status_code, request_bytes=len(resp.request.content), response_bytes=len(resp.content))
+                if should_retry(method, resp) and attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff_delay(attempt, resp.headers.get("Retry-After")))
+                    continue
+
+                resp.raise_for_status()
+                return resp.json()
+
+    async def create_page(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return await self.request("POST", "/pages", json=payload)
+
+    async def update_page(self, page_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+        return await self.request("PATCH", f"/pages/{page_id}", json=payload)
+
+    async def append_block_children(self, block_id: str, children: List[dict[str, Any]]) -> dict[str, Any]:
+        return await self.request("PATCH", f"/blocks/{block_id}/children", json={"children": children})
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.backoff_cap)
+
+        delay = min(self.backoff_cap, self.backoff_base * 2**attempt)
+        return delay + random.uniform(0, delay / 2)
+
+
+def should_retry(method: str, resp: httpx.Response) -> bool:
+    """
+    Whether an error answer can be retried without risking a duplicate, see `NotionClient`.
+    """
+    if method.upper() != "POST":
+        return resp.status_code in RETRYABLE_STATUS_CODES
+    return resp.status_code == 429 or (resp.status_code == 503 and "Retry-After" in resp.headers)
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """
+    Parses a `Retry-After` header, given either in seconds or as an HTTP date.
+    """
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+notion_client = NotionClient()
+
+
+async def create_new_pages_in_notion(payload: dict[str, Any]):
+    return await notion_client.create_page(payload)
+
+
+def split_text(text: str, limit: int = MAX_RICH_TEXT_CHARS) -> List[str]:
+    """
+    Splits a text into chunks of at most `limit` characters, cutting at sentence boundaries.
+
+    Sentences longer than the limit are cut at the last whitespace before it (or hard cut).
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks: List[str] = []
+    current = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if not sentence:
+            continue
+        while len(sentence) > limit:
+            cut = sentence.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+
+        if not current:
+            current = sentence
+        elif len(current) + 1 + len(sentence) <= limit:
+            current = f"{current} {sentence}"
+        else:
+            chunks.append(current)
+            current = sentence
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def paragraph_blocks(paragraphs: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """
+    Lazily builds the Notion paragraph blocks, splitting paragraphs over the rich_text limit.
+
+    A paragraph starting with "### " becomes a heading (e.g. the speaker section of a conversation).
+    """
+    for text in paragraphs:
+        if text.startswith(HEADING_PREFIX):
+            heading = text[len(HEADING_PREFIX) :][:MAX_RICH_TEXT_CHARS]
+            yield {"object": "block", "type": "heading_3", "heading_3": {"rich_text": [{"text": {"content": heading}}]}}
+            continue
+        for chunk in split_text(text):
+            yield {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": [{"text": {"content": chunk}}]},
+            }
+
+
+def batched(blocks: Iterable[dict[str, Any]], size: int = MAX_BLOCKS_PER_REQUEST) -> Iterator[List[dict[str, Any]]]:
+    batch: List[dict[str, Any]] = []
+    for block in blocks:
+        batch.append(block)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class NotionPageWriter:
+    """
+    Writes a page of any length into Notion.
+
+    The page is created with the first batch of blocks (up to the 100 blocks per request limit)
+    and the remaining paragraphs are streamed in order through `PATCH /blocks/{id}/children`
+    calls, each batch built only when it is about to be sent. Every call goes through the shared
+    `NotionClient`, so the rate limit and retries apply. `blocks_written` tracks the progress, so
+    a failed write can be resumed on the same page with `append(..., skip_blocks=...)`.
+    """
+
+    def __init__(
+        self,
+        client: Optional[NotionClient] = None,
+        parent_page_id: str = config.NOTION_PARENT_PAGE_ID,
+        page: Optional[dict[str, Any]] = None,
+        blocks_written: int = 0,
+    ):
+        self.client = client or notion_client
+        self.parent_page_id = parent_page_id
+        self.page = page
+        self.blocks_written = blocks_written
+
+    @property
+    def page_id(self) -> Optional[str]:
+        return self.page["id"] if self.page else None
+
+    async def create(self, title: str, paragraphs: Iterable[str] = (), emoji: str = "🥳") -> dict[str, Any]:
+        batches = batched(paragraph_blocks(paragraphs))
+        first_batch = next(batches, [])
+        payload = {
+            "parent": {"page_id": self.parent_page_id},
+            "icon": {"type": "emoji", "emoji": emoji},
+            "properties": {"title": [{"text": {"content": title[:MAX_RICH_TEXT_CHARS]}}]},
+            "children": first_batch,
         }
-        for text in paragraphs
-    ]
+        self.page = await self.client.create_page(payload)
+        self.blocks_written = len(first_batch)
+        await self._append_batches(batches)
+        return self.page
+
+    async def append(self, paragraphs: Iterable[str], skip_blocks: int = 0):
+        """
+        Appends paragraphs at the end of the page, skipping the first `skip_blocks` blocks they produce.
+        """
+        if self.page is None:
+            raise RuntimeError("The page must be created before appending paragraphs to it.")
+        blocks = itertools.islice(paragraph_blocks(paragraphs), skip_blocks, None)
+        await self._append_batches(batched(blocks))
+
+    async def _append_batches(self, batches: Iterable[List[dict[str, Any]]]):
+        # Appends to the same parent must stay sequential, Notion adds each batch at the end of the page.
+        for batch in batches:
+            await self.client.append_block_children(self.page_id, batch)
+            self.blocks_written += len(batch)
 
-    payload = {
-        "parent": {"page_id": config.NOTION_PARENT_PAGE_ID},
-        "icon": {"type": "emoji", "emoji": emoji},
-        "properties": {"title": [{"text": {"content": title}}]},
-        "children": paragraphs_children,
-    }
 
+def error_text(err: Exception) -> str:
+    """
+    Notion's answer for a rejected request, the error itself for anything else (e.g. a timeout).
+    """
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.text
+    return f"{type(err).__name__}: {err}"
+
+
+# Async function to build the page and send the request
+async def create_notion_page(title: str, paragraphs: List[str], emoji="🥳"):
+    writer = NotionPageWriter()
     try:
-        page = await create_new_pages_in_notion(payload=payload)
+        page = await writer.create(title=title, paragraphs=paragraphs, emoji=emoji)
         typer.echo(f"Successfully created a new Notion page with ID: {page['id']}")
-    except httpx.HTTPStatusError as err:
-        typer.echo(f"Error creating Notion page: {err.response.text}", err=True)
+        return page
+    except httpx.HTTPError as err:
+        if writer.page_id:
+            typer.echo(f"Notion page {writer.page_id} was created but is incomplete ({writer.blocks_written} blocks written).", err=True)
+        typer.echo(f"Error creating Notion page: {error_text(err)}", err=True)
+        return None
+
+
+async def append_to_notion_page(page_id: str, paragraphs: List[str]):
+    """
+    Appends paragraphs at the end of an existing page, returns None when Notion rejects them or cannot be reached.
+    """
+    writer = NotionPageWriter(page={"id": page_id})
+    try:
+        await writer.append(paragraphs)
+        typer.echo(f"Successfully appended {writer.blocks_written} blocks to the Notion page {page_id}")
+        return writer.page
+    except httpx.HTTPError as err:
+        typer.echo(
+            f"Error appending to Notion page {writer.page_id} ({writer.blocks_written} blocks written): {error_text(err)}",
+            err=True,
+        )
+        return None
@@ -0,0 +1,388 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator, List, Optional, Tuple
+
+import httpx
+import typer
+
+from app.config import config
+from .idea_index import get_idea_index
+from .notion import RETRYABLE_STATUS_CODES, NotionPageWriter, error_text
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+
+class NotionOutbox:
+    """
+    Durable SQLite queue of the pages waiting to be uploaded into Notion.
+
+    A page is written here (one transaction, WAL journal) before any network call, so the
+    transcription and LLM work is never lost when Notion is slow or down. Workers `claim` due
+    entries with a lease: an entry whose worker crashed becomes claimable again once the lease
+    expires, and several `notast outbox flush` processes can run at the same time.
+
+    Every entry has an idempotency key (SHA-256 of its content): queueing the same page twice keeps
+    a single entry, and the created page id plus the number of blocks already written are stored, so
+    a retry continues the same page instead of creating a duplicate.
+    """
+
+    def __init__(self, path: Path, max_attempts: int, backoff_seconds: float, backoff_cap: float = 3600.0):
+        self.path = Path(path).expanduser()
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_cap = backoff_cap
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def make_key(title: str, paragraphs: List[str], emoji: str, page_id: Optional[str] = None) -> str:
+        payload = {"title": title, "paragraphs": paragraphs, "emoji": emoji}
+        if page_id:
+            payload["page_id"] = page_id
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def enqueue(
+        self, title: str, paragraphs: List[str], emoji: str = "🥳", page_id: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Queues a page, or paragraphs to append to the existing page `page_id`.
+
+        The same page is only queued once while it is pending, being uploaded or uploaded. A page
+        that failed before is queued again, continuing its partial upload.
+
+        Returns:
+            Tuple[str, Optional[str]]: Its idempotency key, and the status of the entry it is a
+                duplicate of (`PENDING`, `IN_PROGRESS` or `DONE`), None when it was queued.
+        """
+        key = self.make_key(title, paragraphs, emoji, page_id)
+        payload = json.dumps({"title": title, "paragraphs": paragraphs, "emoji": emoji}, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            queued = conn.execute(
+                """
+                INSERT INTO outbox (key, payload, status, attempts, next_attempt_at, page_id, created_at, updated_at)
+                VALUES (?, ?, ?, 0, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET status = excluded.status, attempts = 0,
+                    next_attempt_at = excluded.next_attempt_at, last_error = NULL, updated_at = excluded.updated_at
+                WHERE outbox.status = ?
+                """,
+                (key, payload, PENDING, now, page_id, now, now, FAILED),
+            ).rowcount
+            if queued:
+                return key, None
+            return key, conn.execute("SELECT status FROM outbox WHERE key = ?", (key,)).fetchone()[0]
+
+    def claim(self, limit: int = 10, lease_seconds: float = 300.0) -> List[dict[str, Any]]:
+        """
+        Leases up to `limit` due entries to the caller, oldest first.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT key, payload, attempts, page_id, blocks_written FROM outbox
+                    WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_until <= ?)
+                    ORDER BY created_at LIMIT ?
+                    """,
+                    (PENDING, now, IN_PROGRESS, now, limit),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE outbox SET status = ?, lease_until = ?, updated_at = ? WHERE key = ?",
+                    [(IN_PROGRESS, now + lease_seconds, now, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        return [
+            {"key": key, **json.loads(payload), "attempts": attempts, "page_id": page_id, "blocks_written": written}
+            for key, payload, attempts, page_id, written in rows
+        ]
+
+    def mark_done(self, key: str, page_id: str, blocks_written: int):
+        with self._lock:
+            self._connect().execute(
+                """
+                UPDATE outbox SET status = ?, page_id = ?, blocks_written = ?, last_error = NULL,
+                    lease_until = NULL, updated_at = ?
+                WHERE key = ?
+                """,
+                (DONE, page_id, blocks_written, time.time(), key),
+            )
+
+    def mark_failed(
+        self,
+        key: str,
+        error: str,
+        page_id: Optional[str] = None,
+        blocks_written: int = 0,
+        permanent: bool = False,
+    ):
+        """
+        Records a failed attempt and schedules the next one with exponential backoff and jitter.
+
+        The entry is marked as failed once `max_attempts` is reached or when the error is permanent.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            attempts = conn.execute("SELECT attempts FROM outbox WHERE key = ?", (key,)).fetchone()[0] + 1
+            status = FAILED if permanent or attempts >= self.max_attempts else PENDING
+            delay = min(self.backoff_cap, self.backoff_seconds * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            conn.execute(
+                """
+                UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                    page_id = COALESCE(?, page_id), blocks_written = ?, lease_until = NULL, updated_at = ?
+                WHERE key = ?
+                """,
+                (status, attempts, now + delay, error, page_id, blocks_written, now, key),
+            )
+
+    def retry_failed(self) -> int:
+        """
+        Puts the failed entries back in the queue, due now.
+        """
+        now = time.time()
+        with self._lock:
+            return (
+                self._connect()
+                .execute(
+                    "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+                    (PENDING, now, now, FAILED),
+                )
+                .rowcount
+            )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+
+        counts = {PENDING: 0, IN_PROGRESS: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def entries(self, include_done: bool = False) -> List[dict[str, Any]]:
+        query = "SELECT key, payload, status, attempts, next_attempt_at, page_id, last_error FROM outbox"
+        if not include_done:
+            query += f" WHERE status != '{DONE}'"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY created_at").fetchall()
+
+        return [
+            {
+                "key": key,
+                "title": json.loads(payload)["title"],
+                "status": status,
+                "attempts": attempts,
+                "next_attempt_at": next_attempt_at,
+                "page_id": page_id,
+                "last_error": last_error,
+            }
+            for key, payload, status, attempts, next_attempt_at, page_id, last_error in rows
+        ]
+
+    def next_due_in(self) -> Optional[float]:
+        """
+        Seconds until the next pending entry is due, None when nothing is left to upload.
+
+        An entry leased by another flush is due when its lease expires, in case that flush died.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                """
+                SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE lease_until END) FROM outbox
+                WHERE status IN (?, ?)
+                """,
+                (PENDING, PENDING, IN_PROGRESS),
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    lease_until REAL,
+                    page_id TEXT,
+                    blocks_written INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+            self._conn = conn
+        return self._conn
+
+
+def get_outbox() -> NotionOutbox:
+    return NotionOutbox(
+        path=Path(config.OUTBOX_PATH),
+        max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+        backoff_seconds=config.OUTBOX_BACKOFF_SECONDS,
+    )
+
+
+def is_permanent_error(err: Exception) -> bool:
+    """
+    A 4xx answer (other than 429) means Notion rejected the page itself, retrying will not help.
+    """
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.status_code not in RETRYABLE_STATUS_CODES and err.response.status_code < 500
+    return False
+
+
+@dataclass
+class FlushSummary:
+    uploaded: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+
+async def upload_entry(outbox: NotionOutbox, entry: dict[str, Any]) -> bool:
+    """
+    Uploads a claimed entry, continuing the page of a previous partial attempt when there is one.
+    """
+    page = {"id": entry["page_id"]} if entry["page_id"] else None
+    writer = NotionPageWriter(page=page, blocks_written=entry["blocks_written"])
+    try:
+        if writer.page is None:
+            await writer.create(title=entry["title"], paragraphs=entry["paragraphs"], emoji=entry["emoji"])
+        else:
+            await writer.append(entry["paragraphs"], skip_blocks=writer.blocks_written)
+    except Exception as err:
+        outbox.mark_failed(
+            entry["key"],
+            error_text(err),
+            page_id=writer.page_id,
+            blocks_written=writer.blocks_written,
+            permanent=is_permanent_error(err),
+        )
+        return False
+
+    outbox.mark_done(entry["key"], writer.page_id, writer.blocks_written)
+    if config.INDEX_ENABLED:
+        get_idea_index().set_page_id(entry["key"], writer.page_id)
+    return True
+
+
+@contextmanager
+def worker_lock(outbox: NotionOutbox) -> Iterator[bool]:
+    """
+    Non-blocking exclusive lock next to the outbox file, yields whether this process holds it.
+    """
+    outbox.path.parent.mkdir(parents=True, exist_ok=True)
+    with open(outbox.path.with_name(outbox.path.name + ".worker.lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+async def flush_outbox(
+    outbox: Optional[NotionOutbox] = None,
+    concurrency: int = 2,
+    batch_size: int = 10,
+    quiet: bool = False,
+    wait: bool = False,
+) -> FlushSummary:
+    """
+    Uploads every due entry of the outbox, `concurrency` pages at a time.
+
+    Entries that fail are rescheduled with backoff. Without `wait` the flush ends once no entry is
+    due. With `wait` it sleeps until the next retry is due and only ends when nothing is left to
+    retry (every entry uploaded or out of attempts). Only one process waits at a time: when another
+    one already does, this flush behaves as without `wait`.
+
+    Args:
+        outbox (NotionOutbox): The queue, the configured one by default.
+        concurrency (int): Max pages uploaded at the same time.
+        batch_size (int): Entries leased per claim.
+        quiet (bool): Don't print progress (used by the background worker).
+        wait (bool): Keep retrying the failed uploads until they succeed or run out of attempts.
+
+    Returns:
+        FlushSummary: Titles of the uploaded and failed pages.
+    """
+    outbox = outbox or get_outbox()
+    slots = asyncio.Semaphore(concurrency)
+    summary = FlushSummary()
+    failed: dict[str, str] = {}  # key -> title of the entries whose last attempt failed
+
+    async def process(entry: dict[str, Any]):
+        async with slots:
+            uploaded = await upload_entry(outbox, entry)
+        if uploaded:
+            summary.uploaded.append(entry["title"])
+            failed.pop(entry["key"], None)
+        else:
+            failed[entry["key"]] = entry["title"]
+        if not quiet:
+            if uploaded:
+                typer.secho(f"✅ {entry['title']}", fg=typer.colors.GREEN)
+            else:
+                typer.secho(f"❌ {entry['title']} (attempt {entry['attempts'] + 1})", fg=typer.colors.RED, err=True)
+
+    with worker_lock(outbox) if wait else nullcontext(False) as waiting:
+        while True:
+            while entries := outbox.claim(limit=batch_size):
+                await asyncio.gather(*(process(entry) for entry in entries))
+            next_due_in = outbox.next_due_in() if waiting else None
+            if next_due_in is None:
+                break
+            await asyncio.sleep(next_due_in)
+
+    summary.failed = list(failed.values())
+    return summary
+
+
+def spawn_outbox_worker():
+    """
+    Starts a detached `notast outbox flush` process, so the current command does not wait for Notion.
+    """
+    subprocess.Popen(
+        [sys.executable, "-m", "app.cli", "outbox", "flush", "--quiet", "--wait"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
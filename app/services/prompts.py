@@ -1,3 +1,5 @@
+from typing import List
+
 from langchain_core.messages import SystemMessage, HumanMessage
 
 # System prompts
@@ -7,41 +9,96 @@ notion_assistant_prompt = SystemMessage(
     "You also are very structured to put ideas into text."
 )
 
-def notion_user_prompt(user_input: str):
-    return HumanMessage(
-        content=f"""The text you are receiving is a coding idea or any other type of idea.
+NOTION_JSON_INSTRUCTIONS = """        \n\nNow, please follow this directions. Your result should have the response formatted following:
 
-        So based on this idea, I want you to create a new text based on this idea, I want you to structure a text explaining the idea and give minimal steps how to implement it.
-        The output of this would be 3 things a title, text (split it into different paragraphs as needed it) and a random fun icon to use.
-        \n\nHere is the idea: {user_input}
-        \n\nNow, please follow this directions. Your result should have the response formatted following:
-
-        The JSON output must be a valid JSON object with the following keys:
+        The JSON output must be a valid JSON object with the following keys, in this order:
         - "title": A concise title for the content.
-        - "text": list of all paragraphs.
         - "icon": A random emoji or icon related to the topic.
+        - "text": list of all paragraphs.
 
         Here's an example of the desired JSON format:
 
         ```json
-        {{
+        {
         "title": "AI-Powered Coding Research & Content Generator",
-        "text": ["This idea proposes the development of an intelligent AI agent designed to automate the laborious process of gathering and synthesizing information on various coding-related topics..."],
-        "icon": "🤖"
-        }}
+        "icon": "🤖",
+        "text": ["This idea proposes the development of an intelligent AI agent designed to automate the laborious process of gathering and synthesizing information on various coding-related topics..."]
+        }
         ```
 
         Ensure your response is ONLY the JSON object, with no extra properties or whatever.
-    """
+"""
+
+
+CHUNK_JSON_INSTRUCTIONS = """
+        Your response must be ONLY a valid JSON object with one key, "points": the list of notes, e.g. {"points": ["First note.", "Second note."]}
+"""
+
+
+def notion_user_prompt(user_input: str, speakers: int = 1):
+    conversation = (
+        f"\n        The idea comes from a conversation between {speakers} speakers, transcribed as one `[mm:ss] Speaker N: ...` line per speaker turn."
+        "\n        Group the content by speaker where it helps (who proposed what, who objected) and mention the timestamps of the key moments."
+        if speakers > 1
+        else ""
+    )
+    return HumanMessage(
+        content=f"""The text you are receiving is a coding idea or any other type of idea.
+
+        So based on this idea, I want you to create a new text based on this idea, I want you to structure a text explaining the idea and give minimal steps how to implement it.
+        The output of this would be 3 things a title, a random fun icon to use and text (split it into different paragraphs as needed it).{conversation}
+        \n\nHere is the idea: {user_input}
+{NOTION_JSON_INSTRUCTIONS}    """
+    )
+
+
+def notion_chunk_prompt(chunk: str, index: int, count: int):
+    return HumanMessage(
+        content=f"""The text you are receiving is part {index + 1} of {count} of a long recorded idea or conversation.
+
+        Summarize this part as short notes: keep every idea, decision, open question and implementation step, with the speaker and timestamp when the text has them.
+        Do not add anything that is not in the text, the notes of all the parts will be merged into one document later.
+
+        \n\nHere is the part: {chunk}
+{CHUNK_JSON_INSTRUCTIONS}    """
+    )
+
+
+def notion_reduce_prompt(notes: List[List[str]], speakers: int = 1):
+    parts = "\n\n".join(
+        f"Part {index + 1}:\n" + "\n".join(f"- {point}" for point in points) for index, points in enumerate(notes)
+    )
+    conversation = (
+        f"\n        The recording is a conversation between {speakers} speakers, group the content by speaker where it helps."
+        if speakers > 1
+        else ""
+    )
+    return HumanMessage(
+        content=f"""The notes you are receiving summarize, in order, the consecutive parts of a long recorded idea.
+
+        Based on all of them, I want you to structure one text explaining the idea and give minimal steps how to implement it, without repeating the notes part by part.
+        The output of this would be 3 things a title, a random fun icon to use and text (split it into different paragraphs as needed it).{conversation}
+        \n\nHere are the notes:\n{parts}
+{NOTION_JSON_INSTRUCTIONS}    """
     )
 
 
 # ? MMM prompts
+MMM_JSON_INSTRUCTIONS = """
+    Your response must be ONLY a valid JSON object with the keys "author" and "phrase", e.g. {"author": "Seneca", "phrase": "Luck is what happens when preparation meets opportunity."}
+"""
+
 mmm_system_prompt = SystemMessage(
     content="You are an expert finding amazing quotes and phrases from different authors books. You are great at finding quotes related to a topic."
 )
 
-def mmm_user_prompt_topic(topic: str):
+def mmm_user_prompt_topic(topic: str, index: int = 0, count: int = 1):
+    variation = (
+        f"\n    - This is quote number {index + 1} of {count} for this topic, "
+        "so pick a different author and quote than you would for any other number."
+        if count > 1
+        else ""
+    )
     return HumanMessage(
     content=f"""Can you please provider a quote or phrase, related to this specific topic: {topic}.
 
@@ -49,6 +106,6 @@ def mmm_user_prompt_topic(topic: str):
     - Please provide a quote and phrase related to the specific topic, do not give me a phrase or quote related to other topic or something random.
     - The idea is to search for positive quotes or phrases, no negativity.
     - Please always give me back quotes or phrases that have an author, if not say the author is Unknown Author.
-    - Give me back short quotes or phrases, please.
-    """
+    - Give me back short quotes or phrases, please.{variation}
+{MMM_JSON_INSTRUCTIONS}    """
 )
@@ -1,53 +1,62 @@
-import sounddevice as sd
+import asyncio
 import wave
 import sys
-import time
+import queue
 import numpy as np
+from contextvars import ContextVar, copy_context
 from io import BytesIO
-from typing import BinaryIO
+from threading import Thread
+from concurrent.futures import Future
+from typing import BinaryIO, Callable, List, Optional, Tuple
+from .audio_buffer import PCMBuffer
 from .mac_input_listener import InputListener
-from .eleven_labs import ElevenLabsManager
+from .audio_encoding import encode_flac, resample_pcm
+from .eleven_labs import get_elevenlabs
+from .transcript import Transcript
+from .tracing import traced, tracer
+from .voice_activity import VADResult, trim_silence
+from app.config import config
 import typer
 
 
-def record_new_audio(duration_limit=5, fs=44100, channels=1):
+# Set by `notast serve` for every job: the key press is read on the client's terminal, not the daemon's.
+remote_key_listener: ContextVar[Optional[Callable[[], asyncio.Event]]] = ContextVar(
+    "notast_remote_key_listener", default=None
+)
+
+
+def start_async_key_listener() -> asyncio.Event:
     """
-    Records audio for a specified duration or until is stopped by pressing any key and returns the raw audio bytes.
+    Starts the keyboard listener and returns an asyncio Event set when a key is pressed.
 
-    Args:
-        duration_limit (int): Hard duration limit to stop an audio recording.
-        fs (int): The sample rate of the audio data.
-        channels (int): MacBook Pro Microphone is mono.
+    The listener thread hands the key press to the event loop, so waiting for it does not poll.
     """
-    typer.secho(f"Recording started. Press any key to stop. Hard limit: {duration_limit}s", fg=typer.colors.BRIGHT_BLUE)
-    listener = InputListener()
-    listener.start()
-    frames = []
+    start_remote_listener = remote_key_listener.get()
+    if start_remote_listener is not None:
+        return start_remote_listener()
 
-    def callback(indata, frame_count, time_info, status):
-        if status:
-            print(status, file=sys.stderr)
-        frames.append(indata.copy())
+    loop = asyncio.get_running_loop()
+    key_pressed = asyncio.Event()
 
-    with sd.InputStream(samplerate=fs, channels=channels, callback=callback):
-        start_time = time.time()
-        while not listener.is_key_pressed():
-            if time.time() - start_time > duration_limit:
-                typer.secho("\nHard limit reached. Stopping recording.", fg=typer.colors.BRIGHT_YELLOW)
-                break
-            time.sleep(0.01)
+    def on_key_pressed():
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(key_pressed.set)
 
-    if not len(frames):
-        typer.secho("No audio frames recorded. Returning empty bytes.", fg=typer.colors.BRIGHT_CYAN)
-        return
+    InputListener(on_key_pressed=on_key_pressed).start()
+    return key_pressed
 
-    recording = np.concatenate(frames, axis=0)
-    recording_int16 = (recording * 32767).astype(np.int16)
-    typer.echo("Recording stopped.")
-    return recording_int16.tobytes()
+
+async def wait_for_recording_to_stop_async(key_pressed: asyncio.Event, duration_limit: int):
+    """
+    Waits, without blocking the event loop, until a key is pressed or the hard duration limit is reached.
+    """
+    try:
+        await asyncio.wait_for(key_pressed.wait(), timeout=duration_limit)
+    except asyncio.TimeoutError:
+        typer.secho("\nHard limit reached. Stopping recording.", fg=typer.colors.BRIGHT_YELLOW)
 
 
-def transform_audio_to_in_memory_wav_file(raw_audio: bytes, fs: int = 44100, channels: int = 1) -> BinaryIO:
+def transform_audio_to_in_memory_wav_file(raw_audio: bytes | memoryview, fs: int = 44100, channels: int = 1) -> BinaryIO:
     """
     Encapsulates raw audio bytes into an in-memory WAV file format.
 
@@ -60,7 +69,7 @@ def transform_audio_to_in_memory_wav_file(raw_audio: bytes, fs: int = 44100, cha
     uncompressed audio and common with libraries like `sounddevice`.
 
     Args:
-        raw_audio (bytes): The raw audio data as a bytes object.
+        raw_audio (bytes | memoryview): The raw audio data as a bytes-like object.
         fs (int, optional): The sample rate of the audio data in Hertz. Defaults to 44100.
         channels (int, optional): The number of audio channels. Defaults to 1.
 
@@ -87,6 +96,174 @@ def transform_audio_to_in_memory_wav_file(raw_audio: bytes, fs: int = 44100, cha
 
 
 
+def remove_silence(
+    raw_audio: bytes | memoryview, fs: int = 44100, channels: int = 1
+) -> Tuple[bytes | memoryview | np.ndarray, Optional[VADResult]]:
+    """
+    Trims silence from raw 16-bit PCM audio with the VAD thresholds set in `Config`.
+
+    Args:
+        raw_audio (bytes | memoryview): The raw audio data as a bytes-like object.
+        fs (int): The sample rate of the audio data.
+        channels (int): The number of audio channels.
+
+    Returns:
+        Tuple: The audio to upload (untouched when the VAD is disabled or finds no speech at all)
+               and the VAD result, None when the audio is untouched.
+    """
+    if not config.VAD_ENABLED:
+        return raw_audio, None
+
+    pcm = np.frombuffer(raw_audio, dtype=np.int16).reshape(-1, channels)
+    result = trim_silence(
+        pcm,
+        fs,
+        frame_ms=config.VAD_FRAME_MS,
+        energy_threshold_db=config.VAD_ENERGY_THRESHOLD_DB,
+        zcr_threshold=config.VAD_ZCR_THRESHOLD,
+        padding_ms=config.VAD_PADDING_MS,
+        max_pause_ms=config.VAD_MAX_PAUSE_MS,
+    )
+    if not result.kept_frames:
+        # Better to pay for some silence than to lose an idea to a badly tuned threshold.
+        return raw_audio, None
+
+    return result.audio, result
+
+
+@traced("audio.encode")
+def prepare_audio_for_upload(
+    raw_audio: bytes | memoryview, fs: int = 44100, channels: int = 1
+) -> Tuple[BinaryIO, Optional[VADResult]]:
+    """
+    Turns raw 16-bit PCM into the compact audio file sent for transcription, following `Config`.
+
+    Silence is trimmed (VAD), the audio is downsampled to `AUDIO_SAMPLE_RATE` and encoded with
+    `AUDIO_ENCODING` (FLAC, falling back to WAV when `soundfile` is not installed).
+
+    Returns:
+        Tuple[BinaryIO, Optional[VADResult]]: The in-memory audio file and the VAD result (None
+            when no silence was removed), see `restore_timestamps`.
+    """
+    audio, vad = remove_silence(raw_audio, fs=fs, channels=channels)
+
+    target_fs = config.AUDIO_SAMPLE_RATE
+    if target_fs and target_fs < fs:
+        pcm = np.frombuffer(audio, dtype=np.int16).reshape(-1, channels)
+        audio = resample_pcm(pcm, fs, target_fs)
+        fs = target_fs
+
+    buffer = None
+    if config.AUDIO_ENCODING == "flac":
+        buffer = encode_flac(np.frombuffer(audio, dtype=np.int16).reshape(-1, channels), fs)
+    encoding = "flac" if buffer is not None else "wav"
+    if buffer is None:
+        buffer = transform_audio_to_in_memory_wav_file(raw_audio=audio, fs=fs, channels=channels)
+
+    tracer.current().set(
+        pcm_bytes=len(raw_audio),
+        encoded_bytes=buffer.getbuffer().nbytes,
+        removed_seconds=vad.removed_seconds if vad else 0.0,
+        sample_rate=fs,
+        encoding=encoding,
+    )
+    return buffer, vad
+
+
+def restore_timestamps(transcript: Transcript, vad: Optional[VADResult]) -> Transcript:
+    """
+    Maps the word timestamps of the transcript of trimmed audio back to the time of the recording.
+    """
+    return transcript.map_times(vad.original_seconds) if vad is not None else transcript
+
+
+def encode_for_transcription(
+    raw_audio: bytes | memoryview, fs: int = 44100, channels: int = 1
+) -> Tuple[BinaryIO, Optional[VADResult]]:
+    """
+    Trims the silence of a recording and encodes what is left for the transcription upload.
+
+    Returns:
+        Tuple[BinaryIO, Optional[VADResult]]: The audio file and the VAD result for `restore_timestamps`.
+    """
+    buffer, vad = prepare_audio_for_upload(raw_audio, fs=fs, channels=channels)
+    if vad is not None and vad.removed_seconds:
+        typer.secho(
+            f"🔇 Trimmed {vad.removed_seconds:.1f}s of silence ({vad.removed_ratio:.0%} of the recording).",
+            fg=typer.colors.BRIGHT_CYAN,
+        )
+
+    return buffer, vad
+
+
+def load_wav_file(path: str) -> Tuple[BinaryIO, Optional[VADResult]]:
+    """
+    Loads a 16-bit PCM WAV file from disk into an in-memory WAV file ready for transcription (silence trimmed).
+
+    Args:
+        path (str): Path to the WAV file.
+
+    Returns:
+        Tuple[BinaryIO, Optional[VADResult]]: An in-memory binary stream of the WAV file and the
+            VAD result for `restore_timestamps`.
+
+    Raises:
+        wave.Error: If the file is not a valid 16-bit PCM WAV file.
+    """
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            raise wave.Error(f"Only 16-bit PCM WAV files are supported, got {8 * f.getsampwidth()}-bit")
+
+        fs = f.getframerate()
+        channels = f.getnchannels()
+        raw_audio = f.readframes(f.getnframes())
+
+    return encode_for_transcription(raw_audio=raw_audio, fs=fs, channels=channels)
+
+
+@traced("audio.record")
+async def arecord_new_audio(duration_limit=5, fs=44100, channels=1):
+    """
+    Records audio until a key is pressed or the hard limit is reached and returns the raw audio bytes.
+
+    The stop key and the hard limit are awaited on the event loop. Samples are written into a
+    preallocated int16 `PCMBuffer`, the result is a zero-copy memoryview over it.
+
+    Args:
+        duration_limit (int): Hard duration limit to stop an audio recording.
+        fs (int): The sample rate of the audio data.
+        channels (int): MacBook Pro Microphone is mono.
+    """
+    import sounddevice as sd
+
+    typer.secho(f"Recording started. Press any key to stop. Hard limit: {duration_limit}s", fg=typer.colors.BRIGHT_BLUE)
+    key_pressed = start_async_key_listener()
+    buffer = PCMBuffer.for_duration(duration_limit, fs=fs, channels=channels)
+
+    def callback(indata, frame_count, time_info, status):
+        if status:
+            print(status, file=sys.stderr)
+        buffer.write(indata)
+
+    with sd.InputStream(samplerate=fs, channels=channels, callback=callback):
+        await wait_for_recording_to_stop_async(key_pressed, duration_limit)
+
+    if not len(buffer):
+        typer.secho("No audio frames recorded. Returning empty bytes.", fg=typer.colors.BRIGHT_CYAN)
+        return
+
+    typer.echo("Recording stopped.")
+    tracer.current().set(seconds=len(buffer) / fs, pcm_bytes=len(buffer) * channels * 2)
+    return buffer.memoryview()
+
+
+def record_new_audio(duration_limit=5, fs=44100, channels=1):
+    """
+    Blocking version of `arecord_new_audio`, for callers without an event loop.
+    """
+    return asyncio.run(arecord_new_audio(duration_limit=duration_limit, fs=fs, channels=channels))
+
+
 def save_audio_to_file(audio_bytes: bytes, filename="recording.wav", fs = 44100, channels = 1):
     """
     Saves raw audio bytes to a WAV file.
@@ -113,6 +290,8 @@ def play_audio_bytes(audio_bytes: bytes, fs=44100):
         audio_bytes (bytes): The raw audio data as a bytes object.
         fs (int): The sample rate of the audio data.
     """
+    import sounddevice as sd
+
     print("Replaying audio...")
     # Convert the bytes object back into a NumPy array of int16
     playback_array = np.frombuffer(audio_bytes, dtype=np.int16)
@@ -125,15 +304,223 @@ def play_audio_bytes(audio_bytes: bytes, fs=44100):
     print("Playback finished.")
 
 
-def transformation_audio_to_text():
-    elevenlabs = ElevenLabsManager()
+class StreamingTranscriber:
+    """
+    Transcribes fixed-size audio segments while the recording is still running.
+
+    The `sd.InputStream` callback pushes every block of samples into a bounded queue via `feed`.
+    A background thread groups those blocks into segments of `segment_seconds`, encodes each one
+    and hands it to the event loop, where up to `max_concurrent` segments are transcribed at once
+    by the async speech-to-text client. `finish` flushes the last (partial) segment and stitches
+    the partial transcripts in recording order (word timestamps shifted by the segment start), so
+    stopping the recording only costs the transcription of that last segment.
+
+    Any object exposing `aconvert_speech_to_text(audio)` can be used as the speech-to-text client,
+    which makes it easy to run against a local stand-in instead of ElevenLabs.
+    """
+
+    def __init__(
+        self,
+        speech_to_text=None,
+        segment_seconds: int = 20,
+        fs: int = 44100,
+        channels: int = 1,
+        max_queued_blocks: int = 1024,
+        max_concurrent: int = 2,
+    ):
+        self.speech_to_text = speech_to_text or get_elevenlabs()
+        self.fs = fs
+        self.channels = channels
+        self.segment_frames = int(segment_seconds * fs)
+        self.max_concurrent = max_concurrent
+        self.recorded_frames = 0
+        self.dropped_blocks = 0
+        self.trimmed_seconds = 0.0
+
+        self._blocks: queue.Queue = queue.Queue(maxsize=max_queued_blocks)
+        self._futures: List[Future] = []
+        self._offsets: List[float] = []  # start of every segment in the recording, in seconds
+        self._segmenter: Optional[Thread] = None
+        self._segmenter_error: Optional[BaseException] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        """
+        Starts segmenting, from the event loop the segments are transcribed on.
+
+        The segmenter thread runs in a copy of the current context, so it sees the `config.override`
+        settings of the caller (e.g. a daemon job).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._segmenter = Thread(target=copy_context().run, args=(self._run_segmenter,), daemon=True)
+        self._segmenter.start()
+        return self
+
+    def feed(self, indata: np.ndarray):
+        """
+        Queues a block of float samples coming from the audio callback.
+
+        It never blocks, the audio thread must not wait on us. If the queue is full the block is
+        dropped and counted in `dropped_blocks`.
+        """
+        try:
+            self._blocks.put_nowait(indata.copy())
+        except queue.Full:
+            self.dropped_blocks += 1
+
+    async def finish(self) -> Transcript:
+        """
+        Flushes the pending audio and returns the stitched transcript of every segment, in order.
+
+        Raises the segmenter's error when it stopped early (e.g. a segment could not be encoded).
+        """
+        await asyncio.to_thread(self._stop_segmenter)
+
+        try:
+            if self._segmenter_error is not None:
+                raise self._segmenter_error
+            transcripts = await asyncio.gather(*(asyncio.wrap_future(future) for future in self._futures))
+        finally:
+            for future in self._futures:
+                future.cancel()
+
+        if self.trimmed_seconds:
+            typer.secho(f"🔇 Trimmed {self.trimmed_seconds:.1f}s of silence.", fg=typer.colors.BRIGHT_CYAN)
+        if self.dropped_blocks:
+            typer.secho(
+                f"Audio queue was full, {self.dropped_blocks} blocks were dropped.",
+                fg=typer.colors.BRIGHT_YELLOW,
+                err=True,
+            )
+
+        return Transcript.concat(list(zip(self._offsets, transcripts)))
+
+    @property
+    def segments_submitted(self) -> int:
+        return len(self._futures)
+
+    def _stop_segmenter(self):
+        # A segmenter that died no longer empties the queue, waiting for room would block forever.
+        while self._segmenter.is_alive():
+            try:
+                self._blocks.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._segmenter.join()
+
+    def _run_segmenter(self):
+        try:
+            self._segment_blocks()
+        except BaseException as err:
+            self._segmenter_error = err
+
+    def _segment_blocks(self):
+        segment = PCMBuffer(capacity_frames=self.segment_frames, channels=self.channels)
+
+        while True:
+            block = self._blocks.get()
+            if block is None:
+                break
+
+            written = segment.write(block)
+            while written < len(block):
+                self._submit(segment)
+                written += segment.write(block[written:])
+
+        if len(segment):
+            self._submit(segment)
+
+    def _submit(self, segment: PCMBuffer):
+        # The encoded file holds its own copy of the audio, so the segment can be reused right away.
+        audio_buffer, vad = prepare_audio_for_upload(segment.memoryview(), fs=self.fs, channels=self.channels)
+        self.trimmed_seconds += vad.removed_seconds if vad else 0.0
+        self._offsets.append(self.recorded_frames / self.fs)
+        self.recorded_frames += len(segment)
+        segment.clear()
+        self._futures.append(asyncio.run_coroutine_threadsafe(self._transcribe(audio_buffer, vad), self._loop))
+
+    async def _transcribe(self, audio: BinaryIO, vad: Optional[VADResult]) -> Transcript:
+        # Word times of the trimmed segment, mapped back to the segment before the offset is added.
+        async with self._slots:
+            transcript = await self.speech_to_text.aconvert_speech_to_text(audio=audio)
+        return restore_timestamps(transcript, vad)
+
+
+async def arecord_and_transcribe_streaming(
+    duration_limit=5, fs=44100, channels=1, segment_seconds: int = 20, speech_to_text=None
+) -> Optional[Transcript]:
+    """
+    Records audio and transcribes it segment by segment while the recording is still running.
+
+    Args:
+        duration_limit (int): Hard duration limit to stop an audio recording.
+        fs (int): The sample rate of the audio data.
+        channels (int): MacBook Pro Microphone is mono.
+        segment_seconds (int): Length of each segment sent for transcription.
+        speech_to_text: Client exposing `aconvert_speech_to_text`, defaults to `ElevenLabsManager`.
+
+    Returns:
+        Optional[Transcript]: The stitched transcript, or None if no audio was captured.
+    """
+    import sounddevice as sd
+
+    typer.secho(
+        f"Recording started (streaming). Press any key to stop. Hard limit: {duration_limit}s",
+        fg=typer.colors.BRIGHT_BLUE,
+    )
+    key_pressed = start_async_key_listener()
+    transcriber = StreamingTranscriber(
+        speech_to_text=speech_to_text, segment_seconds=segment_seconds, fs=fs, channels=channels
+    ).start()
+
+    def callback(indata, frame_count, time_info, status):
+        if status:
+            print(status, file=sys.stderr)
+        transcriber.feed(indata)
+
+    with sd.InputStream(samplerate=fs, channels=channels, callback=callback):
+        await wait_for_recording_to_stop_async(key_pressed, duration_limit)
+
+    typer.echo("Recording stopped. Waiting for the last segment transcription...")
+    transcript = await transcriber.finish()
+    if not transcriber.segments_submitted:
+        typer.secho("No audio frames recorded.", fg=typer.colors.BRIGHT_CYAN)
+        return None
+
+    return transcript
+
+
+async def atransformation_audio_to_text(streaming: Optional[bool] = None) -> Transcript:
+    """
+    Records an idea and returns its transcript, safe to run next to other graphs on the same event loop.
+    """
+    if streaming is None:
+        streaming = config.STREAMING_TRANSCRIPTION
+
+    if streaming:
+        transcript = await arecord_and_transcribe_streaming(
+            duration_limit=5 * 60, segment_seconds=config.STREAMING_SEGMENT_SECONDS
+        )
+        if transcript is None:
+            raise ValueError("Audio could not be recorded, try again later...")
+        return transcript
+
+    elevenlabs = get_elevenlabs()
     # Hard limit 5mins
-    new_audio = record_new_audio(duration_limit=5 * 60)
+    new_audio = await arecord_new_audio(duration_limit=5 * 60)
 
     if not new_audio:
         raise ValueError("Audio could not be recorded, try again later...")
 
-    audio_buffer = transform_audio_to_in_memory_wav_file(raw_audio=new_audio)
-    text = elevenlabs.convert_speech_to_text(audio=audio_buffer)
+    audio_buffer, vad = encode_for_transcription(raw_audio=new_audio)
+    return restore_timestamps(await elevenlabs.aconvert_speech_to_text(audio=audio_buffer), vad)
 
-    return text
+
+def transformation_audio_to_text(streaming: Optional[bool] = None) -> Transcript:
+    """
+    Blocking version of `atransformation_audio_to_text`, for callers without an event loop.
+    """
+    return asyncio.run(atransformation_audio_to_text(streaming))
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import time
+from contextlib import suppress
+from typing import Any, List, Optional, Sequence, Tuple
+
+import typer
+
+from app.schemas import NotionPageData
+from .json_repair import message_text
+from .llm import get_model
+from .llm_cache import llm_span
+from .notion import NotionPageWriter
+
+DEFAULT_ICON = "🥳"
+
+
+class NotionPageStreamParser:
+    """
+    Incremental parser of the `NotionPageData` JSON object while the model generates it.
+
+    Chunks of any size are fed as they arrive. Every string is reported as soon as its closing
+    quote is read: the `title` and `icon` values, and each paragraph of the `text` array, so a
+    paragraph can be shown before the next one is generated. Anything around the top level object
+    (e.g. a ```json fence) is ignored, string escapes are decoded with `json.loads`. `complete`
+    tells whether the top level object was closed, i.e. the answer was not cut.
+    """
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.icon: Optional[str] = None
+        self.paragraphs: List[str] = []
+        self.complete = False
+        self._stack: List[str] = []  # open "{" and "[" around the current position
+        self._key: Optional[str] = None  # last key of the top level object
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._raw: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Parses a chunk, returns the completed values as ("title" | "icon" | "paragraph", value) events.
+        """
+        events = []
+        for char in chunk:
+            if self.complete:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    event = self._close_string(json.loads(f'"{"".join(self._raw)}"'))
+                    if event:
+                        events.append(event)
+                    continue
+                self._raw.append(char)
+            elif char == '"' and self._stack:
+                self._in_string = True
+                self._raw = []
+            elif char in "{[":
+                self._stack.append(char)
+                self._expect_key = self._stack == ["{"]
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                self.complete = not self._stack
+            elif char == ":" and self._stack == ["{"]:
+                self._expect_key = False
+            elif char == "," and self._stack == ["{"]:
+                self._expect_key = True
+        return events
+
+    def _close_string(self, value: str) -> Optional[Tuple[str, str]]:
+        if self._stack == ["{"]:
+            if self._expect_key:
+                self._key = value
+                return None
+            if self._key == "title":
+                self.title = value
+                return ("title", value)
+            if self._key == "icon":
+                self.icon = value
+                return ("icon", value)
+            if self._key == "text":
+                # A single string instead of the list of paragraphs.
+                self.paragraphs.append(value)
+                return ("paragraph", value)
+        elif self._stack == ["{", "["] and self._key == "text":
+            self.paragraphs.append(value)
+            return ("paragraph", value)
+        return None
+
+    def result(self) -> NotionPageData:
+        """
+        The parsed page. Raises `ValueError` when the object was cut or the model did not give a title.
+        """
+        if not self.complete:
+            raise ValueError("The streamed response ended before the end of the object")
+        if not self.title:
+            raise ValueError("The streamed response has no title")
+        return self.partial_result()
+
+    def partial_result(self) -> NotionPageData:
+        """
+        The page parsed so far, complete or not.
+        """
+        return NotionPageData(title=self.title or "", text=self.paragraphs, icon=self.icon or DEFAULT_ICON)
+
+
+class StreamingPageRenderer:
+    """
+    Renders a page into Notion while the model is still generating it.
+
+    The page is created once the title and the icon (or the first paragraph) are known, then
+    finished paragraphs are appended in order. Notion calls run in a separate task fed through a
+    queue, so the token stream is never blocked by Notion: the paragraphs that pile up while a
+    request is in flight go out together in the next append. When an append fails, `finish`
+    writes the missing paragraphs once more from where the page stopped.
+    """
+
+    def __init__(self, writer: Optional[NotionPageWriter] = None):
+        self.writer = writer or NotionPageWriter()
+        self.title: Optional[str] = None
+        self.icon: Optional[str] = None
+        self.paragraph_count = 0
+        self.paragraphs: List[str] = []  # everything queued for the page, generated and appendix
+        self.error: Optional[Exception] = None
+        self._page_icon: Optional[str] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def on_event(self, kind: str, value: str):
+        if kind == "title":
+            self.title = value
+            typer.secho(f"📝 {value}", fg=typer.colors.BRIGHT_BLUE)
+        elif kind == "icon":
+            self.icon = value
+        elif kind == "paragraph":
+            self.paragraph_count += 1
+            self.paragraphs.append(value)
+            self._queue.put_nowait(value)
+            preview = value if len(value) <= 70 else value[:67] + "..."
+            typer.echo(f"   ¶{self.paragraph_count} {preview}")
+
+        if self._task is None and self.title and (self.icon or self.paragraph_count):
+            self._task = asyncio.create_task(self._write())
+
+    def add_appendix(self, paragraphs: Sequence[str]):
+        """
+        Queues paragraphs to write after the generated ones, without echoing them.
+        """
+        if self.title:
+            for paragraph in paragraphs:
+                self.paragraphs.append(paragraph)
+                self._queue.put_nowait(paragraph)
+
+    async def finish(self) -> Optional[str]:
+        """
+        Waits for the last paragraphs to be written and fixes the icon if it came after the page creation.
+
+        Returns:
+            Optional[str]: The id of the page, None when no page was created. `error` is still set
+            when the page could not be completed.
+        """
+        if self._task is None:
+            if not self.title:
+                return None
+            self._task = asyncio.create_task(self._write())
+
+        self._queue.put_nowait(None)
+        await self._task
+
+        if self.error is not None and self.writer.page_id:
+            # Resume on the same page, the blocks already written are skipped.
+            try:
+                await self.writer.append(self.paragraphs, skip_blocks=self.writer.blocks_written)
+                self.error = None
+            except Exception as err:
+                self.error = err
+
+        if self.error is None and self.icon and self.icon != self._page_icon:
+            try:
+                await self.writer.client.update_page(self.writer.page_id, {"icon": {"type": "emoji", "emoji": self.icon}})
+            except Exception as err:
+                typer.secho(f"⚠️  Could not set the page icon: {err}", fg=typer.colors.YELLOW, err=True)
+
+        if self.error is not None and self.writer.page_id:
+            typer.secho(
+                f"⚠️  Notion page {self.writer.page_id} is incomplete: {self.error}", fg=typer.colors.YELLOW, err=True
+            )
+        return self.writer.page_id
+
+    async def cancel(self):
+        """
+        Stops writing, when the stream failed. A page already created is reported as incomplete.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        if self.writer.page_id:
+            typer.secho(f"⚠️  Notion page {self.writer.page_id} is incomplete.", fg=typer.colors.YELLOW, err=True)
+
+    async def _write(self):
+        try:
+            self._page_icon = self.icon or DEFAULT_ICON
+            await self.writer.create(title=self.title, emoji=self._page_icon)
+            done = False
+            while not done:
+                batch = [await self._queue.get()]
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                done = batch[-1] is None
+                paragraphs = [paragraph for paragraph in batch if paragraph is not None]
+                if paragraphs:
+                    await self.writer.append(paragraphs)
+        except Exception as err:
+            self.error = err
+
+
+async def stream_notion_page(
+    messages: Sequence[Any], appendix: Sequence[str] = ()
+) -> Tuple[NotionPageData, Optional[str]]:
+    """
+    Generates the page with the model's token stream, rendering it into Notion as it comes.
+
+    The `appendix` paragraphs (e.g. the speaker turns of a conversation) are written after the
+    generated ones, they are not part of the returned page data. A cached response is returned as
+    is (nothing rendered). When the stream cannot be parsed and nothing was rendered, it falls back
+    to the regular structured output call. When a page was already created from a cut answer, that
+    page is kept and reported instead of creating a second one, the same goes for a page Notion
+    failed to complete.
+
+    Returns:
+        Tuple[NotionPageData, Optional[str]]: The page data, and the id of the Notion page when one
+        was rendered (None means it still has to be uploaded).
+    """
+    model = get_model()
+    cached = model.llm_structure_notion_response.lookup(messages)
+    if cached is not None:
+        return cached, None
+
+    parser = NotionPageStreamParser()
+    renderer = StreamingPageRenderer()
+    streamed = False
+    try:
+        with llm_span("llm.stream", model=model.router.model_name("notion")) as span:
+            started = time.perf_counter()
+            async for chunk in model.llm_stream_notion_json.astream(messages):
+                span.add(chunks=1)
+                for kind, value in parser.feed(message_text(chunk)):
+                    if kind == "paragraph" and len(parser.paragraphs) == 1:
+                        span.set(first_paragraph_ms=(time.perf_counter() - started) * 1000)
+                    renderer.on_event(kind, value)
+        streamed = True
+    finally:
+        if not streamed:
+            await renderer.cancel()
+    renderer.add_appendix(appendix)
+    page_id = await renderer.finish()
+
+    try:
+        page_data = parser.result()
+    except ValueError as err:
+        if renderer.writer.page_id:
+            typer.secho(
+                f"⚠️  {err}, Notion page {renderer.writer.page_id} only has the {len(parser.paragraphs)} paragraphs received.",
+                fg=typer.colors.YELLOW,
+                err=True,
+            )
+            return parser.partial_result(), renderer.writer.page_id
+        typer.secho("⚠️  Streamed response could not be parsed, retrying without streaming.", fg=typer.colors.YELLOW)
+        return await model.llm_structure_notion_response.ainvoke(messages), None
+
+    model.llm_structure_notion_response.store(messages, page_data)
+    return page_data, page_id
@@ -0,0 +1,71 @@
+import asyncio
+import math
+from typing import List, Sequence
+
+from app.config import config
+from app.schemas import NotionPageData
+from .llm import get_model
+from .notion import split_text
+from .prompts import notion_assistant_prompt, notion_chunk_prompt, notion_reduce_prompt
+from .transcript import Transcript
+
+# Gemini and most BPE tokenizers average ~4 characters per token on English text.
+CHARS_PER_TOKEN = 4
+TOKENS_PER_WORD = 4 / 3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token count estimate, without a tokenizer: the larger of the character and word based estimates.
+    """
+    return math.ceil(max(len(text) / CHARS_PER_TOKEN, len(text.split()) * TOKENS_PER_WORD))
+
+
+def needs_map_reduce(transcript: Transcript) -> bool:
+    """
+    Whether the transcript is too long for one prompt (`SUMMARY_TOKEN_THRESHOLD`).
+    """
+    return estimate_tokens(transcript.for_prompt()) > config.SUMMARY_TOKEN_THRESHOLD
+
+
+def transcript_chunks(transcript: Transcript) -> List[str]:
+    """
+    Splits a long transcript into chunks of about `SUMMARY_CHUNK_TOKENS`: whole speaker turns for
+    a conversation, sentence boundaries otherwise.
+    """
+    max_chars = config.SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN
+    if transcript.speaker_count > 1:
+        return transcript.turn_chunks(max_chars)
+    return split_text(transcript.text, max_chars)
+
+
+async def summarize_chunk(chunk: str, index: int, count: int) -> List[str]:
+    """
+    Map step: the notes of one chunk.
+    """
+    messages = [notion_assistant_prompt, notion_chunk_prompt(chunk, index, count)]
+    response = await get_model().llm_summarize_chunk.ainvoke(messages)
+    return response.points
+
+
+def reduce_messages(notes: Sequence[List[str]], speakers: int = 1) -> list:
+    """
+    Reduce step prompt, merging the notes of every chunk (in order) into one page.
+    """
+    return [notion_assistant_prompt, notion_reduce_prompt(list(notes), speakers=speakers)]
+
+
+async def structure_long_transcript(transcript: Transcript) -> NotionPageData:
+    """
+    Map-reduce outside of the agent graph (ingest): chunks summarized concurrently, then merged into one page.
+    """
+    chunks = transcript_chunks(transcript)
+    slots = asyncio.Semaphore(config.SUMMARY_CONCURRENCY)
+
+    async def summarize(index: int, chunk: str) -> List[str]:
+        async with slots:
+            return await summarize_chunk(chunk, index, len(chunks))
+
+    notes = await asyncio.gather(*(summarize(index, chunk) for index, chunk in enumerate(chunks)))
+    messages = reduce_messages(notes, speakers=transcript.speaker_count)
+    return await get_model().llm_structure_notion_response.ainvoke(messages)
@@ -0,0 +1,298 @@
+import functools
+import inspect
+import json
+import logging
+import secrets
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import typer
+
+logger = logging.getLogger("notast.tracing")
+
+
+@dataclass
+class Span:
+    """A timed operation (graph node, external call...) with its attributes (bytes, tokens...)."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def add(self, **counters: float):
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any):
+        pass
+
+    def add(self, **counters: float):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Minimal in-process tracer, dependency free.
+
+    Spans nest through a context variable, so concurrent asyncio tasks each get the right parent.
+    All the spans of a process share one trace id. When the tracer is disabled (the default)
+    `span` yields a no-op span and records nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._current: ContextVar[Optional[Span]] = ContextVar("notast_current_span", default=None)
+
+    def enable(self):
+        self.enabled = True
+
+    def current(self) -> Span | _NoopSpan:
+        """
+        The innermost open span, to attach attributes to it from the traced code.
+        """
+        return self._current.get() or NOOP_SPAN
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = self._current.get()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = self._current.set(span)
+        started = time.perf_counter_ns()
+        try:
+            yield span
+        except BaseException as err:
+            span.error = f"{type(err).__name__}: {err}"
+            raise
+        finally:
+            span.end_ns = span.start_ns + time.perf_counter_ns() - started
+            self._current.reset(token)
+            self.spans.append(span)
+            logger.debug("%s %.1f ms %s", name, span.duration_ms, span.attributes)
+
+
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator running a sync or async function inside a span (named after the function by default).
+    """
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ----------------------------
+# Exporters
+# ----------------------------
+def export_jsonl(spans: List[Span], path: Path):
+    """
+    Appends the spans to a JSON lines file, one span per line.
+    """
+    with path.open("a", encoding="utf-8") as f:
+        for span in spans:
+            f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def export_otlp(spans: List[Span], path: Path, service_name: str):
+    """
+    Appends the spans as one OTLP/JSON `ExportTraceServiceRequest` line.
+
+    Every line can be sent as is to an OpenTelemetry collector (`POST /v1/traces`), the whole file
+    can be read by its file receiver.
+    """
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        otlp_spans.append(otlp_span)
+
+    payload = {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": otlp_value(service_name)}]},
+                "scopeSpans": [{"scope": {"name": "notast"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+# ----------------------------
+# Profile report
+# ----------------------------
+COUNTER_SUFFIXES = ("bytes", "tokens")
+
+
+def profile_rows(spans: List[Span]) -> List[Dict[str, Any]]:
+    """
+    Aggregates the spans by name, in order of first appearance, with their nesting depth.
+    """
+    by_id = {span.span_id: span for span in spans}
+
+    def depth(span: Span) -> int:
+        level = 0
+        while span.parent_id in by_id:
+            span = by_id[span.parent_id]
+            level += 1
+        return level
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    for span in sorted(spans, key=lambda span: span.start_ns):
+        row = rows.setdefault(
+            span.name, {"name": span.name, "depth": depth(span), "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0}
+        )
+        row["calls"] += 1
+        row["total_ms"] += span.duration_ms
+        row["max_ms"] = max(row["max_ms"], span.duration_ms)
+        row["errors"] += span.error is not None
+        for key, value in span.attributes.items():
+            if key.endswith(COUNTER_SUFFIXES) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                row[key] = row.get(key, 0) + value
+    return list(rows.values())
+
+
+def print_profile(spans: List[Span]):
+    if not spans:
+        typer.echo("No spans recorded.", err=True)
+        return
+
+    wall_ms = (max(span.end_ns for span in spans) - min(span.start_ns for span in spans)) / 1e6
+    typer.secho(f"\n⏱️  Profile ({wall_ms:.0f} ms wall time)", fg=typer.colors.BRIGHT_BLUE, err=True)
+    typer.echo(f"{'stage':<40} {'calls':>5} {'total ms':>10} {'max ms':>9} {'% wall':>7}  counters", err=True)
+    for row in profile_rows(spans):
+        counters = ", ".join(
+            f"{key}={value:.0f}" for key, value in row.items() if key.endswith(COUNTER_SUFFIXES)
+        )
+        if row["errors"]:
+            counters = f"errors={row['errors']} {counters}".strip()
+        name = "  " * row["depth"] + row["name"]
+        typer.echo(
+            f"{name:<40} {row['calls']:>5} {row['total_ms']:>10.1f} {row['max_ms']:>9.1f} "
+            f"{row['total_ms'] / wall_ms:>7.0%}  {counters}",
+            err=True,
+        )
+
+
+def configure_logging(level: str):
+    """
+    Sends the `notast.*` loggers to stderr at `level` (`Config.LOG_LEVEL`), third party loggers are left alone.
+    """
+    app_logger = logging.getLogger("notast")
+    app_logger.setLevel(level.upper())
+    if not app_logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        app_logger.addHandler(handler)
+
+
+def export_spans(trace_file: str, trace_format: str, service_name: str) -> List[Span]:
+    """
+    Appends the spans recorded so far to `trace_file` and removes them from the tracer, so a
+    long-lived process (`notast serve`) exports every job without keeping its spans around.
+    """
+    spans, tracer.spans = tracer.spans, []
+    if spans:
+        path = Path(trace_file).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if trace_format == "otlp":
+            export_otlp(spans, path, service_name)
+        else:
+            export_jsonl(spans, path)
+        typer.echo(f"🧾 {len(spans)} spans written to {path}", err=True)
+    return spans
+
+
+def finish_tracing(profile: bool, trace_file: Optional[str], trace_format: str, service_name: str):
+    """
+    Exports the recorded spans and prints the profile, called once when the command ends.
+    """
+    spans = export_spans(trace_file, trace_format, service_name) if trace_file else list(tracer.spans)
+    if profile:
+        print_profile(spans)
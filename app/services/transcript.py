@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Paragraphs starting with "### " are written as headings (see `notion.paragraph_blocks`).
+CONVERSATION_HEADING = "### 🗣️ Conversation"
+
+
+@dataclass
+class SpeakerTurn:
+    speaker: str
+    start: float
+    end: float
+    text: str
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def speaker_label(speaker: str) -> str:
+    """
+    Readable name of an ElevenLabs speaker id: "speaker_0" -> "Speaker 1".
+    """
+    prefix, _, number = speaker.rpartition("_")
+    return f"Speaker {int(number) + 1}" if prefix == "speaker" and number.isdigit() else speaker
+
+
+class Transcript:
+    """
+    Speaker-diarized transcript, stored as columns with one row per word.
+
+    ElevenLabs answers with one object per word (text, start, end, speaker...). Only the words are
+    kept, in parallel arrays: `starts`/`ends` in seconds (float32) and `speakers` as uint16 codes
+    into `speaker_names`, which is a few bytes per word instead of a dict per word. Transcripts
+    without word details (old cache entries, fakes) only have `text`.
+
+    Timestamps are in the time of the recording: the uploaded audio has its long pauses trimmed
+    (VAD), the timestamps of its transcript are mapped back with `map_times`.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        words: Iterable[str] = (),
+        starts: Optional[Sequence[float]] = None,
+        ends: Optional[Sequence[float]] = None,
+        speakers: Optional[Sequence[int]] = None,
+        speaker_names: Iterable[str] = (),
+    ):
+        self.text = text
+        self.words: List[str] = list(words)
+        self.starts = np.asarray(starts if starts is not None else [], dtype=np.float32)
+        self.ends = np.asarray(ends if ends is not None else [], dtype=np.float32)
+        self.speakers = np.asarray(speakers if speakers is not None else [], dtype=np.uint16)
+        self.speaker_names: List[str] = list(speaker_names)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} words, {self.speaker_count} speakers, {len(self.text)} chars)"
+
+    @property
+    def speaker_count(self) -> int:
+        return len(np.unique(self.speakers)) if len(self) else 0
+
+    @property
+    def duration(self) -> float:
+        return float(self.ends.max()) if len(self) else 0.0
+
+    @classmethod
+    def from_elevenlabs(cls, response: Any) -> "Transcript":
+        """
+        Builds the transcript of an ElevenLabs speech-to-text response, spacing and audio events are dropped.
+        """
+        words, starts, ends, speakers = [], [], [], []
+        codes: dict[str, int] = {}
+        for word in getattr(response, "words", None) or []:
+            if getattr(word, "type", "word") != "word":
+                continue
+            start = word.start or 0.0
+            words.append(word.text)
+            starts.append(start)
+            ends.append(word.end or start)
+            speakers.append(codes.setdefault(getattr(word, "speaker_id", None) or "speaker_0", len(codes)))
+        return cls(response.text, words, starts, ends, speakers, codes)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Transcript":
+        """
+        Rebuilds a transcript saved by `to_dict`, entries holding only a "text" (older cache format) are accepted.
+        """
+        to_seconds = lambda values: np.asarray(values, dtype=np.float32) / 1000  # noqa: E731
+        return cls(
+            data["text"],
+            data.get("words", ()),
+            to_seconds(data.get("starts_ms", [])),
+            to_seconds(data.get("ends_ms", [])),
+            data.get("speakers", []),
+            data.get("speaker_names", ()),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Compact JSON form (cache entries, graph checkpoints): timestamps as integer milliseconds.
+        """
+        return {
+            "text": self.text,
+            "words": self.words,
+            "starts_ms": np.rint(self.starts * 1000).astype(np.int64).tolist(),
+            "ends_ms": np.rint(self.ends * 1000).astype(np.int64).tolist(),
+            "speakers": self.speakers.tolist(),
+            "speaker_names": self.speaker_names,
+        }
+
+    def map_times(self, mapping: Callable[[np.ndarray], np.ndarray]) -> "Transcript":
+        """
+        Copy of the transcript with every word start and end passed through `mapping` (seconds to seconds).
+        """
+        return Transcript(
+            self.text, self.words, mapping(self.starts), mapping(self.ends), self.speakers, self.speaker_names
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence[Tuple[float, "Transcript"]]) -> "Transcript":
+        """
+        Stitches transcripts of consecutive segments, each given with its offset in seconds.
+
+        Every segment is diarized on its own, so speakers are matched across segments by their
+        label ("speaker_0"...), which is a best effort.
+        """
+        names: dict[str, int] = {}
+        words: List[str] = []
+        starts, ends, speakers = [], [], []
+        for offset, part in parts:
+            words += part.words
+            starts.append(part.starts + offset)
+            ends.append(part.ends + offset)
+            remap = np.array([names.setdefault(name, len(names)) for name in part.speaker_names], dtype=np.uint16)
+            speakers.append(remap[part.speakers] if len(part) else part.speakers)
+
+        text = " ".join(part.text.strip() for _, part in parts if part.text and part.text.strip())
+        if not parts:
+            return cls(text)
+        return cls(text, words, np.concatenate(starts), np.concatenate(ends), np.concatenate(speakers), names)
+
+    def turns(self) -> List[SpeakerTurn]:
+        """
+        Groups the consecutive words of the same speaker, empty when there are no word details.
+        """
+        if not len(self):
+            return []
+
+        changes = np.flatnonzero(np.diff(self.speakers)) + 1
+        firsts = np.concatenate(([0], changes))
+        lasts = np.concatenate((changes, [len(self)])) - 1
+        return [
+            SpeakerTurn(
+                speaker=self.speaker_names[self.speakers[first]],
+                start=float(self.starts[first]),
+                end=float(self.ends[last]),
+                text=" ".join(self.words[first : last + 1]),
+            )
+            for first, last in zip(firsts.tolist(), lasts.tolist())
+        ]
+
+    def turn_lines(self) -> List[str]:
+        return [f"[{format_timestamp(turn.start)}] {speaker_label(turn.speaker)}: {turn.text}" for turn in self.turns()]
+
+    def for_prompt(self) -> str:
+        """
+        The text sent to the LLM: one timestamped line per speaker turn for conversations, the plain text otherwise.
+        """
+        if self.speaker_count < 2:
+            return self.text
+        return "\n".join(self.turn_lines())
+
+    def speaker_section(self) -> List[str]:
+        """
+        Paragraphs appended to the Notion page of a conversation: a heading and every timestamped speaker turn.
+        """
+        if self.speaker_count < 2:
+            return []
+        return [CONVERSATION_HEADING, *self.turn_lines()]
+
+    def turn_chunks(self, max_chars: int) -> List[str]:
+        """
+        Splits a conversation into chunks of whole speaker turns of at most `max_chars` characters
+        (a longer turn makes a chunk on its own), so a long meeting can be processed in parallel.
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        size = 0
+        for line in self.turn_lines() or [self.text]:
+            if current and size + len(line) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Optional
+
+from app.config import config
+
+
+class TranscriptCache:
+    """
+    Content-addressed, size-bounded on-disk cache of speech-to-text transcripts.
+
+    Entries are keyed by a SHA-256 of the uploaded audio plus the transcription settings
+    (model id, language, diarization...), so the same recording is only paid for once even when a
+    later step (LLM, Notion) fails and the whole flow is re-run. Every entry is a small JSON file
+    written atomically (temp file + rename). Reads refresh the file mtime, and when the cache grows
+    over `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(audio: bytes | memoryview, **settings: Any) -> str:
+        digest = hashlib.sha256(audio)
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["transcript"]
+
+    def put(self, key: str, transcript: dict[str, Any], **settings: Any):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "settings": settings,
+            "transcript": transcript,
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+
+    def entries(self) -> List[dict[str, Any]]:
+        """
+        Returns the cached entries (key, size, last access), most recently used first.
+        """
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append(
+                {
+                    "key": path.stem,
+                    "bytes": stat.st_size,
+                    "last_used": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                }
+            )
+
+        return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)
+
+    def total_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self.entries())
+
+    def evict(self) -> int:
+        """
+        Deletes the least recently used entries until the cache fits in `max_bytes`.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        with self._lock:
+            entries = self.entries()
+            total = sum(entry["bytes"] for entry in entries)
+            evicted = 0
+            while entries and total > self.max_bytes:
+                entry = entries.pop()
+                self._path(entry["key"]).unlink(missing_ok=True)
+                total -= entry["bytes"]
+                evicted += 1
+
+        return evicted
+
+    def purge(self) -> int:
+        entries = self.entries()
+        for entry in entries:
+            self._path(entry["key"]).unlink(missing_ok=True)
+        return len(entries)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+
+def get_transcript_cache() -> TranscriptCache:
+    return TranscriptCache(
+        directory=Path(config.CACHE_DIR) / "transcripts",
+        max_bytes=config.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024,
+    )
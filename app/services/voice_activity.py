@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class VADResult:
+    """Audio left after the silence trimming and how much of it was removed."""
+
+    audio: np.ndarray  # int16 samples, shape (frames, channels)
+    fs: int
+    original_frames: int
+    # Start of every kept span, as (frame in the original audio, frame in the trimmed audio) rows.
+    kept_spans: Optional[np.ndarray] = None
+
+    def original_seconds(self, seconds: np.ndarray) -> np.ndarray:
+        """
+        Maps times of the trimmed audio (e.g. word timestamps of its transcript) back to the original audio.
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if self.kept_spans is None or not len(self.kept_spans):
+            return seconds
+        original_starts, trimmed_starts = self.kept_spans[:, 0], self.kept_spans[:, 1]
+        frames = seconds * self.fs
+        span = np.maximum(np.searchsorted(trimmed_starts, frames, side="right") - 1, 0)
+        return (frames - trimmed_starts[span] + original_starts[span]) / self.fs
+
+    @property
+    def kept_frames(self) -> int:
+        return len(self.audio)
+
+    @property
+    def removed_seconds(self) -> float:
+        return (self.original_frames - self.kept_frames) / self.fs
+
+    @property
+    def removed_ratio(self) -> float:
+        if not self.original_frames:
+            return 0.0
+        return 1 - self.kept_frames / self.original_frames
+
+
+def frame_features(samples: np.ndarray, frame_length: int):
+    """
+    Computes the energy (dBFS) and zero-crossing rate of consecutive, non-overlapping frames.
+
+    Args:
+        samples (np.ndarray): Mono float samples in [-1, 1].
+        frame_length (int): Samples per frame.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Energy in dBFS and zero-crossing rate (0-1) of every frame.
+    """
+    frame_count = len(samples) // frame_length
+    frames = samples[: frame_count * frame_length].reshape(frame_count, frame_length)
+
+    energy_db = 10 * np.log10(np.einsum("ij,ij->i", frames, frames) / frame_length + 1e-12)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return energy_db, zcr
+
+
+def speech_mask(
+    energy_db: np.ndarray,
+    zcr: np.ndarray,
+    energy_threshold_db: float,
+    zcr_threshold: float,
+    noise_margin_db: float,
+) -> np.ndarray:
+    """
+    Flags the frames that contain speech.
+
+    Voiced speech is loud, so frames above the energy threshold are kept. The threshold adapts to
+    the recording: it is raised to `noise_margin_db` above the estimated noise floor (10th
+    percentile of the frame energies). The floor estimate is capped at `energy_threshold_db`:
+    a buffer without real silence (continuous speech, a streamed segment) has its quietest frames
+    well above it, and they are speech, not noise. Unvoiced sounds ("s", "f", "sh") are quieter but have a
+    high zero-crossing rate, so frames up to 10 dB below the threshold are also kept when their
+    zero-crossing rate is above `zcr_threshold`.
+    """
+    noise_floor_db = min(np.percentile(energy_db, 10), energy_threshold_db) if len(energy_db) else -120.0
+    threshold_db = max(energy_threshold_db, noise_floor_db + noise_margin_db)
+
+    voiced = energy_db > threshold_db
+    unvoiced = (energy_db > threshold_db - 10) & (zcr > zcr_threshold)
+    return voiced | unvoiced
+
+
+def keep_mask(speech: np.ndarray, padding_frames: int, max_pause_frames: int) -> np.ndarray:
+    """
+    Turns the speech mask into the mask of frames to keep.
+
+    Speech is padded on both sides, leading/trailing silence is dropped and every pause between
+    two speech regions is collapsed to at most `max_pause_frames`.
+    """
+    if padding_frames:
+        window = np.ones(2 * padding_frames + 1, dtype=np.int32)
+        # "full" then centered: "same" returns max(len(speech), len(window)) values for short inputs.
+        padded = np.convolve(speech.astype(np.int32), window, mode="full")
+        speech = padded[padding_frames : padding_frames + len(speech)] > 0
+
+    if not speech.any():
+        return speech
+
+    # Run-length encoding of the mask: each frame gets the index of its run and its position in it.
+    boundaries = np.flatnonzero(speech[1:] != speech[:-1]) + 1
+    run_starts = np.concatenate(([0], boundaries))
+    run_ids = np.repeat(np.arange(len(run_starts)), np.diff(np.concatenate((run_starts, [len(speech)]))))
+    position_in_run = np.arange(len(speech)) - run_starts[run_ids]
+
+    first_speech, last_speech = np.flatnonzero(speech)[[0, -1]]
+    inner = (np.arange(len(speech)) > first_speech) & (np.arange(len(speech)) < last_speech)
+    pause_kept = ~speech & inner & (position_in_run < max_pause_frames)
+    return speech | pause_kept
+
+
+def trim_silence(
+    pcm: np.ndarray,
+    fs: int,
+    frame_ms: int = 30,
+    energy_threshold_db: float = -45.0,
+    zcr_threshold: float = 0.25,
+    noise_margin_db: float = 10.0,
+    padding_ms: int = 200,
+    max_pause_ms: int = 600,
+) -> VADResult:
+    """
+    Energy / zero-crossing voice activity detection, fully vectorized with NumPy.
+
+    Removes the leading and trailing silence and shortens long pauses so less audio is uploaded
+    and billed for transcription.
+
+    Args:
+        pcm (np.ndarray): int16 samples with shape (frames, channels) or (frames,).
+        fs (int): The sample rate of the audio data.
+        frame_ms (int): Analysis frame length in milliseconds.
+        energy_threshold_db (float): Minimum frame energy (dBFS) considered speech.
+        zcr_threshold (float): Zero-crossing rate above which quieter frames count as unvoiced speech.
+        noise_margin_db (float): How far above the noise floor speech must be.
+        padding_ms (int): Audio kept around every speech region.
+        max_pause_ms (int): Longest pause kept between two speech regions.
+
+    Returns:
+        VADResult: The trimmed audio (same dtype and channels) and how much was removed.
+    """
+    pcm = pcm.reshape(-1, 1) if pcm.ndim == 1 else pcm
+    frame_length = max(1, int(fs * frame_ms / 1000))
+    if len(pcm) < frame_length:
+        # Not even one analysis frame, nothing to decide on.
+        return VADResult(audio=pcm, fs=fs, original_frames=len(pcm))
+    mono = pcm.mean(axis=1, dtype=np.float32) if pcm.shape[1] > 1 else pcm[:, 0].astype(np.float32)
+    mono /= 32768.0
+
+    energy_db, zcr = frame_features(mono, frame_length)
+    speech = speech_mask(energy_db, zcr, energy_threshold_db, zcr_threshold, noise_margin_db)
+    keep = keep_mask(
+        speech,
+        padding_frames=int(padding_ms / frame_ms),
+        max_pause_frames=int(max_pause_ms / frame_ms),
+    )
+
+    # Back from frames to samples, the incomplete last frame follows the last full frame.
+    sample_mask = np.repeat(keep, frame_length)
+    tail = len(pcm) - len(sample_mask)
+    if tail:
+        sample_mask = np.concatenate((sample_mask, np.full(tail, keep[-1] if len(keep) else True)))
+
+    starts = np.flatnonzero(sample_mask & ~np.concatenate(([False], sample_mask[:-1])))
+    ends = np.flatnonzero(sample_mask & ~np.concatenate((sample_mask[1:], [False]))) + 1
+    lengths = ends - starts
+    trimmed_starts = np.cumsum(lengths) - lengths
+    return VADResult(
+        audio=pcm[sample_mask],
+        fs=fs,
+        original_frames=len(pcm),
+        kept_spans=np.stack((starts, trimmed_starts), axis=1),
+    )
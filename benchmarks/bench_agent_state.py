@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of the per-node cost of AgentState updates as the message history grows.
+
+Compares the previous approach (pydantic `AgentState` where every node `model_copy`s the whole
+state and rebuilds `messages`) with TypedDict states where nodes only return their new messages:
+once merged by the stock `operator.add` reducer, which rebuilds the list on every update, and once
+by the `AppendOnlyList` channel of `AgentState`, which extends it in place so the per-step cost
+stays flat whatever the size of the history. Each graph is a chain of `--steps` nodes appending one
+message, invoked with an initial history of increasing size. The per-step cost is the slope
+between a chain of `steps` and one of `2 * steps` nodes, which removes the fixed input/output cost.
+
+    python -m benchmarks.bench_agent_state --steps 20 --sizes 10 1000 10000 50000
+"""
+
+import argparse
+import gc
+import operator
+import time
+from datetime import datetime, timezone
+from typing import Annotated, List, Optional
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, START, StateGraph
+from pydantic import BaseModel, Field
+from typing_extensions import TypedDict
+
+from app.schemas import NotionPageData
+from app.services.agent import AgentState, utc_now
+
+
+class LegacyAgentState(BaseModel):
+    messages: List = Field(default_factory=list)
+    page_data: Optional[NotionPageData] = None
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ReducerAgentState(TypedDict, total=False):
+    messages: Annotated[list, operator.add]
+    updated_at: datetime
+
+
+def legacy_step(state: LegacyAgentState) -> LegacyAgentState:
+    return state.model_copy(
+        update={
+            "messages": state.messages + [HumanMessage(content="step")],
+            "updated_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+def reducer_step(state: ReducerAgentState):
+    return {"messages": [HumanMessage(content="step")], "updated_at": utc_now()}
+
+
+def append_only_step(state: AgentState):
+    return {"messages": [HumanMessage(content="step")], "updated_at": utc_now()}
+
+
+def build_chain(schema, step, steps: int):
+    workflow = StateGraph(schema)
+    previous = START
+    for index in range(steps):
+        name = f"step_{index}"
+        workflow.add_node(name, step)
+        workflow.add_edge(previous, name)
+        previous = name
+    workflow.add_edge(previous, END)
+    return workflow.compile()
+
+
+def best_run_seconds(app, initial_state, steps: int, repeat: int) -> float:
+    best = float("inf")
+    # Like timeit, keep the garbage collector out: its full passes scale with the live history.
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.invoke(initial_state, config={"recursion_limit": steps + 10})
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def per_step_microseconds(schema, step, initial_state, steps: int, repeat: int) -> float:
+    short = best_run_seconds(build_chain(schema, step, steps), initial_state, steps, repeat)
+    long = best_run_seconds(build_chain(schema, step, 2 * steps), initial_state, 2 * steps, repeat)
+    return (long - short) / steps * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20, help="Nodes in the benchmark chain.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size, the best one is reported.")
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'model_copy (us/step)':>22} {'operator.add (us/step)':>24} {'append-only (us/step)':>23}")
+    for size in args.sizes:
+        history = [HumanMessage(content=f"message {index}") for index in range(size)]
+        legacy_us = per_step_microseconds(
+            LegacyAgentState, legacy_step, LegacyAgentState(messages=history), args.steps, args.repeat
+        )
+        reducer_us = per_step_microseconds(
+            ReducerAgentState, reducer_step, ReducerAgentState(messages=history, updated_at=utc_now()), args.steps, args.repeat
+        )
+        append_us = per_step_microseconds(
+            AgentState, append_only_step, AgentState(messages=history, updated_at=utc_now()), args.steps, args.repeat
+        )
+        print(f"{size:>8} {legacy_us:>22.1f} {reducer_us:>24.1f} {append_us:>23.1f}")
+
+
+if __name__ == "__main__":
+    main()
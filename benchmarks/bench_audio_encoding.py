@@ -0,0 +1,68 @@
+"""
+Encode time vs bytes on the wire for the transcription upload formats.
+
+Encodes a synthetic speech-like recording as WAV and FLAC, at the recording sample rate and
+downsampled to 16 kHz, and reports the encoding time and size of each variant against the raw
+44.1 kHz WAV that used to be uploaded.
+
+    python -m benchmarks.bench_audio_encoding --seconds 300
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.audio_encoding import encode_flac, resample_pcm
+from app.services.recording_capabilities import transform_audio_to_in_memory_wav_file
+
+
+def synthetic_speech(seconds: int, fs: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(seconds * fs) / fs
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / fs
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8)) * (0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t)))
+    signal = 0.2 * voiced + rng.normal(0, 0.003, len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).reshape(-1, 1)
+
+
+def encode(pcm: np.ndarray, fs: int, target_fs: int, encoding: str):
+    if target_fs != fs:
+        pcm = resample_pcm(pcm, fs, target_fs)
+    if encoding == "flac":
+        return encode_flac(pcm, target_fs)
+    return transform_audio_to_in_memory_wav_file(raw_audio=pcm, fs=target_fs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300)
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pcm = synthetic_speech(args.seconds, args.fs)
+    baseline = None
+
+    print(f"{'variant':<16} {'encode (ms)':>12} {'size (MB)':>10} {'vs raw WAV':>11}")
+    for target_fs in (args.fs, 16000):
+        for encoding in ("wav", "flac"):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                buffer = encode(pcm, args.fs, target_fs, encoding)
+                best = min(best, time.perf_counter() - start)
+
+            name = f"{encoding} @ {target_fs / 1000:g} kHz"
+            if buffer is None:
+                print(f"{name:<16} {'soundfile not installed':>35}")
+                continue
+
+            size = len(buffer.getvalue())
+            baseline = baseline or size
+            print(f"{name:<16} {best * 1e3:>12.1f} {size / 1e6:>10.2f} {size / baseline:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
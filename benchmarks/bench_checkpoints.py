@@ -0,0 +1,81 @@
+"""
+Measures the overhead the SQLite checkpointer adds to every node of the record-idea graph.
+
+Recording, the LLM and Notion are replaced by instant fakes, so the run time is only LangGraph
+and the checkpoint writes. The graph runs without a checkpointer, then with the SQLite one in
+the "async" durability used by the CLI (checkpoint written while the next node runs) and in the
+"sync" one (every node waits for its write). The script fails when the per-node overhead of the
+CLI setup goes over `--max-overhead-ms`.
+
+    python -m benchmarks.bench_checkpoints --runs 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import config
+from app.services import agent
+from app.services.checkpoints import new_run_id, open_checkpointer, run_config
+from app.services.notion import notion_client
+
+from .bench_concurrent_graphs import install_fakes
+
+NODES = 4
+
+
+async def seconds_per_run(checkpointer, durability: str, runs: int) -> float:
+    app = agent.build_graph(checkpointer)
+    best = float("inf")
+    async with notion_client:
+        for _ in range(runs):
+            initial_state = agent.AgentState(messages=[], page_data=None, error=None, updated_at=agent.utc_now())
+            start = time.perf_counter()
+            await app.ainvoke(initial_state, config=run_config(new_run_id("idea")), durability=durability)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def measure(runs: int) -> dict[str, float]:
+    results = {"none": await seconds_per_run(None, "async", runs)}
+    async with open_checkpointer() as checkpointer:
+        for durability in ("async", "sync"):
+            results[durability] = await seconds_per_run(checkpointer, durability, runs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="Graph runs per setup, the best one is reported.")
+    parser.add_argument("--max-overhead-ms", type=float, default=5.0, help="Max checkpoint cost per node.")
+    args = parser.parse_args()
+
+    install_fakes(latency=0)
+    config.CHECKPOINTS_ENABLED = True
+    config.CHECKPOINTS_PATH = str(Path(tempfile.mkdtemp()) / "checkpoints.sqlite3")
+
+    # The fake nodes print their progress, keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(measure(args.runs))
+
+    baseline = results["none"]
+    print(f"no checkpointer        {baseline * 1000:8.2f} ms/run")
+    for durability in ("async", "sync"):
+        overhead_ms = (results[durability] - baseline) / NODES * 1000
+        print(f"sqlite, {durability:<5} durability {results[durability] * 1000:8.2f} ms/run  (+{overhead_ms:.2f} ms/node)")
+
+    overhead_ms = (results["async"] - baseline) / NODES * 1000
+    if overhead_ms > args.max_overhead_ms:
+        print(f"FAIL: checkpoint overhead over {args.max_overhead_ms} ms per node", file=sys.stderr)
+        sys.exit(1)
+
+    print("OK: checkpoint overhead within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Checks that several agent graphs make progress side by side on one event loop.
+
+Recording, transcription, the LLM and Notion are replaced by local stand-ins that only await
+`asyncio.sleep`, so any node blocking the event loop shows up as serialized wall time.
+The script runs one graph alone, then N graphs concurrently, and fails when the concurrent run
+takes much longer than a single one.
+
+    python -m benchmarks.bench_concurrent_graphs --graphs 4 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from app.config import config
+from app.schemas import NotionPageData, QuoteMMM
+from app.services import agent, llm, mmm_agent
+from app.services.notion import RateLimiter, notion_client
+from app.services.transcript import Transcript
+
+
+class FakeStructuredLLM:
+    def __init__(self, schema, latency: float):
+        self.schema = schema
+        self.latency = latency
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        if self.schema is QuoteMMM:
+            return QuoteMMM(author="Unknown Author", phrase="Keep going.")
+        return NotionPageData(title="Idea", text=["First paragraph."], icon="💡")
+
+
+class FakeLLM:
+    def __init__(self, latency: float):
+        self.mmm_structure_llm = FakeStructuredLLM(QuoteMMM, latency)
+        self.llm_structure_notion_response = FakeStructuredLLM(NotionPageData, latency)
+
+
+def install_fakes(latency: float):
+    llm._model = FakeLLM(latency)
+
+    async def fake_transcription():
+        await asyncio.sleep(latency)
+        return Transcript("An idea to make the CLI faster.")
+
+    agent.atransformation_audio_to_text = fake_transcription
+
+    async def fake_notion(request: httpx.Request):
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"id": "page-id"})
+
+    notion_client.transport = httpx.MockTransport(fake_notion)
+    # The fake Notion has no rate limit, only the graph concurrency is measured.
+    notion_client.rate_limiter = RateLimiter(0)
+    # Upload in the graph itself instead of queuing into the real outbox.
+    config.OUTBOX_ENABLED = False
+    # Checkpoints, caches and the idea index stay on, in a throwaway folder.
+    workdir = Path(tempfile.mkdtemp(prefix="notast-bench-"))
+    config.CHECKPOINTS_PATH = str(workdir / "checkpoints.sqlite3")
+    config.CACHE_DIR = str(workdir / "cache")
+    config.INDEX_DIR = str(workdir / "index")
+
+
+async def run_graphs(count: int) -> float:
+    start = time.perf_counter()
+    async with notion_client:
+        await asyncio.gather(
+            *(agent.build_graph_and_create_new_code_idea() for _ in range(count)),
+            *(mmm_agent.run_mmm_graph_agent(topic="focus") for _ in range(count)),
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graphs", type=int, default=4, help="Graphs of each kind run concurrently.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds every fake external call takes.")
+    parser.add_argument("--max-ratio", type=float, default=1.5, help="Max concurrent/single wall time ratio.")
+    args = parser.parse_args()
+
+    install_fakes(args.latency)
+    single = asyncio.run(run_graphs(1))
+    concurrent = asyncio.run(run_graphs(args.graphs))
+    ratio = concurrent / single
+
+    print(f"1 record-idea + 1 mmm graph:   {single:.2f}s")
+    print(f"{args.graphs} record-idea + {args.graphs} mmm graphs: {concurrent:.2f}s  (ratio {ratio:.2f})")
+    if ratio > args.max_ratio:
+        print(f"FAIL: graphs did not run side by side (ratio > {args.max_ratio})", file=sys.stderr)
+        sys.exit(1)
+
+    print("OK: graphs make progress concurrently")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Memory/allocation benchmark: list-of-arrays recording vs the preallocated `PCMBuffer`.
+
+Simulates the `sd.InputStream` callbacks of a full recording and measures the peak traced memory
+and the wall time of both paths.
+
+    python -m benchmarks.bench_recording_buffer --seconds 300 --blocksize 512
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.services.audio_buffer import PCMBuffer
+
+
+def record_with_list(blocks, duration_limit, fs, channels):
+    frames = []
+    for block in blocks:
+        frames.append(block.copy())
+
+    recording = np.concatenate(frames, axis=0)
+    recording_int16 = (recording * 32767).astype(np.int16)
+    return recording_int16.tobytes()
+
+
+def record_with_pcm_buffer(blocks, duration_limit, fs, channels):
+    buffer = PCMBuffer.for_duration(duration_limit, fs=fs, channels=channels)
+    for block in blocks:
+        buffer.write(block)
+
+    return buffer.memoryview()
+
+
+def measure(name, record, blocks, duration_limit, fs, channels):
+    tracemalloc.start()
+    start = time.perf_counter()
+    audio = record(blocks, duration_limit, fs, channels)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:<12} peak={peak / 1e6:8.1f} MB  "
+        f"retained={current / 1e6:8.1f} MB  "
+        f"time={elapsed * 1e3:8.1f} ms  "
+        f"audio={len(audio) / 1e6:.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300, help="Recording length, 300 is the hard limit.")
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--blocksize", type=int, default=512, help="Frames per audio callback.")
+    args = parser.parse_args()
+
+    # One reusable block, like sounddevice hands the same `indata` memory to every callback.
+    rng = np.random.default_rng(0)
+    block = rng.uniform(-1, 1, size=(args.blocksize, args.channels)).astype(np.float32)
+    blocks = [block] * (args.seconds * args.fs // args.blocksize)
+
+    print(f"{len(blocks)} callbacks of {args.blocksize} frames ({args.seconds}s @ {args.fs} Hz)")
+    measure("list+concat", record_with_list, blocks, args.seconds, args.fs, args.channels)
+    measure("PCMBuffer", record_with_pcm_buffer, blocks, args.seconds, args.fs, args.channels)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+CLI startup benchmark.
+
+Measures the cumulative import time of `app.cli` with `python -X importtime` and the wall time of
+light commands (`--help`, `create`), then checks them against a startup budget. It exits with
+code 1 when a budget is exceeded, so it can guard against heavy imports creeping back in.
+
+    python -m benchmarks.bench_startup --runs 5 --import-budget 0.35 --command-budget 0.9
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+# Modules that must never be loaded just to start the CLI.
+HEAVY_MODULES = ("langgraph", "langchain_google_genai", "elevenlabs", "sounddevice", "numpy")
+
+LIGHT_COMMANDS = {
+    "--help": ["--help"],
+    "create": ["create", "--username", "bench"],
+    "cache --help": ["cache", "--help"],
+}
+
+
+def measure_import(module: str = "app.cli"):
+    """
+    Returns the cumulative import time of `module` in seconds and every module it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(2)] = int(match.group(1)) / 1e6
+
+    return cumulative[module], set(cumulative)
+
+
+def measure_command(args, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "app.cli", *args], cwd=ROOT, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command, the median is reported.")
+    parser.add_argument("--import-budget", type=float, default=0.35, help="Max seconds to import app.cli.")
+    parser.add_argument("--command-budget", type=float, default=0.9, help="Max seconds for a light command.")
+    args = parser.parse_args()
+
+    failures = []
+
+    import_seconds, modules = measure_import()
+    print(f"{'import app.cli':<20} {import_seconds * 1e3:8.1f} ms  (budget {args.import_budget * 1e3:.0f} ms)")
+    if import_seconds > args.import_budget:
+        failures.append(f"import app.cli took {import_seconds:.3f}s")
+
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy[:5])}")
+
+    for name, command in LIGHT_COMMANDS.items():
+        seconds = measure_command(command, args.runs)
+        print(f"{'notast ' + name:<20} {seconds * 1e3:8.1f} ms  (budget {args.command_budget * 1e3:.0f} ms)")
+        if seconds > args.command_budget:
+            failures.append(f"notast {name} took {seconds:.3f}s")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+    print("OK: startup within budget")
+
+
+if __name__ == "__main__":
+    main()
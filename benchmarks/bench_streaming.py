@@ -0,0 +1,130 @@
+"""
+Compares the blocking and the streamed LLM -> Notion paths of record-idea.
+
+A fake model generates a page of `--paragraphs` paragraphs token by token (`--token-ms` per
+chunk) and a fake Notion answers every request after `--notion-ms` plus `--block-ms` per
+written block. The blocking path waits for the whole structured answer and then uploads the
+page, the streaming path parses the token stream and renders the page while it is generated.
+For both, the script reports when the first paragraph reached Notion and when the page was
+complete.
+
+    python -m benchmarks.bench_streaming --paragraphs 6 --token-ms 20 --notion-ms 150 --block-ms 40
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from typing import List
+
+import httpx
+from langchain_core.messages import AIMessageChunk
+
+from app.config import config
+from app.schemas import NotionPageData
+from app.services import llm
+from app.services.notion import RateLimiter, create_notion_page, notion_client
+from app.services.streaming_page import stream_notion_page
+
+CHUNK_CHARS = 12
+
+
+class FakeStreamingModel:
+    def __init__(self, page: NotionPageData, token_seconds: float):
+        self.page = page
+        self.token_seconds = token_seconds
+        self.llm_structure_notion_response = self
+        self.llm_stream_notion_json = self
+
+    def chunks(self) -> List[str]:
+        text = json.dumps(
+            {"title": self.page.title, "icon": self.page.icon, "text": self.page.text}, ensure_ascii=False, indent=1
+        )
+        return [text[start : start + CHUNK_CHARS] for start in range(0, len(text), CHUNK_CHARS)]
+
+    def lookup(self, messages):
+        return None
+
+    def store(self, messages, response):
+        pass
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        # Same pace as the stream, only the complete answer is returned at the end.
+        for _ in self.chunks():
+            await asyncio.sleep(self.token_seconds)
+        return self.page
+
+    async def astream(self, messages, *args, **kwargs):
+        for chunk in self.chunks():
+            await asyncio.sleep(self.token_seconds)
+            yield AIMessageChunk(content=chunk)
+
+
+class NotionTimeline:
+    def __init__(self, latency: float, block_latency: float):
+        self.latency = latency
+        self.block_latency = block_latency
+        self.start = 0.0
+        self.first_paragraph = None
+
+    async def handler(self, request: httpx.Request):
+        children = json.loads(request.content).get("children", [])
+        await asyncio.sleep(self.latency + self.block_latency * len(children))
+        if children and self.first_paragraph is None:
+            self.first_paragraph = time.perf_counter() - self.start
+        return httpx.Response(200, json={"id": "page-id"})
+
+
+async def run(streaming: bool, model: FakeStreamingModel, timeline: NotionTimeline) -> float:
+    timeline.start = time.perf_counter()
+    timeline.first_paragraph = None
+    if streaming:
+        await stream_notion_page([])
+    else:
+        page = await model.ainvoke([])
+        await create_notion_page(title=page.title, paragraphs=page.text, emoji=page.icon)
+    return time.perf_counter() - timeline.start
+
+
+async def measure(model: FakeStreamingModel, timeline: NotionTimeline):
+    async with notion_client:
+        results = {}
+        for name, streaming in (("blocking", False), ("streaming", True)):
+            total = await run(streaming, model, timeline)
+            results[name] = (timeline.first_paragraph, total)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=6, help="Paragraphs in the generated page.")
+    parser.add_argument("--token-ms", type=float, default=20, help="Milliseconds per streamed chunk.")
+    parser.add_argument("--notion-ms", type=float, default=150, help="Latency of every Notion request.")
+    parser.add_argument("--block-ms", type=float, default=40, help="Extra Notion latency per written block.")
+    args = parser.parse_args()
+
+    page = NotionPageData(
+        title="Streaming benchmark",
+        icon="🚀",
+        text=[f"Paragraph {index} " + "lorem ipsum dolor sit amet " * 12 for index in range(args.paragraphs)],
+    )
+    model = FakeStreamingModel(page, args.token_ms / 1000)
+    timeline = NotionTimeline(args.notion_ms / 1000, args.block_ms / 1000)
+
+    llm._model = model
+    config.LLM_CACHE_ENABLED = False
+    notion_client.transport = httpx.MockTransport(timeline.handler)
+    notion_client.rate_limiter = RateLimiter(0)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(measure(model, timeline))
+
+    print(f"{'':<10} {'first paragraph':>16} {'complete page':>14}")
+    for name, (first_paragraph, total) in results.items():
+        print(f"{name:<10} {first_paragraph:>15.2f}s {total:>13.2f}s")
+
+
+if __name__ == "__main__":
+    main()
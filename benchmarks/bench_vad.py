@@ -0,0 +1,102 @@
+"""
+Voice activity detection benchmark on synthetic signals.
+
+Builds recordings made of background noise, voiced "speech" (harmonic tone with a syllable-like
+amplitude envelope), unvoiced "speech" (quiet band of white noise) and long pauses. Checks that
+the speech survives `trim_silence` and the silence does not, then reports the VAD throughput in
+samples per second.
+
+    python -m benchmarks.bench_vad --seconds 300 --fs 44100
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.services.voice_activity import trim_silence
+
+rng = np.random.default_rng(0)
+
+
+def noise(seconds: float, fs: int, level_db: float = -60.0) -> np.ndarray:
+    return rng.normal(0, 10 ** (level_db / 20), int(seconds * fs))
+
+
+def voiced(seconds: float, fs: int, pitch: float = 140.0) -> np.ndarray:
+    t = np.arange(int(seconds * fs)) / fs
+    harmonics = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    syllables = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    return 0.2 * harmonics * syllables
+
+
+def unvoiced(seconds: float, fs: int) -> np.ndarray:
+    return rng.normal(0, 10 ** (-38 / 20), int(seconds * fs))
+
+
+def to_pcm(fs: int, *parts: np.ndarray) -> np.ndarray:
+    signal = np.concatenate(parts)
+    signal += noise(len(signal) / fs, fs)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).reshape(-1, 1)
+
+
+def check(name: str, condition: bool, detail: str, failures: list):
+    print(f"{'ok  ' if condition else 'FAIL'} {name}: {detail}")
+    if not condition:
+        failures.append(name)
+
+
+def sanity_checks(fs: int) -> list:
+    failures = []
+
+    result = trim_silence(to_pcm(fs, noise(5, fs)), fs)
+    check("silence only", result.kept_frames == 0, f"kept {result.kept_frames / fs:.2f}s of 5s", failures)
+
+    result = trim_silence(to_pcm(fs, noise(3, fs), voiced(4, fs), noise(3, fs)), fs)
+    kept = result.kept_frames / fs
+    check("leading/trailing silence", 4 <= kept <= 4.5, f"kept {kept:.2f}s of 10s (4s speech)", failures)
+
+    result = trim_silence(to_pcm(fs, voiced(2, fs), noise(10, fs), voiced(2, fs)), fs, max_pause_ms=600)
+    kept = result.kept_frames / fs
+    check("long pause collapsed", 4.5 <= kept <= 5.2, f"kept {kept:.2f}s of 14s (4s speech)", failures)
+
+    result = trim_silence(to_pcm(fs, noise(2, fs), unvoiced(1, fs), voiced(1, fs), noise(2, fs)), fs)
+    kept = result.kept_frames / fs
+    check("unvoiced speech kept", kept >= 1.9, f"kept {kept:.2f}s of 6s (2s speech)", failures)
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=300, help="Length of the throughput recording.")
+    parser.add_argument("--fs", type=int, default=44100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = sanity_checks(args.fs)
+
+    # A memo alternating 6s of speech and 4s of silence.
+    parts = []
+    for _ in range(args.seconds // 10):
+        parts += [voiced(6, args.fs), noise(4, args.fs)]
+    pcm = to_pcm(args.fs, *parts)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = trim_silence(pcm, args.fs)
+        best = min(best, time.perf_counter() - start)
+
+    print(
+        f"\n{len(pcm) / args.fs:.0f}s @ {args.fs} Hz in {best * 1e3:.1f} ms -> "
+        f"{len(pcm) / best / 1e6:.1f} M samples/s, removed {result.removed_seconds:.1f}s ({result.removed_ratio:.0%})"
+    )
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Local stand-ins for ElevenLabs, Gemini and Notion, used by the offline benchmarks.
+
+Every fake backend has a latency (randomized with `jitter`, log-normal) and an error rate. They are
+installed behind the real application code, which keeps running unchanged:
+
+- ElevenLabs: the SDK clients created by `ElevenLabsManager` are replaced (transcript cache, file
+  encoding and upload sizes stay real). The latency grows with the uploaded bytes.
+- Gemini: `llm._model` is a real `LLM` whose model factory builds fake chat models, so the
+  routing, hedging (`LLMRouter`) and response cache run for real.
+- Notion: the shared `notion_client` gets an `httpx.MockTransport`, errors are 503 answers with a
+  `Retry-After` header, so the client's retries run for real.
+- Recording: the microphone is replaced by a synthetic memo (speech and pauses), so the VAD,
+  resampling and encoding do their real work.
+
+    from benchmarks.fakes import BackendProfile, install_fakes
+    install_fakes(BackendProfile(stt_latency=0.8, llm_latency=1.2, notion_latency=0.25, error_rate=0.05))
+"""
+
+import asyncio
+import json
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+import httpx
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from app.config import config
+from app.schemas import ChunkSummary, NotionPageData, QuoteMMM
+from app.services import eleven_labs, llm, recording_capabilities
+from app.services.notion import RateLimiter, notion_client
+
+from .bench_vad import noise, to_pcm, voiced
+
+
+class FakeBackendError(RuntimeError):
+    pass
+
+
+@dataclass
+class BackendProfile:
+    """Latencies (seconds) and error rate of the fake backends."""
+
+    stt_latency: float = 0.8
+    stt_bytes_per_second: float = 2_000_000  # upload bandwidth to ElevenLabs
+    llm_latency: float = 1.2
+    notion_latency: float = 0.25
+    notion_block_latency: float = 0.005
+    jitter: float = 0.25
+    error_rate: float = 0.0
+    stall_rate: float = 0.0  # probability of a call taking `stall_factor` times longer (provider hiccup)
+    stall_factor: float = 10.0
+    malformed_rate: float = 0.0  # probability of a JSON mode answer having a defect (see `malformed`)
+    time_scale: float = 1.0  # multiplies every latency, to run the scenarios faster
+    memo_seconds: float = 20.0
+    seed: int = 0
+
+
+class FakeBackend:
+    def __init__(self, name: str, latency: float, profile: BackendProfile, rng: random.Random):
+        self.name = name
+        self.latency = latency
+        self.profile = profile
+        self.rng = rng
+        self.calls = 0
+        self.errors = 0
+
+    def delay(self, extra: float = 0.0) -> float:
+        base = (self.latency + extra) * self.profile.time_scale
+        if self.rng.random() < self.profile.stall_rate:
+            base *= self.profile.stall_factor
+        return base * self.rng.lognormvariate(0, self.profile.jitter) if self.profile.jitter else base
+
+    def should_fail(self) -> bool:
+        self.calls += 1
+        if self.rng.random() < self.profile.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    async def wait(self, extra: float = 0.0):
+        await asyncio.sleep(self.delay(extra))
+        if self.should_fail():
+            raise FakeBackendError(f"fake {self.name} error")
+
+
+# ----------------------------
+# ElevenLabs
+# ----------------------------
+def install_fake_elevenlabs(backend: FakeBackend):
+    def upload_seconds(file) -> float:
+        return len(eleven_labs.read_audio_bytes(file)) / backend.profile.stt_bytes_per_second
+
+    def transcript(file) -> SimpleNamespace:
+        # Two speakers taking turns every 8 words, 0.4s per word.
+        text = f"An idea recorded as {len(eleven_labs.read_audio_bytes(file))} bytes of audio. " * 4
+        words = [
+            SimpleNamespace(text=word, start=index * 0.4, end=index * 0.4 + 0.3, type="word", speaker_id=f"speaker_{index // 8 % 2}")
+            for index, word in enumerate(text.split())
+        ]
+        return SimpleNamespace(text=text.strip(), words=words)
+
+    class AsyncSpeechToText:
+        async def convert(self, file, **settings):
+            await backend.wait(upload_seconds(file))
+            return transcript(file)
+
+    class FakeAsyncElevenLabs:
+        def __init__(self, api_key=None):
+            self.speech_to_text = AsyncSpeechToText()
+
+    eleven_labs.AsyncElevenLabs = FakeAsyncElevenLabs
+
+
+# ----------------------------
+# Gemini
+# ----------------------------
+class FakeStructuredRunnable:
+    def __init__(self, schema, backend: FakeBackend):
+        self.schema = schema
+        self.backend = backend
+
+    def build(self):
+        if self.schema is QuoteMMM:
+            # Every answer is different, so the batch graph does not de-duplicate them.
+            return QuoteMMM(author="Unknown Author", phrase=f"Keep going, step {self.backend.calls}.")
+        if self.schema is ChunkSummary:
+            return ChunkSummary(points=[f"Note {index} about this part of the recording." for index in range(5)])
+        return NotionPageData(
+            title="An idea worth writing down",
+            icon="💡",
+            text=[f"Paragraph {index}: " + "the idea explained in a few clear sentences. " * 6 for index in range(4)],
+        )
+
+    def invoke(self, messages, *args, **kwargs):
+        time.sleep(self.backend.delay())
+        if self.backend.should_fail():
+            raise FakeBackendError("fake gemini error")
+        return self.build()
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        await self.backend.wait()
+        return self.build()
+
+
+def malformed(text: str, rng: random.Random) -> str:
+    """
+    A JSON answer with one of the defects models produce: the repairable ones, or a truncated answer.
+    """
+    defect = rng.choice(["fence", "trailing_comma", "single_string", "truncated"])
+    if defect == "fence":
+        return f"```json\n{text}\n```"
+    if defect == "trailing_comma":
+        return text[:-1] + ",}"
+    if defect == "single_string":
+        data = json.loads(text)
+        for key, value in data.items():
+            if isinstance(value, list):
+                data[key] = " ".join(value)
+        return json.dumps(data, ensure_ascii=False)
+    return text[: len(text) // 2]
+
+
+class FakeJsonRunnable:
+    """
+    JSON mode answers. The schema is the one the prompt asks for (its JSON instructions), like a real model.
+    """
+
+    CHUNK_CHARS = 12
+
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+
+    def answer(self, messages) -> str:
+        prompt = messages[-1].content
+        schema = QuoteMMM if '"phrase"' in prompt else ChunkSummary if '"points"' in prompt else NotionPageData
+        text = FakeStructuredRunnable(schema, self.backend).build().model_dump_json()
+        if self.backend.rng.random() < self.backend.profile.malformed_rate:
+            return malformed(text, self.backend.rng)
+        return text
+
+    def invoke(self, messages, *args, **kwargs):
+        time.sleep(self.backend.delay())
+        if self.backend.should_fail():
+            raise FakeBackendError("fake gemini error")
+        return AIMessage(content=self.answer(messages))
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        await self.backend.wait()
+        return AIMessage(content=self.answer(messages))
+
+    async def astream(self, messages, *args, **kwargs):
+        text = self.answer(messages)
+        chunks = [text[start : start + self.CHUNK_CHARS] for start in range(0, len(text), self.CHUNK_CHARS)]
+        chunk_delay = self.backend.delay() / len(chunks)
+        if self.backend.should_fail():
+            raise FakeBackendError("fake gemini error")
+        for chunk in chunks:
+            await asyncio.sleep(chunk_delay)
+            yield AIMessageChunk(content=chunk)
+
+
+class FakeChatModel:
+    """The parts of a LangChain chat model `LLM` uses, backed by the fake runnables."""
+
+    def __init__(self, name: str, backend: FakeBackend):
+        self.name = name
+        self.backend = backend
+
+    def with_structured_output(self, schema):
+        return FakeStructuredRunnable(schema, self.backend)
+
+    def bind(self, **kwargs):
+        # `LLM` only binds the JSON mode.
+        return FakeJsonRunnable(self.backend)
+
+
+# ----------------------------
+# Notion
+# ----------------------------
+def install_fake_notion(backend: FakeBackend, requests_per_second: float = 0):
+    async def handler(request: httpx.Request):
+        children = json.loads(request.content).get("children", []) if request.content else []
+        await asyncio.sleep(backend.delay(backend.profile.notion_block_latency * len(children)))
+        if backend.should_fail():
+            # An overload rejection, the request was not processed.
+            return httpx.Response(503, headers={"Retry-After": "0.05"}, json={"message": "fake notion error"})
+        return httpx.Response(200, json={"id": f"page-{backend.calls}"})
+
+    notion_client.transport = httpx.MockTransport(handler)
+    notion_client.rate_limiter = RateLimiter(requests_per_second)
+    notion_client.backoff_base = 0.05
+
+
+# ----------------------------
+# Recording
+# ----------------------------
+def synthetic_memo(seconds: float, fs: int = 44100) -> np.ndarray:
+    """
+    A voice memo alternating 6s of speech and 2s of silence, as 16-bit PCM (frames, 1).
+
+    The background noise is random, so every memo has distinct content (and transcript cache key).
+    """
+    parts: List[np.ndarray] = [noise(1, fs)]
+    while sum(len(part) for part in parts) < seconds * fs:
+        parts += [voiced(6, fs, pitch=120 + 10 * (len(parts) % 5)), noise(2, fs)]
+    return to_pcm(fs, *parts)[: int(seconds * fs)]
+
+
+def install_fake_recording(profile: BackendProfile, fs: int = 44100):
+    pcm = synthetic_memo(profile.memo_seconds, fs=fs)
+
+    async def fake_arecord_new_audio(duration_limit=5, fs=fs, channels=1):
+        return memoryview(pcm).cast("B")
+
+    recording_capabilities.arecord_new_audio = fake_arecord_new_audio
+
+
+def write_memos(directory: Path, count: int, profile: BackendProfile, fs: int = 44100) -> List[Path]:
+    """
+    Writes `count` synthetic WAV memos (distinct content) for the ingest scenario.
+    """
+    import wave
+
+    paths = []
+    for index in range(count):
+        pcm = synthetic_memo(profile.memo_seconds, fs=fs)
+        path = directory / f"memo-{index:03d}.wav"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(fs)
+            f.writeframes(pcm.tobytes())
+        paths.append(path)
+    return paths
+
+
+@dataclass
+class Fakes:
+    stt: FakeBackend
+    llm: FakeBackend
+    notion: FakeBackend
+    workdir: Path
+
+
+def install_fakes(profile: BackendProfile, use_caches: bool = False, notion_requests_per_second: float = 0) -> Fakes:
+    """
+    Installs every fake backend and points the local state (caches, checkpoints, outbox, index) to a temp folder.
+    """
+    rng = random.Random(profile.seed)
+    fakes = Fakes(
+        stt=FakeBackend("elevenlabs", profile.stt_latency, profile, rng),
+        llm=FakeBackend("gemini", profile.llm_latency, profile, rng),
+        notion=FakeBackend("notion", profile.notion_latency, profile, rng),
+        workdir=Path(tempfile.mkdtemp(prefix="notast-bench-")),
+    )
+
+    config.CACHE_DIR = str(fakes.workdir / "cache")
+    config.CHECKPOINTS_PATH = str(fakes.workdir / "checkpoints.sqlite3")
+    config.OUTBOX_PATH = str(fakes.workdir / "outbox.sqlite3")
+    config.INDEX_DIR = str(fakes.workdir / "index")
+    config.OUTBOX_ENABLED = False  # upload inside the run, a detached worker would escape the measure
+    config.TRANSCRIPT_CACHE_ENABLED = use_caches
+    config.LLM_CACHE_ENABLED = use_caches
+
+    install_fake_elevenlabs(fakes.stt)
+    install_fake_recording(profile)
+    llm._model = llm.LLM(model_factory=lambda name: FakeChatModel(name, fakes.llm))
+    install_fake_notion(fakes.notion, notion_requests_per_second)
+    return fakes
@@ -0,0 +1,303 @@
+"""
+Offline end-to-end benchmark suite.
+
+Runs the real application flows against the local fakes of `benchmarks/fakes.py` (ElevenLabs,
+Gemini, Notion and the microphone), so results are reproducible and free. Scenarios:
+
+- record-idea: the record-idea graph (synthetic memo -> VAD/encode -> transcription -> LLM -> Notion).
+- mmm:         the single-topic MMM graph.
+- mmm-batch:   the map-reduce MMM graph generating `--batch-quotes` quotes per run.
+- ingest:      `ingest_directory` over a folder of `--ingest-files` synthetic WAV memos.
+
+Every scenario runs in its own process (clean peak RSS) and reports p50/p95 run latency,
+throughput (runs, quotes or files per second), errors, peak RSS and hedged LLM requests.
+`--output` saves the results as JSON and `--baseline` compares a run with saved results.
+
+    python -m benchmarks.harness --time-scale 0.2
+    python -m benchmarks.harness --scenarios ingest --error-rate 0.05 --output baseline.json
+    python -m benchmarks.harness --baseline baseline.json
+    python -m benchmarks.harness --scenarios mmm --stall-rate 0.1 --no-hedging
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("record-idea", "mmm", "mmm-batch", "ingest")
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    runs: int = 0
+    errors: int = 0
+    items: int = 0  # units of the throughput: runs, quotes or files
+    item_name: str = "runs"
+    wall_seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    peak_rss_mb: float = 0.0
+    backend_calls: Dict[str, int] = field(default_factory=dict)
+    backend_errors: Dict[str, int] = field(default_factory=dict)  # injected by the fakes
+    llm_hedged: int = 0  # LLM requests that got a backup request (`LLMRouter`)
+    llm_hedge_wins: int = 0  # ... answered first by the backup
+    json_outcomes: Dict[str, int] = field(default_factory=dict)  # parsed / repaired / retried JSON answers
+
+    @property
+    def p50(self) -> float:
+        return percentile(self.latencies, 50)
+
+    @property
+    def p95(self) -> float:
+        return percentile(self.latencies, 95)
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> dict:
+        return {**asdict(self), "p50": self.p50, "p95": self.p95, "throughput": self.throughput}
+
+
+def percentile(values: List[float], q: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_iterations(
+    result: ScenarioResult, run_once: Callable[[], Awaitable[bool]], iterations: int, concurrency: int
+):
+    """
+    Runs `run_once` `iterations` times, `concurrency` at a time, recording the latency of every run.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            try:
+                ok = await run_once()
+            except Exception:
+                ok = False
+            result.latencies.append(time.perf_counter() - start)
+            result.runs += 1
+            result.errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    result.wall_seconds = time.perf_counter() - start
+
+
+async def scenario_record_idea(args, result: ScenarioResult):
+    from app.services.agent import build_graph_and_create_new_code_idea
+
+    async def run_once() -> bool:
+        final_state = await build_graph_and_create_new_code_idea()
+        return final_state is not None and not final_state.get("error")
+
+    await run_iterations(result, run_once, args.iterations, args.concurrency)
+    result.items = result.runs
+
+
+async def scenario_mmm(args, result: ScenarioResult):
+    from app.services.mmm_agent import run_mmm_graph_agent
+
+    async def run_once() -> bool:
+        return await run_mmm_graph_agent(topic="focus") is not None
+
+    await run_iterations(result, run_once, args.iterations, args.concurrency)
+    result.items = result.runs
+
+
+async def scenario_mmm_batch(args, result: ScenarioResult):
+    from app.services.mmm_agent import run_mmm_batch_graph_agent
+
+    topics = ["focus", "patience", "courage", "curiosity"]
+    quotes_per_topic = max(1, args.batch_quotes // len(topics))
+
+    async def run_once() -> bool:
+        final_state = await run_mmm_batch_graph_agent(
+            topics, quotes_per_topic=quotes_per_topic, concurrency=args.concurrency
+        )
+        result.items += len(final_state["quotes"])
+        return not final_state["errors"]
+
+    result.item_name = "quotes"
+    await run_iterations(result, run_once, args.ingest_iterations, 1)
+
+
+async def scenario_ingest(args, result: ScenarioResult, fakes):
+    from app.services.ingest import ingest_directory
+
+    from .fakes import write_memos
+
+    # Every run gets its own folder (and manifest), written before the measure.
+    directories = []
+    for index in range(args.ingest_iterations):
+        directory = fakes.workdir / f"memos-{index}"
+        directory.mkdir()
+        write_memos(directory, args.ingest_files, fakes.stt.profile)
+        directories.append(directory)
+
+    async def run_once() -> bool:
+        summary = await ingest_directory(
+            directories.pop(), transcription_concurrency=4, llm_concurrency=4, notion_concurrency=2
+        )
+        result.items += summary.done
+        return not summary.failed
+
+    result.item_name = "files"
+    await run_iterations(result, run_once, args.ingest_iterations, 1)
+
+
+def run_scenario(args) -> ScenarioResult:
+    """
+    Runs one scenario in the current process (the child side of the harness).
+    """
+    from app.config import config
+    from app.services import llm
+    from app.services.notion import notion_client
+
+    from .fakes import BackendProfile, install_fakes
+
+    profile = BackendProfile(
+        **{f.name: getattr(args, f.name) for f in fields(BackendProfile) if hasattr(args, f.name)}
+    )
+    fakes = install_fakes(profile, use_caches=args.use_caches, notion_requests_per_second=args.notion_rps)
+    config.LLM_HEDGING_ENABLED = not args.no_hedging
+    config.VAD_ENABLED = not args.no_vad
+    result = ScenarioResult(scenario=args.scenario)
+
+    async def main():
+        async with notion_client:
+            if args.scenario == "record-idea":
+                await scenario_record_idea(args, result)
+            elif args.scenario == "mmm":
+                await scenario_mmm(args, result)
+            elif args.scenario == "mmm-batch":
+                await scenario_mmm_batch(args, result)
+            else:
+                await scenario_ingest(args, result, fakes)
+
+    # The application prints its progress, keep the report readable.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        asyncio.run(main())
+
+    result.peak_rss_mb = peak_rss_mb()
+    backends = (fakes.stt, fakes.llm, fakes.notion)
+    result.backend_calls = {backend.name: backend.calls for backend in backends}
+    result.backend_errors = {backend.name: backend.errors for backend in backends}
+    result.json_outcomes = llm.get_model().json_stats.summary()
+    for stats in llm.get_model().router.summary().values():
+        result.llm_hedged += stats["hedged"]
+        result.llm_hedge_wins += stats["hedge_wins"]
+    return result
+
+
+def spawn_scenario(scenario: str, args: argparse.Namespace) -> dict:
+    """
+    Runs a scenario in a fresh interpreter, its arguments are sent as JSON on stdin.
+    """
+    options = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.harness", "--child"],
+        input=json.dumps(options | {"scenario": scenario}),
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"Scenario {scenario} failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(results: List[dict], baseline: Dict[str, dict]):
+    print(
+        f"{'scenario':<12} {'runs':>5} {'errors':>6} {'p50 s':>8} {'p95 s':>8} {'throughput':>16} {'peak RSS':>10} {'hedged':>8}"
+    )
+    for result in results:
+        throughput = f"{result['throughput']:.2f} {result['item_name']}/s"
+        print(
+            f"{result['scenario']:<12} {result['runs']:>5} {result['errors']:>6} {result['p50']:>8.2f} "
+            f"{result['p95']:>8.2f} {throughput:>16} {result['peak_rss_mb']:>7.0f} MB {result.get('llm_hedged', 0):>8}"
+        )
+        previous = baseline.get(result["scenario"])
+        if previous:
+            changes = ", ".join(
+                f"{key} {(result[key] / previous[key] - 1):+.0%}"
+                for key in ("p50", "p95", "throughput", "peak_rss_mb")
+                if previous.get(key)
+            )
+            print(f"{'':<12} vs baseline: {changes}")
+        json_outcomes = result.get("json_outcomes")
+        if json_outcomes and (json_outcomes["repaired"] or json_outcomes["retried"]):
+            print(f"{'':<12} LLM JSON: " + ", ".join(f"{count} {outcome}" for outcome, count in json_outcomes.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=20, help="Runs of the record-idea and mmm scenarios.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent runs (LLM calls for mmm-batch).")
+    parser.add_argument("--batch-quotes", type=int, default=16, help="Quotes per mmm-batch run.")
+    parser.add_argument("--ingest-files", type=int, default=8, help="Memos per ingest run.")
+    parser.add_argument("--ingest-iterations", type=int, default=3, help="Runs of the ingest and mmm-batch scenarios.")
+    parser.add_argument("--stt-latency", type=float, default=0.8)
+    parser.add_argument("--llm-latency", type=float, default=1.2)
+    parser.add_argument("--notion-latency", type=float, default=0.25)
+    parser.add_argument("--jitter", type=float, default=0.25, help="Sigma of the log-normal latency noise.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of any backend call failing.")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Probability of a backend call stalling.")
+    parser.add_argument("--stall-factor", type=float, default=10.0, help="Latency multiplier of a stalled call.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Probability of a malformed LLM JSON answer.")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplies every fake latency.")
+    parser.add_argument("--memo-seconds", type=float, default=20.0, help="Length of the synthetic memos.")
+    parser.add_argument("--notion-rps", type=float, default=0, help="Notion client rate limit (0: none).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--use-caches", action="store_true", help="Keep the transcript and LLM caches on.")
+    parser.add_argument("--no-hedging", action="store_true", help="Never send backup LLM requests.")
+    parser.add_argument("--no-vad", action="store_true", help="Upload the recordings without trimming their silence.")
+    parser.add_argument("--output", type=Path, help="Save the results as JSON.")
+    parser.add_argument("--baseline", type=Path, help="Compare with results saved by --output.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(argparse.Namespace(**json.load(sys.stdin))).summary()))
+        return
+
+    results = [spawn_scenario(scenario, args) for scenario in args.scenarios]
+
+    baseline = {}
+    if args.baseline:
+        baseline = {result["scenario"]: result for result in json.loads(args.baseline.read_text())["results"]}
+    print_report(results, baseline)
+
+    if args.output:
+        options = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "child")}
+        args.output.write_text(json.dumps({"options": options, "results": results}, indent=2))
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.schemas import QuoteMMM
+from app.services import mmm_agent
+
+LATENCY = 0.2
+
+
+class FakeQuoteLLM:
+    """Answers after LATENCY seconds and logs when every request starts and ends."""
+
+    def __init__(self):
+        self.events = []
+
+    async def ainvoke(self, messages):
+        request = self.events.count("start")
+        self.events.append("start")
+        await asyncio.sleep(LATENCY)
+        self.events.append("end")
+        return QuoteMMM(author="Seneca", phrase=f"Quote {request}.")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeQuoteLLM()
+    monkeypatch.setattr(mmm_agent, "get_model", lambda: SimpleNamespace(mmm_structure_llm=llm))
+    return llm
+
+
+def test_two_graphs_make_progress_side_by_side(fake_llm):
+    app = mmm_agent.build_mmm_graph(InMemorySaver())
+
+    async def run():
+        start = time.perf_counter()
+        states = await asyncio.gather(
+            mmm_agent.run_mmm_graph(app, mmm_agent.MMMAgentState(messages=[], topic="bees"), "mmm-1"),
+            mmm_agent.run_mmm_graph(app, mmm_agent.MMMAgentState(messages=[], topic="rain"), "mmm-2"),
+        )
+        return states, time.perf_counter() - start
+
+    states, seconds = asyncio.run(run())
+    assert sorted(state["mmm"]["phrase"] for state in states) == ["Quote 0.", "Quote 1."]
+    # Both LLM calls are in flight together, the second run does not wait for the first one.
+    assert fake_llm.events == ["start", "start", "end", "end"]
+    assert seconds < 1.5 * LATENCY
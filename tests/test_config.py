@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+
+
+def test_override_is_scoped_to_the_context():
+    default = config.LLM_STREAMING
+
+    async def job(value: bool):
+        with config.override(LLM_STREAMING=value):
+            await asyncio.sleep(0.01)
+            return config.LLM_STREAMING
+
+    async def run():
+        return await asyncio.gather(job(True), job(False))
+
+    assert asyncio.run(run()) == [True, False]
+    assert config.LLM_STREAMING == default
+
+
+def test_nested_overrides_are_merged():
+    cache_enabled = config.LLM_CACHE_ENABLED
+    with config.override(LLM_STREAMING=True):
+        with config.override(LLM_CACHE_ENABLED=not cache_enabled):
+            assert config.LLM_STREAMING is True
+            assert config.LLM_CACHE_ENABLED is not cache_enabled
+        assert config.LLM_STREAMING is True
+        assert config.LLM_CACHE_ENABLED is cache_enabled
+
+
+def test_override_rejects_unknown_settings():
+    with pytest.raises(ValueError):
+        with config.override(NOT_A_SETTING=1):
+            pass
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from app.config import config
+from app.services import idea_index
+from app.services.idea_index import IdeaIndex, embed
+
+THRESHOLD = config.INDEX_DUPLICATE_THRESHOLD
+
+IDEAS = [
+    ("Faster CLI startup", ["Import the heavy libraries lazily so the CLI starts in under a second."]),
+    ("Weekly meal planning", ["Plan the meals of the week on Sunday and buy everything in one trip."]),
+    ("Garden watering schedule", ["Water the tomatoes every morning and the herbs every other day."]),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = IdeaIndex(tmp_path / "index")
+    for row, (title, paragraphs) in enumerate(IDEAS):
+        index.add(title, paragraphs, page_id=f"page-{row}")
+    yield index
+    index.close()
+
+
+def test_embed_is_normalized():
+    vector = embed(*IDEAS[0])
+    assert vector.shape == (idea_index.VECTOR_DIM,)
+    assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+    assert not embed("", []).any()
+
+
+def test_nearest_finds_a_rephrased_idea(index):
+    match = index.nearest(
+        "Make the CLI start faster",
+        ["Lazily import the heavy libraries so that the CLI startup takes under a second."],
+    )
+    assert match.page_id == "page-0"
+    assert match.score > THRESHOLD
+
+
+def test_unrelated_idea_is_not_a_duplicate(index):
+    match = index.nearest("Learn the guitar", ["Practice chords for twenty minutes after work."])
+    assert match.score < THRESHOLD
+
+
+def test_nearest_of_an_empty_index(tmp_path):
+    assert IdeaIndex(tmp_path / "empty").nearest(*IDEAS[0]) is None
+
+
+def test_search_ranks_best_first(index):
+    matches = index.search("tomatoes watering", limit=3)
+    assert matches[0].title == "Garden watering schedule"
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
+    assert index.search("tomatoes watering", min_score=0.99) == []
+
+
+def test_search_keeps_one_row_per_page(index):
+    # An idea appended to an existing page is indexed with that page id.
+    index.add("More garden watering", ["Water the tomatoes in the evening when it is hot."], page_id="page-2")
+    matches = index.search("garden watering tomatoes", limit=3)
+    assert [match.page_id for match in matches].count("page-2") == 1
+
+
+def test_queued_page_gets_its_page_id(index):
+    index.add("Queued idea about bees", ["Keep a beehive on the roof."], outbox_key="key-1")
+    assert index.nearest("Queued idea about bees", ["Keep a beehive on the roof."]).page_id is None
+    index.set_page_id("key-1", "page-9")
+    assert index.nearest("Queued idea about bees", ["Keep a beehive on the roof."]).page_id == "page-9"
+
+
+def test_index_grows_and_is_shared_between_instances(tmp_path, monkeypatch):
+    monkeypatch.setattr(idea_index, "INITIAL_CAPACITY", 2)
+    writer, reader = IdeaIndex(tmp_path / "index"), IdeaIndex(tmp_path / "index")
+    writer.add(*IDEAS[0], page_id="page-0")
+    assert reader.nearest(*IDEAS[0]).page_id == "page-0"
+    # The writer doubles the file past the reader's mapping.
+    for row, (title, paragraphs) in enumerate(IDEAS[1:], start=1):
+        writer.add(title, paragraphs, page_id=f"page-{row}")
+    assert reader.stats()["ideas"] == 3
+    assert reader.nearest(*IDEAS[2]).page_id == "page-2"
+    writer.close()
+    reader.close()
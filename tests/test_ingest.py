@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.schemas import NotionPageData
+from app.services import ingest, notion
+from app.services.ingest import MANIFEST_NAME, IngestManifest, ingest_directory
+from app.services.notion import NotionClient
+from app.services.transcript import Transcript
+
+PAGE = NotionPageData(title="Bees", text=[f"Paragraph {index}." for index in range(150)], icon="🐝")
+
+
+class FakeNotion:
+    """Creates pages and appends blocks, the first `append_failures` appends are rejected."""
+
+    def __init__(self, append_failures=0):
+        self.append_failures = append_failures
+        self.pages = {}
+
+    def __call__(self, request: httpx.Request):
+        children = json.loads(request.content).get("children", [])
+        texts = [block["paragraph"]["rich_text"][0]["text"]["content"] for block in children]
+        if request.method == "POST":
+            page_id = f"page-{len(self.pages)}"
+            self.pages[page_id] = texts
+            return httpx.Response(200, json={"id": page_id})
+        if self.append_failures:
+            self.append_failures -= 1
+            return httpx.Response(400, json={"message": "validation_error"})
+        self.pages[request.url.path.split("/")[3]] += texts
+        return httpx.Response(200, json={})
+
+
+@pytest.fixture
+def memos(tmp_path, monkeypatch):
+    (tmp_path / "memo.wav").write_bytes(b"RIFF")
+    generated = []
+
+    async def transcribe_file(path, elevenlabs):
+        return Transcript("Keep bees on the roof.")
+
+    async def structure_transcript(transcript):
+        generated.append(transcript.text)
+        return PAGE
+
+    monkeypatch.setattr(ingest, "get_elevenlabs", lambda: None)
+    monkeypatch.setattr(ingest, "transcribe_file", transcribe_file)
+    monkeypatch.setattr(ingest, "structure_transcript", structure_transcript)
+    monkeypatch.setattr(ingest, "index_page", lambda *args, **kwargs: None)
+    return tmp_path, generated
+
+
+def run_ingest(directory, fake_notion, monkeypatch):
+    client = NotionClient(transport=httpx.MockTransport(fake_notion), backoff_base=0, requests_per_second=0)
+    monkeypatch.setattr(notion, "notion_client", client)
+    return asyncio.run(ingest_directory(directory))
+
+
+def test_incomplete_page_is_finished_by_the_next_run(memos, monkeypatch):
+    directory, generated = memos
+    fake_notion = FakeNotion(append_failures=1)
+
+    summary = run_ingest(directory, fake_notion, monkeypatch)
+    assert summary.failed == ["memo.wav"]
+    entry = IngestManifest(directory / MANIFEST_NAME).partial_upload(IngestManifest.file_key(directory / "memo.wav"))
+    assert (entry["page_id"], entry["upload"]["blocks_written"]) == ("page-0", 100)
+
+    summary = run_ingest(directory, fake_notion, monkeypatch)
+    assert (summary.done, summary.failed) == (1, [])
+    # The same page is completed, the memo is neither generated nor created again.
+    assert fake_notion.pages == {"page-0": PAGE.text}
+    assert generated == ["Keep bees on the roof."]
+    assert run_ingest(directory, fake_notion, monkeypatch).skipped == 1
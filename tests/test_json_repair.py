@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas import NotionPageData, QuoteMMM
+from app.services.json_repair import (
+    JsonRepairStats,
+    LocalJsonRunnable,
+    message_text,
+    parse_structured,
+    remove_trailing_commas,
+    repair_json,
+)
+
+PAGE = NotionPageData(title="Bees", text=["One.", "Two."], icon="🐝")
+VALID = PAGE.model_dump_json()
+
+
+def test_valid_answer_is_parsed_without_repair():
+    assert parse_structured(VALID, NotionPageData) == (PAGE, False)
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        f"```json\n{VALID}\n```",
+        f"Here is the page:\n{VALID}\nHope it helps!",
+        '{"title": "Bees", "text": ["One.", "Two.",], "icon": "🐝",}',
+        '{\n  "title": "Bees",\n  "text": ["One.", "Two."],\n  "icon": "🐝",\n}',
+    ],
+)
+def test_malformed_answers_are_repaired(answer):
+    assert parse_structured(answer, NotionPageData) == (PAGE, True)
+
+
+def test_single_string_is_wrapped_into_a_list():
+    answer = '{"title": "Bees", "text": "Only one.", "icon": "🐝"}'
+    assert repair_json(answer, NotionPageData).text == ["Only one."]
+
+
+def test_trailing_commas_inside_strings_are_kept():
+    assert remove_trailing_commas('{"a": "x,]", "b": [1, 2,],}') == '{"a": "x,]", "b": [1, 2]}'
+
+
+@pytest.mark.parametrize(
+    "answer",
+    ['{"title": "Bees", "text": ["One."', '{"author": "Seneca"}', "no json at all", ""],
+)
+def test_unrepairable_answers_raise_value_error(answer):
+    with pytest.raises(ValueError):
+        repair_json(answer, QuoteMMM if "author" in answer else NotionPageData)
+
+
+def test_message_text_joins_content_parts():
+    message = SimpleNamespace(content=[{"type": "text", "text": '{"author": '}, '"Seneca", "phrase": "Hi"}'])
+    assert message_text(message) == '{"author": "Seneca", "phrase": "Hi"}'
+
+
+class FakeRunnable:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return self.answer
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self.answer
+
+
+@pytest.mark.parametrize(
+    "answer, outcome, fallback_calls",
+    [(VALID, "parsed", 0), (f"```json\n{VALID}\n```", "repaired", 0), ("Sorry, I can't.", "retried", 1)],
+)
+def test_local_json_runnable_falls_back_only_when_needed(answer, outcome, fallback_calls):
+    stats = JsonRepairStats()
+    fallback = FakeRunnable(PAGE)
+    runnable = LocalJsonRunnable(FakeRunnable(SimpleNamespace(content=answer)), fallback, NotionPageData, stats)
+    assert asyncio.run(runnable.ainvoke([])) == PAGE
+    assert runnable.invoke([]) == PAGE
+    assert stats.summary()[outcome] == 2
+    assert fallback.calls == 2 * fallback_calls
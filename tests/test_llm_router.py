@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+from app.services.llm_router import HedgedRunnable, LatencyStats, LLMRouter
+
+
+class FakeRunnable:
+    """Answers the n-th call after `delays[n]` seconds, with "answer n" or the exception in `errors`."""
+
+    def __init__(self, *delays, errors=None):
+        self.delays = delays
+        self.errors = errors or {}
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, messages):
+        index = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if index in self.errors:
+            raise self.errors[index]
+        return f"answer {index}"
+
+
+@pytest.fixture(autouse=True)
+def hedging():
+    with config.override(LLM_HEDGING_ENABLED=True, LLM_HEDGE_MIN_SAMPLES=10, LLM_HEDGE_DELAY_SECONDS=0.05):
+        yield
+
+
+def run(runnable, stats=None):
+    hedged = HedgedRunnable(runnable, stats or LatencyStats(window=50))
+    return asyncio.run(hedged.ainvoke([])), hedged.stats
+
+
+def test_fast_request_is_not_hedged():
+    answer, stats = run(FakeRunnable(0.01))
+    assert answer == "answer 0"
+    assert (stats.requests, stats.hedged, stats.hedge_wins) == (1, 0, 0)
+    assert len(stats.latencies) == 1
+
+
+def test_slow_request_is_hedged_and_the_first_answer_wins():
+    runnable = FakeRunnable(0.5, 0.01)
+    answer, stats = run(runnable)
+    assert answer == "answer 1"
+    assert (stats.hedged, stats.hedge_wins) == (1, 1)
+    # The slow primary is cancelled once the backup answered.
+    assert runnable.cancelled == 1
+
+
+def test_primary_answering_during_the_hedge_still_wins():
+    answer, stats = run(FakeRunnable(0.08, 0.5))
+    assert answer == "answer 0"
+    assert (stats.hedged, stats.hedge_wins) == (1, 0)
+
+
+def test_failed_primary_falls_back_to_the_backup():
+    answer, stats = run(FakeRunnable(0.1, 0.1, errors={0: RuntimeError("503")}))
+    assert answer == "answer 1"
+    assert stats.errors == 0
+
+
+def test_both_failures_raise_the_first_error():
+    with pytest.raises(RuntimeError, match="primary"):
+        run(FakeRunnable(0.1, 0.15, errors={0: RuntimeError("primary"), 1: RuntimeError("backup")}))
+
+
+def test_hedge_delay_uses_the_percentile_once_enough_samples_are_known():
+    stats = LatencyStats(window=50)
+    hedged = HedgedRunnable(FakeRunnable(), stats)
+    for seconds in range(1, 10):
+        stats.record(seconds / 100)
+    assert hedged.hedge_delay() == config.LLM_HEDGE_DELAY_SECONDS
+    stats.record(0.10)
+    assert hedged.hedge_delay() == pytest.approx(stats.percentile(config.LLM_HEDGE_PERCENTILE))
+    with config.override(LLM_HEDGE_PERCENTILE=50.0):
+        assert hedged.hedge_delay() == pytest.approx(0.055)
+    with config.override(LLM_HEDGING_ENABLED=False):
+        assert hedged.hedge_delay() is None
+
+
+def test_router_picks_the_model_of_the_task_tier():
+    built = []
+    router = LLMRouter(lambda name: built.append(name) or f"model:{name}")
+    tiers = {"mmm": "fast", "notion": "heavy"}
+    with config.override(AI_MODEL="base", AI_MODEL_FAST="flash", AI_MODEL_HEAVY=None, LLM_TASK_TIERS=tiers):
+        assert router.model_name("mmm") == "flash"
+        # An unset tier model and an unknown task use AI_MODEL.
+        assert router.model_name("notion") == "base"
+        assert router.model_name("other") == "base"
+        assert router.model("mmm") == router.model("mmm") == "model:flash"
+        assert router.model("notion") == "model:base"
+    assert built == ["flash", "base"]
+
+
+def test_router_keeps_stats_per_model_and_task():
+    router = LLMRouter(lambda name: name)
+    with config.override(AI_MODEL="base", AI_MODEL_FAST="flash", LLM_TASK_TIERS={"mmm": "fast"}):
+        hedged = router.hedged("mmm", FakeRunnable(0.01))
+        assert router.hedged("mmm", FakeRunnable()).stats is hedged.stats
+        asyncio.run(hedged.ainvoke([]))
+        router.hedged("notion", FakeRunnable())
+    assert set(router.summary()) == {"flash/mmm", "base/notion"}
+    assert router.summary()["flash/mmm"]["requests"] == 1
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from app.services import notion as notion_module
+from app.services.notion import (
+    MAX_RICH_TEXT_CHARS,
+    NotionClient,
+    NotionPageWriter,
+    append_to_notion_page,
+    create_notion_page,
+    parse_retry_after,
+    split_text,
+)
+
+
+def test_split_text_keeps_short_text_whole():
+    assert split_text("One sentence.") == ["One sentence."]
+
+
+def test_split_text_cuts_at_sentence_boundaries():
+    text = "First sentence here. Second one is here! Third? Fourth."
+    chunks = split_text(text, limit=25)
+    assert chunks == ["First sentence here.", "Second one is here!", "Third? Fourth."]
+    assert all(len(chunk) <= 25 for chunk in chunks)
+
+
+def test_split_text_cuts_long_sentences_at_whitespace():
+    text = "word " * 1000
+    chunks = split_text(text)
+    assert all(len(chunk) <= MAX_RICH_TEXT_CHARS for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_split_text_hard_cuts_without_whitespace():
+    chunks = split_text("x" * 25, limit=10)
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+
+@pytest.mark.parametrize("value, expected", [("3", 3.0), ("0.5", 0.5), ("-2", 0.0), ("soon", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(value) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert parse_retry_after(past) == 0.0
+
+
+def run_requests(method: str, responses):
+    """Sends one request to a fake Notion answering `responses` in turn, returns the calls made."""
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    async def send():
+        async with NotionClient(transport=httpx.MockTransport(handler), backoff_base=0, requests_per_second=0) as client:
+            try:
+                return await client.request(method, "/pages", json={})
+            except httpx.HTTPStatusError as err:
+                return err.response.status_code
+
+    return asyncio.run(send()), len(calls)
+
+
+OK = httpx.Response(200, json={"id": "page"})
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+def test_rate_limited_requests_are_retried(method):
+    assert run_requests(method, [httpx.Response(429, headers={"Retry-After": "0"}), OK]) == ({"id": "page"}, 2)
+
+
+def test_patch_retries_server_errors():
+    assert run_requests("PATCH", [httpx.Response(502), httpx.Response(503), OK]) == ({"id": "page"}, 3)
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_post_does_not_retry_server_errors(status):
+    # The page may have been created before the error, a retry could create it twice.
+    assert run_requests("POST", [httpx.Response(status), OK]) == (status, 1)
+
+
+def test_post_retries_unavailable_with_retry_after():
+    assert run_requests("POST", [httpx.Response(503, headers={"Retry-After": "0"}), OK]) == ({"id": "page"}, 2)
+
+
+class FakeNotionPages:
+    """Fake Notion keeping the block texts of every page, the `fail_append`-th append is rejected."""
+
+    def __init__(self, fail_append=None):
+        self.fail_append = fail_append
+        self.calls = []
+        self.blocks = {}
+
+    def __call__(self, request: httpx.Request):
+        body = json.loads(request.content)
+        children = [block["paragraph"]["rich_text"][0]["text"]["content"] for block in body.get("children", [])]
+        self.calls.append((request.method, request.url.path, len(children)))
+        if request.method == "POST":
+            page_id = f"page-{len(self.blocks)}"
+            self.blocks[page_id] = children
+            return httpx.Response(200, json={"id": page_id})
+        if len([call for call in self.calls if call[0] == "PATCH"]) == self.fail_append:
+            return httpx.Response(400, json={"message": "validation_error"})
+        self.blocks[request.url.path.split("/")[3]] += children
+        return httpx.Response(200, json={})
+
+
+def write_page(notion: FakeNotionPages, paragraphs, page=None, skip_blocks=0, blocks_written=0):
+    """Creates a page (or appends to `page`) through `NotionPageWriter`, returns the writer."""
+
+    async def write():
+        async with NotionClient(transport=httpx.MockTransport(notion), backoff_base=0, requests_per_second=0) as client:
+            writer = NotionPageWriter(client, parent_page_id="parent", page=page, blocks_written=blocks_written)
+            try:
+                if page is None:
+                    await writer.create("Title", paragraphs)
+                else:
+                    await writer.append(paragraphs, skip_blocks=skip_blocks)
+            except httpx.HTTPStatusError:
+                pass
+            return writer
+
+    return asyncio.run(write())
+
+
+PARAGRAPHS = [f"Paragraph {index}." for index in range(250)]
+
+
+def test_create_sends_the_first_100_blocks_then_appends_in_order():
+    notion = FakeNotionPages()
+    writer = write_page(notion, PARAGRAPHS)
+    assert notion.calls == [
+        ("POST", "/v1/pages", 100),
+        ("PATCH", "/v1/blocks/page-0/children", 100),
+        ("PATCH", "/v1/blocks/page-0/children", 50),
+    ]
+    assert notion.blocks["page-0"] == PARAGRAPHS
+    assert (writer.page_id, writer.blocks_written) == ("page-0", 250)
+
+
+def test_short_page_is_created_in_one_request():
+    notion = FakeNotionPages()
+    writer = write_page(notion, PARAGRAPHS[:3])
+    assert notion.calls == [("POST", "/v1/pages", 3)]
+    assert writer.blocks_written == 3
+
+
+def test_failed_append_is_resumed_with_skip_blocks():
+    notion = FakeNotionPages(fail_append=2)
+    writer = write_page(notion, PARAGRAPHS)
+    assert (writer.page_id, writer.blocks_written) == ("page-0", 200)
+
+    written = writer.blocks_written
+    resumed = write_page(notion, PARAGRAPHS, page=writer.page, skip_blocks=written, blocks_written=written)
+    assert notion.calls[-1] == ("PATCH", "/v1/blocks/page-0/children", 50)
+    assert notion.blocks["page-0"] == PARAGRAPHS
+    assert resumed.blocks_written == 250
+
+
+def test_unreachable_notion_reports_the_partial_page(monkeypatch, capsys):
+    notion = FakeNotionPages()
+
+    def handler(request: httpx.Request):
+        if request.method == "PATCH":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return notion(request)
+
+    client = NotionClient(transport=httpx.MockTransport(handler), max_retries=0, requests_per_second=0)
+    monkeypatch.setattr(notion_module, "notion_client", client)
+    assert asyncio.run(create_notion_page("Title", PARAGRAPHS)) is None
+    assert asyncio.run(append_to_notion_page("page-0", PARAGRAPHS)) is None
+    errors = capsys.readouterr().err
+    assert "Notion page page-0 was created but is incomplete (100 blocks written)" in errors
+    assert "Error appending to Notion page page-0 (0 blocks written): ReadTimeout" in errors
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import outbox as outbox_module
+from app.services.outbox import DONE, FAILED, IN_PROGRESS, PENDING, NotionOutbox, flush_outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = NotionOutbox(tmp_path / "outbox.sqlite3", max_attempts=3, backoff_seconds=0.05)
+    yield box
+    box.close()
+
+
+def test_claim_leases_due_entries_oldest_first(outbox):
+    first, _ = outbox.enqueue("first", ["a"])
+    second, _ = outbox.enqueue("second", ["b"])
+    claimed = outbox.claim(limit=1)
+    assert [entry["key"] for entry in claimed] == [first]
+    assert claimed[0]["paragraphs"] == ["a"]
+    assert [entry["key"] for entry in outbox.claim()] == [second]
+    # Both are leased now.
+    assert outbox.claim() == []
+    assert outbox.stats()[IN_PROGRESS] == 2
+
+
+def test_expired_lease_is_claimed_again(outbox):
+    key, _ = outbox.enqueue("page", ["a"])
+    outbox.claim(lease_seconds=0)
+    assert [entry["key"] for entry in outbox.claim()] == [key]
+
+
+def test_failed_attempt_backs_off_exponentially(outbox):
+    key, _ = outbox.enqueue("page", ["a"])
+    outbox.claim()
+    outbox.mark_failed(key, "boom")
+    assert outbox.claim() == []
+    first_delay = outbox.next_due_in()
+    assert 0.03 <= first_delay <= 0.06
+
+    time.sleep(first_delay)
+    assert outbox.claim()[0]["attempts"] == 1
+    outbox.mark_failed(key, "boom")
+    assert 0.07 <= outbox.next_due_in() <= 0.12
+
+
+def test_entry_fails_after_max_attempts(outbox):
+    key, _ = outbox.enqueue("page", ["a"])
+    for _ in range(3):
+        outbox.mark_failed(key, "boom")
+    assert outbox.stats()[FAILED] == 1
+    assert outbox.next_due_in() is None
+    assert outbox.retry_failed() == 1
+    assert outbox.claim()[0]["attempts"] == 0
+
+
+def test_partial_upload_is_resumed(outbox):
+    key, _ = outbox.enqueue("page", ["a", "b"])
+    outbox.claim()
+    outbox.mark_failed(key, "boom", page_id="page-1", blocks_written=1)
+    time.sleep(outbox.next_due_in())
+    entry = outbox.claim()[0]
+    assert (entry["page_id"], entry["blocks_written"]) == ("page-1", 1)
+
+
+def test_enqueue_dedups_against_pending_and_uploaded_entries(outbox):
+    key, duplicate_of = outbox.enqueue("page", ["a"])
+    assert duplicate_of is None
+    assert outbox.enqueue("page", ["a"]) == (key, PENDING)
+    outbox.claim()
+    assert outbox.enqueue("page", ["a"]) == (key, IN_PROGRESS)
+    outbox.mark_done(key, "page-1", 1)
+    assert outbox.enqueue("page", ["a"]) == (key, DONE)
+    # Appending the same paragraphs to a page is a different entry.
+    assert outbox.enqueue("page", ["a"], page_id="page-1")[1] is None
+
+
+def test_failed_entry_is_queued_again(outbox):
+    key, _ = outbox.enqueue("page", ["a"])
+    for _ in range(3):
+        outbox.mark_failed(key, "boom")
+    assert outbox.enqueue("page", ["a"]) == (key, None)
+    assert outbox.claim()[0]["attempts"] == 0
+
+
+@pytest.fixture
+def flaky_upload(monkeypatch):
+    """Fake upload: the titles in `failures` fail that many times, then succeed."""
+    failures = {}
+    attempts = {}
+
+    async def upload_entry(outbox, entry):
+        attempts[entry["title"]] = attempts.get(entry["title"], 0) + 1
+        if attempts[entry["title"]] <= failures.get(entry["title"], 0):
+            outbox.mark_failed(entry["key"], "boom")
+            return False
+        outbox.mark_done(entry["key"], "page-id", 1)
+        return True
+
+    monkeypatch.setattr(outbox_module, "upload_entry", upload_entry)
+    return failures, attempts
+
+
+def test_flush_stops_when_nothing_is_due(outbox, flaky_upload):
+    failures, attempts = flaky_upload
+    failures["retried"] = 1
+    outbox.enqueue("ok", ["a"])
+    outbox.enqueue("retried", ["b"])
+    summary = asyncio.run(flush_outbox(outbox, quiet=True))
+    assert summary.uploaded == ["ok"]
+    assert summary.failed == ["retried"]
+    assert outbox.stats()[PENDING] == 1
+
+
+def test_waiting_flush_retries_until_nothing_is_left(outbox, flaky_upload):
+    failures, attempts = flaky_upload
+    failures.update({"retried": 2, "broken": 10})
+    outbox.enqueue("retried", ["a"])
+    outbox.enqueue("broken", ["b"])
+    summary = asyncio.run(flush_outbox(outbox, quiet=True, wait=True))
+    assert summary.uploaded == ["retried"]
+    assert summary.failed == ["broken"]
+    assert attempts == {"retried": 3, "broken": 3}
+    assert outbox.next_due_in() is None
+    assert outbox.stats()[DONE] == 1 and outbox.stats()[FAILED] == 1
+
+
+def test_only_one_flush_waits(outbox, flaky_upload):
+    failures, _ = flaky_upload
+    failures["retried"] = 1
+    outbox.enqueue("retried", ["a"])
+    with outbox_module.worker_lock(outbox) as holds_lock:
+        assert holds_lock
+        # Another worker already waits: this one flushes what is due and leaves.
+        summary = asyncio.run(flush_outbox(outbox, quiet=True, wait=True))
+    assert summary.failed == ["retried"]
+    assert outbox.stats()[PENDING] == 1
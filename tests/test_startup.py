@@ -0,0 +1,29 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded by the commands that need them, never just to start the CLI.
+HEAVY_MODULES = ("langgraph", "langchain_google_genai", "elevenlabs", "sounddevice", "numpy")
+
+
+def imported_packages(statement: str) -> set:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    # Lines look like "import time:  self [us] | cumulative | imported.module".
+    return {line.rsplit("|", 1)[-1].strip().split(".")[0] for line in result.stderr.splitlines() if "|" in line}
+
+
+@pytest.fixture(scope="module")
+def cli_packages():
+    return imported_packages("import app.cli")
+
+
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_cli_starts_without_heavy_imports(cli_packages, module):
+    assert "app" in cli_packages
+    assert module not in cli_packages
@@ -0,0 +1,187 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas import NotionPageData
+from app.services import streaming_page
+from app.services.streaming_page import NotionPageStreamParser
+
+PAGE = {"title": "Bees", "icon": "🐝", "text": ["First \"quoted\" idea.", "Second, with a } brace."]}
+
+
+def feed_all(parser: NotionPageStreamParser, text: str, size: int):
+    events = []
+    for start in range(0, len(text), size):
+        events += parser.feed(text[start : start + size])
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_parser_reports_values_in_any_chunking(size):
+    parser = NotionPageStreamParser()
+    events = feed_all(parser, json.dumps(PAGE, ensure_ascii=False), size)
+    assert events == [
+        ("title", "Bees"),
+        ("icon", "🐝"),
+        ("paragraph", PAGE["text"][0]),
+        ("paragraph", PAGE["text"][1]),
+    ]
+    assert parser.result() == NotionPageData(**PAGE)
+
+
+def test_parser_ignores_fences_and_accepts_a_single_text_string():
+    parser = NotionPageStreamParser()
+    parser.feed('```json\n{"title": "Bees", "text": "Only one."}\n```')
+    assert parser.result() == NotionPageData(title="Bees", text=["Only one."], icon=streaming_page.DEFAULT_ICON)
+
+
+def test_parser_rejects_a_cut_object():
+    parser = NotionPageStreamParser()
+    parser.feed(json.dumps(PAGE)[:-10])
+    assert not parser.complete
+    with pytest.raises(ValueError):
+        parser.result()
+    assert parser.partial_result().title == "Bees"
+
+
+def test_parser_rejects_a_missing_title():
+    parser = NotionPageStreamParser()
+    parser.feed('{"text": ["No title."]}')
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+class FakeWriter:
+    def __init__(self, failures=0):
+        self.page = None
+        self.paragraphs = []
+        self.failures = failures
+        self.client = SimpleNamespace(update_page=self.update_page)
+
+    @property
+    def page_id(self):
+        return self.page["id"] if self.page else None
+
+    async def create(self, title, emoji):
+        self.page = {"id": "page-1"}
+
+    @property
+    def blocks_written(self):
+        return len(self.paragraphs)
+
+    async def append(self, paragraphs, skip_blocks=0):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Notion timed out")
+        self.paragraphs += paragraphs[skip_blocks:]
+
+    async def update_page(self, page_id, payload):
+        pass
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(content=chunk)
+        if self.error:
+            raise self.error
+
+
+class FakeStructured:
+    def __init__(self):
+        self.calls = 0
+
+    def lookup(self, messages):
+        return None
+
+    def store(self, messages, response):
+        pass
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return NotionPageData(**PAGE)
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    writers = []
+    writer_failures = []
+
+    def make_writer():
+        writers.append(FakeWriter(writer_failures.pop() if writer_failures else 0))
+        return writers[-1]
+
+    def install(chunks, error=None, append_failures=0):
+        writer_failures.append(append_failures)
+        model = SimpleNamespace(
+            llm_stream_notion_json=FakeStream(chunks, error),
+            llm_structure_notion_response=FakeStructured(),
+            router=SimpleNamespace(model_name=lambda task: "fake-model"),
+        )
+        monkeypatch.setattr(streaming_page, "get_model", lambda: model)
+        return model
+
+    monkeypatch.setattr(streaming_page, "NotionPageWriter", make_writer)
+    return install, writers
+
+
+def test_stream_renders_the_page(fake_backend):
+    install, writers = fake_backend
+    text = json.dumps(PAGE, ensure_ascii=False)
+    model = install([text[i : i + 7] for i in range(0, len(text), 7)])
+    page_data, page_id = asyncio.run(streaming_page.stream_notion_page([], appendix=["Speakers"]))
+    assert page_data == NotionPageData(**PAGE)
+    assert page_id == "page-1"
+    assert writers[0].paragraphs == [*PAGE["text"], "Speakers"]
+    assert model.llm_structure_notion_response.calls == 0
+
+
+@pytest.mark.parametrize("append_failures, complete", [(1, True), (2, False)])
+def test_failed_append_keeps_the_created_page(fake_backend, append_failures, complete):
+    install, writers = fake_backend
+    install([json.dumps(PAGE, ensure_ascii=False)], append_failures=append_failures)
+    page_data, page_id = asyncio.run(streaming_page.stream_notion_page([], appendix=["Speakers"]))
+    assert page_data == NotionPageData(**PAGE)
+    # The page is returned even when incomplete, the upload node must not create a second one.
+    assert page_id == "page-1"
+    assert len(writers) == 1
+    assert writers[0].paragraphs == ([*PAGE["text"], "Speakers"] if complete else [])
+
+
+def test_cut_stream_keeps_the_created_page(fake_backend):
+    install, writers = fake_backend
+    model = install([json.dumps(PAGE, ensure_ascii=False)[:-3]])
+    page_data, page_id = asyncio.run(streaming_page.stream_notion_page([]))
+    assert page_id == "page-1"
+    assert page_data.text == PAGE["text"][:1]
+    assert len(writers) == 1
+    assert writers[0].paragraphs == PAGE["text"][:1]
+    assert model.llm_structure_notion_response.calls == 0
+
+
+def test_cut_stream_without_page_falls_back(fake_backend):
+    install, writers = fake_backend
+    model = install(['{"text": ["No title yet'])
+    page_data, page_id = asyncio.run(streaming_page.stream_notion_page([]))
+    assert page_data == NotionPageData(**PAGE)
+    assert page_id is None
+    assert model.llm_structure_notion_response.calls == 1
+
+
+def test_failed_stream_stops_the_renderer(fake_backend):
+    install, writers = fake_backend
+    install(['{"title": "Bees", "icon": "🐝", "text": ["One."'], error=RuntimeError("connection reset"))
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await streaming_page.stream_notion_page([])
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
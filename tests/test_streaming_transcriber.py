@@ -0,0 +1,137 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.config import config
+from app.services.recording_capabilities import StreamingTranscriber
+from app.services.transcript import Transcript
+
+FS = 8000
+
+
+class FakeSpeechToText:
+    """Answers every segment with one word at 0.5s, the first segments answer last."""
+
+    def __init__(self):
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def aconvert_speech_to_text(self, audio):
+        index = self.calls
+        self.calls += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        await asyncio.sleep(0.02 * (5 - index))
+        self.concurrent -= 1
+        return Transcript(f"segment {index}", [f"w{index}"], [0.5], [0.75], [0], ["speaker_0"])
+
+
+def blocks(seconds: float, block_frames: int = 800):
+    t = np.arange(int(seconds * FS)) / FS
+    samples = (0.3 * np.sin(2 * np.pi * 150 * t)).astype(np.float32).reshape(-1, 1)
+    return [samples[start : start + block_frames] for start in range(0, len(samples), block_frames)]
+
+
+def transcribe(seconds: float, segment_seconds: int = 1, **kwargs):
+    stt = FakeSpeechToText()
+
+    async def run():
+        transcriber = StreamingTranscriber(speech_to_text=stt, segment_seconds=segment_seconds, fs=FS, **kwargs)
+        transcriber.start()
+        for block in blocks(seconds):
+            transcriber.feed(block)
+        return transcriber, await transcriber.finish()
+
+    transcriber, transcript = asyncio.run(run())
+    return transcriber, transcript, stt
+
+
+@pytest.fixture(autouse=True)
+def no_vad():
+    with config.override(VAD_ENABLED=False, AUDIO_SAMPLE_RATE=0, AUDIO_ENCODING="wav"):
+        yield
+
+
+def test_segments_are_stitched_in_recording_order():
+    transcriber, transcript, stt = transcribe(3.5)
+    assert transcriber.segments_submitted == stt.calls == 4
+    assert transcript.text == "segment 0 segment 1 segment 2 segment 3"
+    assert transcript.words == ["w0", "w1", "w2", "w3"]
+    np.testing.assert_allclose(transcript.starts, [0.5, 1.5, 2.5, 3.5])
+    assert transcriber.recorded_frames == int(3.5 * FS)
+
+
+def test_concurrent_transcriptions_are_capped():
+    _, _, stt = transcribe(5, max_concurrent=2)
+    assert stt.calls == 5
+    assert stt.max_concurrent == 2
+
+
+def test_no_audio_gives_an_empty_transcript():
+    transcriber, transcript, stt = transcribe(0)
+    assert transcriber.segments_submitted == stt.calls == 0
+    assert transcript.text == ""
+
+
+def test_failed_segment_fails_the_transcript():
+    class FailingSpeechToText(FakeSpeechToText):
+        async def aconvert_speech_to_text(self, audio):
+            if self.calls == 1:
+                self.calls += 1
+                raise RuntimeError("upload failed")
+            return await super().aconvert_speech_to_text(audio)
+
+    async def run():
+        transcriber = StreamingTranscriber(speech_to_text=FailingSpeechToText(), segment_seconds=1, fs=FS)
+        transcriber.start()
+        for block in blocks(3):
+            transcriber.feed(block)
+        await transcriber.finish()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+
+def test_trimmed_segments_keep_recording_timestamps():
+    # 1s of silence then speech in every 2s segment: the VAD drops the silence before the upload.
+    t = np.arange(FS) / FS
+    speech = (0.3 * np.sin(2 * np.pi * 150 * t)).astype(np.float32)
+    segment = np.concatenate((np.zeros(FS, dtype=np.float32), speech)).reshape(-1, 1)
+
+    async def run():
+        transcriber = StreamingTranscriber(speech_to_text=FakeSpeechToText(), segment_seconds=2, fs=FS)
+        transcriber.start()
+        for _ in range(2):
+            transcriber.feed(segment)
+        return await transcriber.finish()
+
+    with config.override(VAD_ENABLED=True, VAD_PADDING_MS=0):
+        transcript = asyncio.run(run())
+    # The fake word is 0.5s into the trimmed upload, i.e. 0.5s into the speech of each segment.
+    np.testing.assert_allclose(transcript.starts, [1.5, 3.5], atol=0.05)
+
+
+def test_segmenter_error_is_raised_even_with_a_full_queue(monkeypatch):
+    from app.services import recording_capabilities
+
+    def broken_encoder(*args, **kwargs):
+        raise OSError("encoder crashed")
+
+    monkeypatch.setattr(recording_capabilities, "prepare_audio_for_upload", broken_encoder)
+
+    async def run():
+        transcriber = StreamingTranscriber(
+            speech_to_text=FakeSpeechToText(), segment_seconds=1, fs=FS, max_queued_blocks=4
+        )
+        transcriber.start()
+        for block in blocks(3):
+            transcriber.feed(block)
+            # Let the segmenter reach the first full segment before the queue fills up.
+            await asyncio.sleep(0.005)
+        assert transcriber.dropped_blocks
+        await asyncio.wait_for(transcriber.finish(), timeout=2)
+
+    with pytest.raises(OSError, match="encoder crashed"):
+        asyncio.run(run())
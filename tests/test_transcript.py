@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from app.services.transcript import Transcript
+from app.services.voice_activity import trim_silence
+
+FS = 16000
+
+
+def transcript(words, starts, speakers=None, names=("speaker_0",)):
+    starts = np.asarray(starts, dtype=np.float32)
+    speakers = speakers if speakers is not None else [0] * len(words)
+    return Transcript(" ".join(words), words, starts, starts + 0.25, speakers, names)
+
+
+def test_concat_shifts_timestamps_by_the_segment_offsets():
+    first = transcript(["one", "two"], [0.0, 0.5])
+    second = transcript(["three"], [0.25])
+    stitched = Transcript.concat([(0.0, first), (20.0, second)])
+    assert stitched.text == "one two three"
+    assert stitched.words == ["one", "two", "three"]
+    np.testing.assert_allclose(stitched.starts, [0.0, 0.5, 20.25])
+    np.testing.assert_allclose(stitched.ends, [0.25, 0.75, 20.5])
+
+
+def test_concat_matches_speakers_by_label():
+    first = transcript(["hi", "hello"], [0.0, 1.0], speakers=[0, 1], names=["speaker_0", "speaker_1"])
+    # Diarized on its own, the second segment meets "speaker_1" first.
+    second = transcript(["bye", "ciao"], [0.0, 1.0], speakers=[0, 1], names=["speaker_1", "speaker_0"])
+    stitched = Transcript.concat([(0.0, first), (10.0, second)])
+    assert stitched.speaker_names == ["speaker_0", "speaker_1"]
+    assert stitched.speakers.tolist() == [0, 1, 1, 0]
+    assert stitched.speaker_count == 2
+
+
+def test_concat_keeps_text_only_parts():
+    stitched = Transcript.concat([(0.0, Transcript(" first ")), (20.0, transcript(["second"], [1.0]))])
+    assert stitched.text == "first second"
+    assert stitched.words == ["second"]
+    np.testing.assert_allclose(stitched.starts, [21.0])
+
+
+def test_concat_of_nothing_is_empty():
+    assert Transcript.concat([]).text == ""
+
+
+def test_to_dict_round_trip():
+    original = transcript(["one", "two"], [0.0, 0.5], speakers=[0, 1], names=["speaker_0", "speaker_1"])
+    restored = Transcript.from_dict(original.to_dict())
+    assert restored.words == original.words
+    assert restored.speaker_names == original.speaker_names
+    np.testing.assert_allclose(restored.starts, original.starts)
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * FS)) / FS
+    return (0.3 * np.sin(2 * np.pi * 150 * t) * 32767).astype(np.int16)
+
+
+def test_trimmed_timestamps_map_back_to_the_recording():
+    # 1s speech, 4s silence, 1s speech: the pause is shortened to 0.6s (plus padding).
+    pcm = np.concatenate((tone(1), np.zeros(4 * FS, dtype=np.int16), tone(1)))
+    vad = trim_silence(pcm, FS, padding_ms=0, max_pause_ms=600)
+    assert vad.removed_seconds == pytest.approx(3.4, abs=0.05)
+
+    # A word at the start of each speech region, in the time of the trimmed audio.
+    trimmed = transcript(["first", "second"], [0.1, vad.kept_frames / FS - 0.9])
+    restored = trimmed.map_times(vad.original_seconds)
+    np.testing.assert_allclose(restored.starts, [0.1, 5.1], atol=0.05)
+    np.testing.assert_allclose(restored.ends, [0.35, 5.35], atol=0.05)
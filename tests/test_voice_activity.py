@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.services.voice_activity import trim_silence
+
+FS = 16000
+
+
+def tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    """A voiced-like signal (150 Hz and harmonics) as int16 PCM."""
+    t = np.arange(int(seconds * FS)) / FS
+    wave = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in (1, 2, 3))
+    return (amplitude * wave / 1.8 * 32767).astype(np.int16)
+
+
+def silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (rng.normal(0, 3, int(seconds * FS))).astype(np.int16)
+
+
+@pytest.mark.parametrize("milliseconds", [0, 10, 100, 300, 380, 420])
+def test_short_input_does_not_crash(milliseconds):
+    pcm = tone(milliseconds / 1000)
+    result = trim_silence(pcm, FS)
+    assert result.original_frames == len(pcm)
+    assert result.kept_frames <= len(pcm)
+
+
+def test_short_speech_is_kept():
+    pcm = tone(0.3)
+    assert trim_silence(pcm, FS).kept_frames == len(pcm)
+
+
+def test_leading_and_trailing_silence_is_removed():
+    pcm = np.concatenate((silence(2), tone(2), silence(2)))
+    result = trim_silence(pcm, FS, padding_ms=200)
+    assert 2 * FS <= result.kept_frames <= 2.6 * FS
+
+
+def test_continuous_speech_is_kept_whole():
+    # No pause at all, with up to 6 dB of level variation: there is no noise floor to adapt to.
+    pcm = np.concatenate([tone(2, amplitude=0.3 * 10 ** (-db / 20)) for db in (0, 3, 6, 2, 5, 1, 4, 6, 0, 3)])
+    assert trim_silence(pcm, FS).kept_frames == len(pcm)
+
+
+@pytest.mark.parametrize("quieter_db", [9, 12])
+def test_quieter_second_half_is_kept(quieter_db):
+    # A second speaker further from the microphone, or a streamed segment without pauses.
+    pcm = np.concatenate((tone(10), tone(10, amplitude=0.3 * 10 ** (-quieter_db / 20))))
+    assert trim_silence(pcm, FS).kept_frames == len(pcm)
+
+
+def test_long_pauses_are_shortened():
+    pcm = np.concatenate((tone(1), silence(3), tone(1)))
+    result = trim_silence(pcm, FS, padding_ms=200, max_pause_ms=600)
+    assert result.removed_seconds > 2